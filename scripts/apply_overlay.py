@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""Apply overlay.json to a full AS metadata dataset.
+
+The base dataset is a JSON array or JSON Lines file of AS records sorted by
+ASN, e.g.
+
+  {"asn": 2609, "handle": "TN-BB-AS", "description": "...", "origin": "inferred"}
+
+Both inputs are streamed and joined in one sort-merge pass, so memory stays
+flat and runtime grows linearly with the size of the dataset. Overlay
+entries are applied according to their reason:
+
+  missing        fills in handle, description and countryCode where the base
+                 record has none; an AS absent from the base is added
+  inferred-fix   replaces the metadata of records whose origin is not
+                 'authoritative'; authoritative records are left alone
+  internal       always replaces the metadata
+
+Merged records are written as JSON Lines, one per line, in ASN order.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+from validate import OverlayReader
+
+METADATA_FIELDS = ('handle', 'description', 'countryCode')
+AUTHORITATIVE = 'authoritative'
+
+
+class BaseReader(OverlayReader):
+  """Decode base records from a JSON array or a JSON Lines file.
+
+  Iterating yields (record, line, column) for each record, with the same
+  bounded memory and error reporting as OverlayReader.
+  """
+
+  def __iter__(self):
+    if self._peek() == '[':
+      yield from self._entries()
+      if self._peek():
+        raise self._error('Extra data')
+      return
+    while self._peek():
+      record, start, _ = self._value()
+      line, column = self._locate(self.base + start)
+      yield record, line, column
+
+
+def apply_entry(record, entry):
+  """Return record with an overlay entry applied, or None if it does not apply.
+
+  record is the base record for the entry's ASN, or None if the base has no
+  such AS. The base record is not modified.
+  """
+  fields = {field: entry[field] for field in METADATA_FIELDS if field in entry}
+  if record is None:
+    return {'asn': entry['asn'], **fields}
+  reason = entry.get('reason')
+  if reason == 'missing':
+    fields = {field: value for field, value in fields.items() if not record.get(field)}
+  elif reason == 'inferred-fix' and record.get('origin') == AUTHORITATIVE:
+    return None
+  if all(record.get(field) == value for field, value in fields.items()):
+    return None
+  return {**record, **fields}
+
+
+def _sorted_records(reader, name):
+  """Yield (asn, record, line) from reader, checking that ASNs strictly increase."""
+  previous = None
+  for record, line, _ in reader:
+    asn = record.get('asn') if isinstance(record, dict) else None
+    if not isinstance(asn, int) or isinstance(asn, bool):
+      raise ValueError(f"{name} line {line}: record has no integer 'asn'")
+    if previous is not None and asn <= previous:
+      problem = 'duplicate' if asn == previous else f'out of order after AS{previous}'
+      raise ValueError(f"{name} line {line}: AS{asn} is {problem}; input must be sorted by ASN")
+    previous = asn
+    yield asn, record, line
+
+
+def join_lines(base, overlay, names=('base', 'overlay')):
+  """Pair sorted base records with sorted overlay entries by ASN, with lines.
+
+  Takes the same arguments as join() and yields (record, record line, entry,
+  entry line), with None for the record and line on the side that has no
+  item for that ASN. names are used in the errors for unsorted input.
+  """
+  done = (None, None, None)
+  records = _sorted_records(base, names[0])
+  entries = _sorted_records(overlay, names[1])
+  asn, record, line = next(records, done)
+  overlay_asn, entry, overlay_line = next(entries, done)
+  while record is not None or entry is not None:
+    if entry is None or (record is not None and asn < overlay_asn):
+      yield record, line, None, None
+      asn, record, line = next(records, done)
+      continue
+    if record is None or overlay_asn < asn:
+      yield None, None, entry, overlay_line
+    else:
+      yield record, line, entry, overlay_line
+      asn, record, line = next(records, done)
+    overlay_asn, entry, overlay_line = next(entries, done)
+
+
+def join(base, overlay):
+  """Pair sorted base records with sorted overlay entries by ASN.
+
+  base and overlay are iterables of (record, line, column) such as BaseReader
+  and OverlayReader. Yields (record, entry) in ASN order, with None on the
+  side that has no item for that ASN.
+  """
+  for record, _, entry, _ in join_lines(base, overlay):
+    yield record, entry
+
+
+def merge(base, overlay, stats=None):
+  """Merge sorted base records with sorted overlay entries.
+
+  Takes the same arguments as join() and yields the merged records in ASN
+  order. If stats is a dict, the number of records 'added', 'updated',
+  'skipped' (overlay entries that did not change anything) and 'unchanged'
+  is accumulated in it.
+  """
+  if stats is None:
+    stats = {}
+  for key in ('added', 'updated', 'skipped', 'unchanged'):
+    stats.setdefault(key, 0)
+
+  for record, entry in join(base, overlay):
+    if entry is None:
+      stats['unchanged'] += 1
+      yield record
+    elif record is None:
+      stats['added'] += 1
+      yield apply_entry(None, entry)
+    else:
+      merged = apply_entry(record, entry)
+      if merged is None:
+        stats['skipped'] += 1
+        yield record
+      else:
+        stats['updated'] += 1
+        yield merged
+
+
+def write_records(records, f):
+  """Write records to f as JSON Lines; return the number written."""
+  encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+  count = 0
+  for record in records:
+    f.write(encode(record))
+    f.write('\n')
+    count += 1
+  return count
+
+
+def apply_overlay(base_path, overlay_path, output_path=None, stats=None):
+  """Apply overlay_path to base_path, writing to output_path (default stdout).
+
+  An output file is written next to its destination and renamed into place,
+  so readers never see a partial dataset. Returns the number of records.
+  """
+  with open(base_path, encoding='utf-8') as base, open(overlay_path, encoding='utf-8') as overlay:
+    records = merge(BaseReader(base), OverlayReader(overlay), stats)
+    if output_path is None:
+      return write_records(records, sys.stdout)
+    output_path = Path(output_path)
+    fd, tmp = tempfile.mkstemp(dir=output_path.parent, prefix=f'.{output_path.name}.')
+    try:
+      with os.fdopen(fd, 'w', encoding='utf-8') as out:
+        count = write_records(records, out)
+      os.replace(tmp, output_path)
+    except BaseException:
+      os.unlink(tmp)
+      raise
+    return count
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Apply overlay.json to a sorted AS metadata dataset.')
+  parser.add_argument('base', help='Base dataset (JSON array or JSON Lines, sorted by ASN)')
+  parser.add_argument('overlay', nargs='?', default='overlay.json', help='Overlay file (default: overlay.json)')
+  parser.add_argument('-o', '--output', help='Output file (default: stdout)')
+  args = parser.parse_args()
+
+  stats = {}
+  try:
+    count = apply_overlay(args.base, args.overlay, args.output, stats)
+  except (OSError, ValueError) as e:
+    print(f"✗ {e}", file=sys.stderr)
+    sys.exit(1)
+  print(f"✓ Wrote {count} records: {stats['added']} added, {stats['updated']} updated, "
+        f"{stats['skipped']} overlay entries not applied", file=sys.stderr)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Classify ASNs by the IANA registry ranges they fall into.
+
+The bundled asn_registry.csv lists the special-purpose ranges only; ASNs
+outside them are not in the registry until update_asn_registry.py merges in
+the RIR allocation and unallocated blocks.
+"""
+
+import csv
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+from pathlib import Path
+
+DEFAULT_REGISTRY_PATH = Path(__file__).parent / 'asn_registry.csv'
+
+CATEGORIES = {'reserved', 'as-trans', 'documentation', 'private', 'unallocated', 'allocated'}
+
+AsnRange = namedtuple('AsnRange', 'start end category rir description')
+
+
+class AsnRegistry:
+  """Non-overlapping ASN ranges indexed for O(log n) lookups.
+
+  Range starts and ends are kept in parallel array('I') columns, and a
+  lookup is a single bisect on the starts.
+  """
+
+  __slots__ = ('_starts', '_ends', '_ranges')
+
+  def __init__(self, ranges):
+    ranges = sorted(ranges, key=lambda r: r.start)
+    for previous, current in zip(ranges, ranges[1:]):
+      if current.start <= previous.end:
+        raise ValueError(f"Overlapping ASN ranges {previous.start}-{previous.end} and {current.start}-{current.end}")
+    for r in ranges:
+      if r.category not in CATEGORIES:
+        raise ValueError(f"Unknown category '{r.category}' for ASN range {r.start}-{r.end}")
+    self._starts = array('I', (r.start for r in ranges))
+    self._ends = array('I', (r.end for r in ranges))
+    self._ranges = ranges
+
+  @classmethod
+  def load(cls, path=DEFAULT_REGISTRY_PATH):
+    """Load ranges from a CSV file with start,end,category,rir,description columns."""
+    with open(path, newline='', encoding='utf-8') as f:
+      return cls(AsnRange(int(row['start']), int(row['end']), row['category'], row['rir'] or None, row['description'])
+                 for row in csv.DictReader(f))
+
+  def __len__(self):
+    return len(self._ranges)
+
+  def __iter__(self):
+    return iter(self._ranges)
+
+  def classify(self, asn):
+    """Return the AsnRange containing asn, or None if no range covers it."""
+    idx = bisect_right(self._starts, asn) - 1
+    if idx >= 0 and asn <= self._ends[idx]:
+      return self._ranges[idx]
+    return None
+
+  def category(self, asn):
+    """Return the category of asn, or None if no range covers it."""
+    idx = bisect_right(self._starts, asn) - 1
+    if idx >= 0 and asn <= self._ends[idx]:
+      return self._ranges[idx].category
+    return None
+
+  def ranges(self, *categories):
+    """Return (start, end) of the ranges in any of the given categories."""
+    return [(r.start, r.end) for r in self._ranges if r.category in categories]
+
+
+def main():
+  import argparse
+
+  parser = argparse.ArgumentParser(description='Show the IANA registry range of each ASN.')
+  parser.add_argument('asns', nargs='+', type=int, metavar='ASN')
+  parser.add_argument('--registry', type=Path, default=DEFAULT_REGISTRY_PATH,
+                      help=f'Registry CSV file (default: {DEFAULT_REGISTRY_PATH.name})')
+  args = parser.parse_args()
+
+  registry = AsnRegistry.load(args.registry)
+  for asn in args.asns:
+    r = registry.classify(asn)
+    if r is None:
+      print(f"AS{asn}: not in registry")
+    else:
+      rir = f" ({r.rir})" if r.rir else ''
+      print(f"AS{asn}: {r.category}{rir} {r.start}-{r.end} {r.description}")
+
+
+if __name__ == '__main__':
+  main()
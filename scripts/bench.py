@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+"""Benchmarks for the overlay scripts.
+
+Each subcommand prints a table, or a JSON document with --json so results
+can be stored and compared across commits.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from importlib.util import find_spec
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+# Share of overlay.json entries that carry a handle and description
+FULL_ENTRY_SHARE = 0.7
+COUNTRIES = ['US', 'BR', 'CN', 'DE', 'GB', 'IN', 'ID', 'RU', 'ZA', 'TN', 'SN', 'JP']
+# Organization names: a random 12-letter word, distinct enough that the
+# near-duplicate checks stay quiet, and a common suffix
+NAME_SUFFIXES = ['Communications Ltd.', 'Networks LLC', 'Telecom', 'Internet Services', 'S.A.', 'GmbH']
+
+# Start-up overhead of `validate.py --help` over a bare interpreter above
+# which bench.py startup fails; about 32ms with validate.py a small entry
+# point and the modules only some commands need imported where they are used
+MAX_STARTUP_MS = 45
+
+
+# Invalid entries injected by write_synthetic_overlay(), made from a valid
+# entry and the previous ASN; each makes validate.py report exactly one error
+INJECTED_ERRORS = {
+  'country-code': lambda entry, previous: {**entry, 'countryCode': 'XX'},
+  'reason': lambda entry, previous: {**entry, 'reason': 'unknown'},
+  'handle-only': lambda entry, previous: {'asn': entry['asn'], 'handle': f"AS{entry['asn']}-NET",
+                                          'countryCode': entry['countryCode'], 'reason': 'missing'},
+  'handle-spaces': lambda entry, previous: {'asn': entry['asn'], 'handle': f"AS {entry['asn']}",
+                                            'description': 'Example Network', 'countryCode': entry['countryCode'],
+                                            'reason': 'missing'},
+  'field-order': lambda entry, previous: {**{k: v for k, v in entry.items() if k != 'asn'}, 'asn': entry['asn']},
+  'duplicate': lambda entry, previous: {**entry, 'asn': previous},
+}
+
+
+def _generate_entries(count, rng):
+  asn = 0
+  for _ in range(count):
+    asn += rng.randint(1, 2000)
+    while 64496 <= asn <= 131071:
+      asn += 65536
+    if rng.random() < FULL_ENTRY_SHARE:
+      name = ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(12)).title()
+      yield {'asn': asn, 'handle': f"NET{asn}-AS", 'description': f"{name} {rng.choice(NAME_SUFFIXES)}",
+             'countryCode': rng.choice(COUNTRIES), 'reason': rng.choice(['missing', 'internal'])}
+    else:
+      yield {'asn': asn, 'countryCode': rng.choice(COUNTRIES), 'reason': 'missing'}
+
+
+def synthetic_entries(count, seed=0):
+  """Generate count valid, ASN-sorted overlay entries like overlay.json's."""
+  return list(_generate_entries(count, random.Random(seed)))
+
+
+def write_synthetic_overlay(path, count, error_rate=0.0, seed=0):
+  """Write an overlay.json-formatted file of count synthetic entries.
+
+  A share error_rate of the entries is replaced by an invalid one, cycling
+  through INJECTED_ERRORS. Entries are generated and written one at a time.
+  Returns the number of errors injected.
+  """
+  rng = random.Random(seed)
+  kinds = list(INJECTED_ERRORS.values())
+  injected = 0
+  previous = None
+  with open(path, 'w', encoding='utf-8') as f:
+    f.write('{\n  "as": [\n')
+    for i, entry in enumerate(_generate_entries(count, rng)):
+      if previous is not None and rng.random() < error_rate:
+        entry = kinds[injected % len(kinds)](entry, previous)
+        injected += 1
+      previous = entry['asn']
+      separator = ',\n' if i < count - 1 else '\n'
+      f.write(f"    {{ {json.dumps(entry, ensure_ascii=False)[1:-1]} }}{separator}")
+    f.write('  ]\n}\n')
+  return injected
+
+
+def _measure_memory(build):
+  """Return (result, bytes allocated) for calling build()."""
+  tracemalloc.start()
+  try:
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    return result, tracemalloc.get_traced_memory()[0] - before
+  finally:
+    tracemalloc.stop()
+
+
+def _throughput(function, items, repeat=3):
+  """Return items per second for function(items), best of repeat runs."""
+  best = min(_timed(function, items) for _ in range(repeat))
+  return len(items) / best
+
+
+def _timed(function, *args):
+  start = time.perf_counter()
+  function(*args)
+  return time.perf_counter() - start
+
+
+def _time_command(command, runs):
+  """Return the wall-clock seconds of each of runs executions of command."""
+  timings = []
+  for _ in range(runs):
+    start = time.perf_counter()
+    subprocess.run(command, cwd=SCRIPTS_DIR, check=True, stdout=subprocess.DEVNULL)
+    timings.append(time.perf_counter() - start)
+  return timings
+
+
+def bench_startup(args):
+  """Time starting the validate.py command, and importing validate, in a fresh interpreter.
+
+  The command is what CI and contributors run: its script is compiled from
+  source on every start, unlike the modules it imports.
+  """
+  commands = {
+    'interpreter': [sys.executable, '-c', 'pass'],
+    'import validate': [sys.executable, '-c', 'import validate'],
+    'validate.py --help': [sys.executable, 'validate.py', '--help'],
+  }
+  if find_spec('pycountry'):
+    # What building the table at import time used to cost
+    commands['import pycountry'] = [
+      sys.executable, '-c', 'import pycountry; {c.alpha_2 for c in pycountry.countries}']
+
+  results = {}
+  for name, command in commands.items():
+    timings = _time_command(command, args.runs)
+    results[name] = {'median_ms': statistics.median(timings) * 1000, 'min_ms': min(timings) * 1000}
+  overhead = results['validate.py --help']['median_ms'] - results['interpreter']['median_ms']
+  return {'benchmark': 'startup', 'runs': args.runs, 'results': results, 'startup_overhead_ms': overhead}
+
+
+def print_startup(report):
+  print(f"{'Command':<20} {'median':>10} {'min':>10}")
+  for name, result in report['results'].items():
+    print(f"{name:<20} {result['median_ms']:>8.1f}ms {result['min_ms']:>8.1f}ms")
+  print(f"\nvalidate.py start-up overhead: {report['startup_overhead_ms']:.1f}ms")
+
+
+def bench_index(args):
+  """Compare OverlayIndex with a dict of dicts for lookups and memory."""
+  from overlay_index import OverlayIndex
+
+  entries = synthetic_entries(args.entries, args.seed)
+  text = json.dumps({'as': entries})
+  del entries
+  # Both structures are built from freshly decoded JSON, so string values
+  # are counted for each of them
+  index, index_bytes = _measure_memory(lambda: OverlayIndex(json.loads(text)['as']))
+  table, dict_bytes = _measure_memory(lambda: {entry['asn']: entry for entry in json.loads(text)['as']})
+
+  rng = random.Random(args.seed)
+  present = list(table)
+  queries = [rng.choice(present) if rng.random() < 0.5 else rng.randint(1, present[-1]) for _ in range(args.queries)]
+  sorted_queries = sorted(queries)
+
+  def index_lookup(asns):
+    lookup = index.lookup
+    for asn in asns:
+      lookup(asn)
+
+  def dict_lookup(asns):
+    get = table.get
+    for asn in asns:
+      get(asn)
+
+  results = {
+    'index.lookup': _throughput(index_lookup, queries),
+    'index.lookup_many': _throughput(index.lookup_many, queries),
+    'index.lookup_many (sorted)': _throughput(index.lookup_many, sorted_queries),
+    'dict.get': _throughput(dict_lookup, queries),
+  }
+  return {
+    'benchmark': 'index', 'entries': args.entries, 'queries': args.queries,
+    'lookups_per_second': results,
+    'bytes_per_entry': {'index': index_bytes / args.entries, 'dict': dict_bytes / args.entries},
+  }
+
+
+def print_index(report):
+  print(f"{report['entries']} entries, {report['queries']} queries")
+  print(f"\n{'Lookup':<28} {'per second':>12}")
+  for name, rate in report['lookups_per_second'].items():
+    print(f"{name:<28} {rate:>12,.0f}")
+  print(f"\n{'Structure':<28} {'bytes/entry':>12}")
+  for name, size in report['bytes_per_entry'].items():
+    print(f"{name:<28} {size:>12,.1f}")
+
+
+def _peak_rss():
+  """Return this process's peak resident set size in bytes."""
+  peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _git_commit():
+  try:
+    return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SCRIPTS_DIR, capture_output=True,
+                          text=True, check=True).stdout.strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
+
+
+def _profile_validate(path, similar=False):
+  """Validate path with validate_overlay(), timing its phases; runs in a fresh process.
+
+  The phases are those validate_overlay() reports to phase hooks, so they
+  add up to the total but for the glue between them. Peak RSS is taken
+  right after the run; the errors and warnings are counted in a second,
+  untimed run.
+  """
+  import validate
+
+  phases = {}
+
+  def record(phase, seconds):
+    phases[phase] = phases.get(phase, 0.0) + seconds
+
+  validate.add_phase_hook(record)
+  try:
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+      start = time.perf_counter()
+      validate.validate_overlay(path=path, similar=similar)
+      total = time.perf_counter() - start
+  finally:
+    validate.remove_phase_hook(record)
+  peak_rss = _peak_rss()
+
+  result = validate.validate_path(path, similar=similar)
+  return {'seconds': total, 'phases': phases, 'peak_rss_bytes': peak_rss, 'errors': len(result.errors),
+          'warnings': len(result.warnings)}
+
+
+def bench_validate(args):
+  """Time validate_overlay() on synthetic overlays of increasing size."""
+  context = multiprocessing.get_context('spawn')
+  results = []
+  with tempfile.TemporaryDirectory() as tmp:
+    for size in args.sizes:
+      path = Path(tmp) / f'overlay-{size}.json'
+      injected = write_synthetic_overlay(path, size, args.error_rate, args.seed)
+      # A fresh interpreter per size, so peak RSS belongs to that size alone
+      with ProcessPoolExecutor(1, mp_context=context) as pool:
+        result = pool.submit(_profile_validate, str(path), args.near_duplicates).result()
+      results.append({'entries': size, 'bytes': path.stat().st_size, 'injected_errors': injected, **result,
+                      'microseconds_per_entry': result['seconds'] / size * 1e6})
+      path.unlink()
+  return {
+    'benchmark': 'validate', 'commit': _git_commit(), 'python': platform.python_version(),
+    'error_rate': args.error_rate, 'seed': args.seed, 'near_duplicates': args.near_duplicates, 'results': results,
+  }
+
+
+def compare_validate(report, baseline, tolerance):
+  """Return descriptions of sizes that got slower per entry than in baseline."""
+  previous = {result['entries']: result for result in baseline['results']}
+  regressions = []
+  for result in report['results']:
+    before = previous.get(result['entries'])
+    if before is None:
+      continue
+    ratio = result['microseconds_per_entry'] / before['microseconds_per_entry']
+    if ratio > 1 + tolerance:
+      regressions.append(f"{result['entries']} entries: {ratio:.2f}x slower than {baseline.get('commit') or 'baseline'}")
+  return regressions
+
+
+def print_validate(report):
+  phases = list(report['results'][0]['phases']) if report['results'] else []
+  print(f"{'entries':>9} {'errors':>8} {'total':>9} {'us/entry':>9} "
+        + ' '.join(f"{phase:>13}" for phase in phases) + f" {'peak RSS':>10}")
+  for result in report['results']:
+    print(f"{result['entries']:>9} {result['errors']:>8} {result['seconds']:>8.3f}s "
+          f"{result['microseconds_per_entry']:>9.2f} "
+          + ' '.join(f"{result['phases'][phase]:>12.3f}s" for phase in phases)
+          + f" {result['peak_rss_bytes'] / (1 << 20):>8.1f}MB")
+
+
+# Words for synthetic PR bodies: prose, numbers, allowed sources and URLs
+_PROSE = ['the', 'AS', 'prefix', 'announced', 'by', 'organization', 'country', 'WHOIS', 'record', 'shows',
+          '200.195.196.0/22', 'AS12140', 'https://bgp.he.net/AS12140', 'stat.ripe.net', 'rdap.arin.net',
+          'www.peeringdb.com/asn/12140', 'noc@example.net', '(LACNIC)', '-', '**Sources:**\n']
+
+
+def _synthetic_text(size, rng):
+  words = []
+  length = 0
+  while length < size:
+    word = rng.choice(_PROSE)
+    words.append(word)
+    length += len(word) + 1
+  return ' '.join(words)
+
+
+def _synthetic_domains(count, rng):
+  """Return count distinct domains: the real list, padded with made-up ones."""
+  import validate
+
+  domains = list(validate.DISALLOWED_AGGREGATORS[:count])
+  seen = set(domains)
+  while len(domains) < count:
+    domain = f"{''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(8))}.{rng.choice(['com', 'io', 'net'])}"
+    if domain not in seen:
+      seen.add(domain)
+      domains.append(domain)
+  return domains
+
+
+def bench_aggregators(args):
+  """Time AggregatorScanner against one re.search per domain by text size and domain count."""
+  import re
+  import validate
+
+  rng = random.Random(args.seed)
+  results = []
+  for count in args.domains:
+    domains = _synthetic_domains(count, rng)
+    scanner = validate.AggregatorScanner(domains)
+    patterns = [re.compile(re.escape(domain), re.IGNORECASE) for domain in domains]
+    for size in args.sizes:
+      text = _synthetic_text(size * 1024, rng)
+      scanned = min(_timed(lambda: list(scanner.finditer(text))) for _ in range(args.runs))
+      searched = min(_timed(lambda: [pattern.search(text) for pattern in patterns]) for _ in range(args.runs))
+      results.append({'domains': count, 'kilobytes': size, 'scanner_seconds': scanned,
+                      'per_domain_search_seconds': searched})
+  return {'benchmark': 'aggregators', 'runs': args.runs, 'results': results}
+
+
+def print_aggregators(report):
+  print(f"{'domains':>8} {'text':>8} {'scanner':>10} {'MB/s':>8} {'re.search per domain':>21} {'MB/s':>8}")
+  for result in report['results']:
+    megabytes = result['kilobytes'] / 1024
+    print(f"{result['domains']:>8} {result['kilobytes']:>6}KB {result['scanner_seconds'] * 1000:>8.2f}ms "
+          f"{megabytes / result['scanner_seconds']:>8.1f} {result['per_domain_search_seconds'] * 1000:>19.2f}ms "
+          f"{megabytes / result['per_domain_search_seconds']:>8.1f}")
+
+
+def bench_enrich(args):
+  """Time Enricher.enrich_stream() by batch size, for bare ASNs and JSON Lines, with and without its cache."""
+  import io
+  from enrich import BUFFER_SIZE, Enricher
+  from overlay_index import OverlayIndex
+
+  index = OverlayIndex(synthetic_entries(args.entries, args.seed))
+  rng = random.Random(args.seed)
+  present = [entry.asn for entry in index]
+  # Flow logs repeat a few ASNs: a share hot_share of the records draws from 1% of them
+  hot = rng.sample(present, max(1, len(present) // 100))
+  asns = [rng.choice(hot) if rng.random() < args.hot_share else rng.randint(1, present[-1])
+          for _ in range(args.records)]
+  inputs = {
+    'asn': ''.join(f"{asn}\n" for asn in asns).encode(),
+    'jsonl': ''.join(f'{{"ts":{idx},"src_as":{asn},"bytes":1500}}\n' for idx, asn in enumerate(asns)).encode(),
+  }
+
+  results = []
+  with open(os.devnull, 'wb', buffering=BUFFER_SIZE) as sink:
+    for kind, data in inputs.items():
+      for cache_size in (args.cache_size, 0):
+        for batch_size in args.batch_sizes:
+          def run():
+            Enricher(index, field='src_as', cache_size=cache_size).enrich_stream(io.BytesIO(data), sink, batch_size)
+          seconds = min(_timed(run) for _ in range(args.runs))
+          results.append({'input': kind, 'cache_size': cache_size, 'batch_size': batch_size,
+                          'records_per_second': args.records / seconds})
+  return {'benchmark': 'enrich', 'entries': args.entries, 'records': args.records, 'hot_share': args.hot_share,
+          'runs': args.runs, 'results': results}
+
+
+def print_enrich(report):
+  print(f"{report['entries']} entries, {report['records']} records, {report['hot_share']:.0%} from hot ASNs")
+  print(f"\n{'input':<8} {'cache':>8} {'batch':>8} {'records/s':>12}")
+  for result in report['results']:
+    print(f"{result['input']:<8} {result['cache_size']:>8} {result['batch_size']:>8} "
+          f"{result['records_per_second']:>12,.0f}")
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Benchmarks for the overlay scripts.')
+  parser.add_argument('--json', action='store_true', help='Print results as JSON')
+  subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+  startup = subparsers.add_parser('startup', help='Start-up time of the validate.py command and of importing it')
+  startup.add_argument('--runs', type=int, default=20, help='Runs per command (default: 20)')
+  startup.add_argument('--max-ms', type=float, default=MAX_STARTUP_MS,
+                       help='Exit with status 1 if the start-up overhead exceeds this many milliseconds '
+                            f'(default: {MAX_STARTUP_MS:g})')
+  startup.set_defaults(run=bench_startup, show=print_startup)
+
+  index = subparsers.add_parser('index', help='OverlayIndex lookup throughput and memory per entry')
+  index.add_argument('--entries', type=int, default=100000, help='Synthetic overlay size (default: 100000)')
+  index.add_argument('--queries', type=int, default=200000, help='Lookups per run (default: 200000)')
+  index.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+  index.set_defaults(run=bench_index, show=print_index)
+
+  validate = subparsers.add_parser('validate', help='validate_overlay() time per phase and peak RSS by overlay size')
+  validate.add_argument('--sizes', type=lambda text: [int(size) for size in text.split(',')],
+                        default=[1000, 10000, 100000, 1000000],
+                        help='Comma-separated overlay sizes (default: 1000,10000,100000,1000000)')
+  validate.add_argument('--error-rate', type=float, default=0.01,
+                        help='Share of entries replaced by invalid ones (default: 0.01)')
+  validate.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+  validate.add_argument('--near-duplicates', action='store_true',
+                        help='Also run and time the near-duplicate checks')
+  validate.add_argument('--baseline', type=Path,
+                        help='JSON results of an earlier run; exit with status 1 on a per-entry slowdown')
+  validate.add_argument('--tolerance', type=float, default=0.25,
+                        help='Slowdown allowed against --baseline (default: 0.25)')
+  validate.set_defaults(run=bench_validate, show=print_validate)
+
+  aggregators = subparsers.add_parser('aggregators',
+                                      help='AggregatorScanner time by text size and number of disallowed domains')
+  aggregators.add_argument('--sizes', type=lambda text: [int(size) for size in text.split(',')],
+                           default=[4, 64, 1024], help='Comma-separated text sizes in KB (default: 4,64,1024)')
+  aggregators.add_argument('--domains', type=lambda text: [int(count) for count in text.split(',')],
+                           default=[3, 100, 1000], help='Comma-separated domain counts (default: 3,100,1000)')
+  aggregators.add_argument('--runs', type=int, default=3, help='Runs per measurement, best kept (default: 3)')
+  aggregators.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+  aggregators.set_defaults(run=bench_aggregators, show=print_aggregators)
+
+  enrich = subparsers.add_parser('enrich', help='enrich.py throughput by batch size, input format and caching')
+  enrich.add_argument('--entries', type=int, default=100000, help='Synthetic overlay size (default: 100000)')
+  enrich.add_argument('--records', type=int, default=200000, help='Input lines per run (default: 200000)')
+  enrich.add_argument('--batch-sizes', type=lambda text: [int(size) for size in text.split(',')],
+                      default=[1, 64, 1024, 8192, 65536],
+                      help='Comma-separated batch sizes (default: 1,64,1024,8192,65536)')
+  enrich.add_argument('--cache-size', type=int, default=65536, help='LRU cache size (default: 65536)')
+  enrich.add_argument('--hot-share', type=float, default=0.9,
+                      help='Share of records drawn from the 1%% hot ASNs (default: 0.9)')
+  enrich.add_argument('--runs', type=int, default=3, help='Runs per measurement, best kept (default: 3)')
+  enrich.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+  enrich.set_defaults(run=bench_enrich, show=print_enrich)
+
+  args = parser.parse_args()
+  report = args.run(args)
+  if args.json:
+    print(json.dumps(report, indent=2))
+  else:
+    args.show(report)
+
+  if getattr(args, 'max_ms', None) is not None and report['startup_overhead_ms'] > args.max_ms:
+    print(f"✗ validate.py start-up overhead {report['startup_overhead_ms']:.1f}ms exceeds {args.max_ms:g}ms",
+          file=sys.stderr)
+    sys.exit(1)
+  if getattr(args, 'baseline', None) is not None:
+    regressions = compare_validate(report, json.loads(args.baseline.read_text()), args.tolerance)
+    for regression in regressions:
+      print(f"✗ {regression}", file=sys.stderr)
+    if regressions:
+      sys.exit(1)
+
+
+if __name__ == '__main__':
+  main()
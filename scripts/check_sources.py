@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""Report references to disallowed aggregators in PR bodies, commit messages or other text.
+
+Reads the given files, or standard input, in chunks and prints the position
+of every reference to a domain in DISALLOWED_AGGREGATORS, e.g.
+
+  git log --format=%B origin/master..HEAD | python scripts/check_sources.py
+"""
+
+import argparse
+import sys
+
+from validate import AggregatorScanner
+
+
+def check_sources(f, name, scanner, out=None):
+  """Print each reference in file f, labelled name; return how many were found."""
+  count = 0
+  for match in scanner.scan(f):
+    print(f"{name}:{match.line}:{match.column}: disallowed aggregator {match.domain} ({match.host})", file=out)
+    count += 1
+  return count
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Report references to disallowed aggregators in text.')
+  parser.add_argument('files', nargs='*', default=['-'], help="Files to check; '-' or none reads standard input")
+  args = parser.parse_args()
+
+  scanner = AggregatorScanner()
+  count = 0
+  for path in args.files:
+    try:
+      if path == '-':
+        count += check_sources(sys.stdin, '<stdin>', scanner)
+      else:
+        with open(path, encoding='utf-8', errors='replace') as f:
+          count += check_sources(f, path, scanner)
+    except OSError as e:
+      print(f"✗ {e}", file=sys.stderr)
+      sys.exit(2)
+  if count:
+    print(f"✗ {count} reference(s) to disallowed aggregators")
+    sys.exit(1)
+  print("✓ No disallowed aggregators referenced")
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""Collect registry evidence for ASNs from RDAP, PeeringDB and IRR whois.
+
+Runs the lookups of SKILL.md for many ASNs at once, e.g. every entry of
+missing.json:
+
+  python scripts/collect_evidence.py --missing missing.json -o evidence
+  python scripts/collect_evidence.py 64512 64513
+
+All sources are queried for all ASNs concurrently. Prefix sources are
+then queried for each prefix (up to MAX_PREFIXES) of the route objects
+another source found for the ASN, as in step 3 of SKILL.md. The evidence
+for each ASN is written to OUTPUT/AS{asn}.jsonl, one line per request:
+
+  {"asn": 64512, "source": "rdap", "request": "https://...", "status": 200,
+   "fetched": 1760000000.0, "cached": false, "body": {...}}
+
+Records of prefix sources also carry the "prefix" they are about.
+
+HTTP sources share pooled keep-alive connections (HTTP/1.1, plain or TLS);
+whois sources open one connection per query, as whois servers close it
+after answering. Requests to each host are spaced by that host's rate
+limit, and failed requests (connection errors, timeouts, 429 and 5xx) are
+retried with exponential backoff. Responses are cached in an SQLite file
+and reused until they are older than the TTL; expired responses are
+evicted when the cache is opened.
+
+Sources are a JSON list in the format of DEFAULT_SOURCES, given with
+--sources; the tests point them at local mock servers.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import ssl
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from urllib.parse import urljoin, urlsplit
+
+from validate import OverlayReader
+
+# url sources are fetched with GET, whois sources send query to host[:port];
+# {asn} is replaced by the ASN. rate is the host's requests per second. A
+# source with prefixes set is a prefix source: it runs once per route
+# prefix in the answer of the source it names, with {prefix} replaced.
+DEFAULT_SOURCES = [
+  {'name': 'rdap', 'url': 'https://rdap.org/autnum/{asn}', 'rate': 5},
+  {'name': 'peeringdb', 'url': 'https://www.peeringdb.com/api/net?asn={asn}', 'rate': 0.5},
+  {'name': 'radb', 'whois': 'whois.radb.net', 'query': 'AS{asn}', 'rate': 5},
+  {'name': 'radb-routes', 'whois': 'whois.radb.net', 'query': '-i origin AS{asn}'},
+  {'name': 'rdap-prefix', 'url': 'https://rdap.org/ip/{prefix}', 'prefixes': 'radb-routes'},
+]
+MAX_PREFIXES = 8
+DEFAULT_RATE = 2.0
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_CACHE_PATH = Path('.evidence-cache.sqlite')
+MAX_REDIRECTS = 5
+USER_AGENT = 'as-overlay-evidence/1 (+https://github.com/ipverse/as-overlay)'
+
+
+class RequestError(Exception):
+  """A request failed in a way worth retrying."""
+
+
+class ResponseCache:
+  """Responses kept in an SQLite file for ttl seconds."""
+
+  def __init__(self, path, ttl=DEFAULT_TTL):
+    self.ttl = ttl
+    self.db = sqlite3.connect(path)
+    self.db.execute('CREATE TABLE IF NOT EXISTS responses '
+                    '(key TEXT PRIMARY KEY, fetched REAL, status INTEGER, json INTEGER, body TEXT)')
+    self.db.execute('DELETE FROM responses WHERE fetched < ?', (time.time() - ttl,))
+    self.db.commit()
+
+  def get(self, key):
+    """Return (fetched, status, body) for key if it is still fresh, else None."""
+    row = self.db.execute('SELECT fetched, status, json, body FROM responses WHERE key = ?', (key,)).fetchone()
+    if row is None or row[0] < time.time() - self.ttl:
+      return None
+    fetched, status, is_json, body = row
+    return fetched, status, json.loads(body) if is_json else body
+
+  def put(self, key, fetched, status, body):
+    is_json = not isinstance(body, str)
+    self.db.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)',
+                    (key, fetched, status, is_json, json.dumps(body) if is_json else body))
+    self.db.commit()
+
+  def close(self):
+    self.db.close()
+
+
+class RateLimiter:
+  """Space out request starts to at most rate per second."""
+
+  def __init__(self, rate):
+    self.interval = 1 / rate if rate else 0.0
+    self.next = 0.0
+
+  async def wait(self):
+    now = asyncio.get_running_loop().time()
+    start = max(now, self.next)
+    self.next = start + self.interval
+    if start > now:
+      await asyncio.sleep(start - now)
+
+
+class HttpPool:
+  """Minimal HTTP/1.1 GET client keeping up to per_host connections per origin alive."""
+
+  def __init__(self, per_host=4, timeout=30.0):
+    self.per_host = per_host
+    self.timeout = timeout
+    self.opened = 0       # connections opened, for tests and stats
+    self._idle = defaultdict(list)
+    self._slots = {}
+    self._ssl = None
+
+  async def _connect(self, scheme, host, port):
+    if scheme == 'https' and self._ssl is None:
+      self._ssl = ssl.create_default_context()
+    connection = await asyncio.open_connection(host, port, ssl=self._ssl if scheme == 'https' else None)
+    self.opened += 1
+    return connection
+
+  async def get(self, url):
+    """Return (status, headers, body) for url; headers have lower-case names."""
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https'):
+      raise ValueError(f"Unsupported URL: {url}")
+    origin = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80))
+    target = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+    slot = self._slots.get(origin)
+    if slot is None:
+      slot = self._slots[origin] = asyncio.Semaphore(self.per_host)
+    async with slot:
+      idle = self._idle[origin]
+      while True:
+        reused = bool(idle)
+        reader, writer = idle.pop() if reused else await asyncio.wait_for(self._connect(*origin), self.timeout)
+        try:
+          status, headers, body, keep = await asyncio.wait_for(
+            self._request(reader, writer, parts.netloc, target), self.timeout)
+        except (OSError, EOFError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError):
+          writer.close()
+          if reused:
+            continue    # the server closed an idle connection; retry on a fresh one
+          raise
+        if keep:
+          idle.append((reader, writer))
+        else:
+          writer.close()
+        return status, headers, body
+
+  async def _request(self, reader, writer, host, target):
+    writer.write(f'GET {target} HTTP/1.1\r\nHost: {host}\r\nUser-Agent: {USER_AGENT}\r\n'
+                 'Accept: application/rdap+json, application/json;q=0.9, */*;q=0.8\r\n\r\n'.encode('ascii'))
+    await writer.drain()
+    status_line = await reader.readline()
+    if not status_line:
+      raise EOFError('connection closed')
+    version, status = status_line.decode('latin-1').split(None, 2)[:2]
+    headers = {}
+    while True:
+      line = await reader.readline()
+      if line in (b'\r\n', b'\n', b''):
+        break
+      name, _, value = line.decode('latin-1').partition(':')
+      headers[name.strip().lower()] = value.strip()
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+      body = bytearray()
+      while True:
+        size = int((await reader.readline()).split(b';')[0], 16)
+        if not size:
+          while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+            pass
+          break
+        body += await reader.readexactly(size)
+        await reader.readexactly(2)
+      body = bytes(body)
+      length_known = True
+    elif 'content-length' in headers:
+      body = await reader.readexactly(int(headers['content-length']))
+      length_known = True
+    else:
+      body = await reader.read()
+      length_known = False
+    keep = length_known and version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+    return int(status), headers, body, keep
+
+  async def close(self):
+    for connections in self._idle.values():
+      for _, writer in connections:
+        writer.close()
+    self._idle.clear()
+
+
+async def whois_query(host, port, query, timeout=30.0):
+  """Send query to a whois server and return its answer as text."""
+  async def ask():
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+      writer.write(f'{query}\r\n'.encode('utf-8'))
+      await writer.drain()
+      return (await reader.read()).decode('utf-8', 'replace')
+    finally:
+      writer.close()
+  return await asyncio.wait_for(ask(), timeout)
+
+
+def _decode_body(headers, body):
+  """Return a JSON body decoded, anything else as text."""
+  text = body.decode('utf-8', 'replace')
+  if 'json' in headers.get('content-type', ''):
+    try:
+      return json.loads(text)
+    except ValueError:
+      pass
+  return text
+
+
+def _whois_address(address):
+  host, _, port = address.partition(':')
+  return host, int(port) if port else 43
+
+
+def route_prefixes(record, limit=MAX_PREFIXES):
+  """Return the first limit distinct prefixes of the route and route6 objects in a whois record."""
+  prefixes = []
+  body = record.get('body')
+  if not isinstance(body, str):
+    return prefixes
+  for line in body.splitlines():
+    key, _, value = line.partition(':')
+    prefix = value.strip()
+    if key.strip().lower() in ('route', 'route6') and prefix and prefix not in prefixes:
+      prefixes.append(prefix)
+      if len(prefixes) == limit:
+        break
+  return prefixes
+
+
+class EvidenceCollector:
+  """Query every source for every ASN and write the evidence per ASN."""
+
+  def __init__(self, sources, cache, output_dir, concurrency=32, per_host=4, retries=3, backoff=1.0, timeout=30.0,
+               rates=None):
+    self.sources = sources
+    self.cache = cache
+    self.output_dir = Path(output_dir)
+    self.concurrency = concurrency
+    self.retries = retries
+    self.backoff = backoff
+    self.timeout = timeout
+    self.pool = HttpPool(per_host, timeout)
+    self.stats = {'asns': 0, 'requests': 0, 'cached': 0, 'errors': 0}
+    self._rates = dict(rates or {})
+    for source in sources:
+      host = urlsplit(source['url']).hostname if 'url' in source else _whois_address(source['whois'])[0]
+      if 'rate' in source:
+        self._rates.setdefault(host, source['rate'])
+    self._limiters = {}
+
+  def _limiter(self, host):
+    limiter = self._limiters.get(host)
+    if limiter is None:
+      limiter = self._limiters[host] = RateLimiter(self._rates.get(host, DEFAULT_RATE))
+    return limiter
+
+  async def _get(self, url):
+    """Fetch url once, following redirects; return (status, body)."""
+    for _ in range(MAX_REDIRECTS + 1):
+      await self._limiter(urlsplit(url).hostname).wait()
+      self.stats['requests'] += 1
+      status, headers, body = await self.pool.get(url)
+      if status in (301, 302, 303, 307, 308) and 'location' in headers:
+        url = urljoin(url, headers['location'])
+        continue
+      if status == 429 or status >= 500:
+        raise RequestError(f"HTTP {status}")
+      return status, _decode_body(headers, body)
+    raise RequestError('too many redirects')
+
+  async def _whois(self, address, query):
+    host, port = _whois_address(address)
+    await self._limiter(host).wait()
+    self.stats['requests'] += 1
+    return None, await whois_query(host, port, query, self.timeout)
+
+  async def fetch(self, source, asn, prefix=None):
+    """Return the evidence record of one source for asn, or for one of its prefixes."""
+    if 'url' in source:
+      request = source['url'].format(asn=asn, prefix=prefix)
+      query = lambda: self._get(request)
+    else:
+      text = source['query'].format(asn=asn, prefix=prefix)
+      request = f"whois://{source['whois']}/{text}"
+      query = lambda: self._whois(source['whois'], text)
+    record = {'asn': asn, 'source': source['name'], 'request': request}
+    if prefix is not None:
+      record['prefix'] = prefix
+    key = f"{source['name']}\0{request}"
+    cached = self.cache.get(key) if self.cache is not None else None
+    if cached is not None:
+      self.stats['cached'] += 1
+      fetched, status, body = cached
+      return {**record, 'status': status, 'fetched': fetched, 'cached': True, 'body': body}
+
+    for attempt in range(self.retries + 1):
+      try:
+        status, body = await query()
+        break
+      except (OSError, EOFError, asyncio.IncompleteReadError, asyncio.TimeoutError, RequestError, ValueError) as e:
+        error = str(e) or type(e).__name__
+        if attempt == self.retries:
+          self.stats['errors'] += 1
+          return {**record, 'error': error, 'fetched': time.time(), 'cached': False}
+        await asyncio.sleep(self.backoff * 2 ** attempt)
+    fetched = time.time()
+    if self.cache is not None:
+      self.cache.put(key, fetched, status, body)
+    return {**record, 'status': status, 'fetched': fetched, 'cached': False, 'body': body}
+
+  async def collect(self, asn):
+    """Query all sources for asn and write OUTPUT/AS{asn}.jsonl; return the records."""
+    records = await asyncio.gather(*(self.fetch(source, asn) for source in self.sources if 'prefixes' not in source))
+    by_name = {record['source']: record for record in records}
+    records += await asyncio.gather(*(
+      self.fetch(source, asn, prefix) for source in self.sources if 'prefixes' in source
+      for prefix in route_prefixes(by_name.get(source['prefixes'], {}))))
+    path = self.output_dir / f'AS{asn}.jsonl'
+    fd, tmp = tempfile.mkstemp(dir=self.output_dir, prefix=f'.{path.name}.')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+      for record in records:
+        f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    os.replace(tmp, path)
+    self.stats['asns'] += 1
+    return records
+
+  async def run(self, asns):
+    """Collect evidence for every ASN in asns, concurrency ASNs at a time; return the stats."""
+    self.output_dir.mkdir(parents=True, exist_ok=True)
+    asns = iter(asns)
+
+    async def worker():
+      for asn in asns:
+        await self.collect(asn)
+
+    try:
+      await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+    finally:
+      await self.pool.close()
+    return self.stats
+
+
+def load_sources(path):
+  """Read a JSON list of sources in the format of DEFAULT_SOURCES."""
+  with open(path, encoding='utf-8') as f:
+    sources = json.load(f)
+  for source in sources:
+    if not isinstance(source, dict) or 'name' not in source or not ('url' in source or
+                                                                     ('whois' in source and 'query' in source)):
+      raise ValueError(f"{path}: each source needs a name and either a url or a whois host and query")
+  names = {source['name'] for source in sources if 'prefixes' not in source}
+  for source in sources:
+    if 'prefixes' in source and source['prefixes'] not in names:
+      raise ValueError(f"{path}: source {source['name']} takes prefixes from unknown source {source['prefixes']}")
+  return sources
+
+
+def missing_asns(path, kinds=None):
+  """Yield the ASNs listed in a missing.json file, optionally only those whose 'missing' is in kinds."""
+  with open(path, encoding='utf-8') as f:
+    for entry, _, _ in OverlayReader(f):
+      if kinds is None or entry.get('missing') in kinds:
+        yield entry['asn']
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Collect RDAP, PeeringDB and IRR evidence for ASNs.')
+  parser.add_argument('asns', nargs='*', type=int, help='ASNs to research')
+  parser.add_argument('--missing', metavar='PATH', help='Research the ASNs listed in this missing.json')
+  parser.add_argument('--only', choices=('all', 'country'), help="With --missing, only entries with this 'missing'")
+  parser.add_argument('-o', '--output', default='evidence', help='Directory for AS{asn}.jsonl files (default: evidence)')
+  parser.add_argument('--sources', help='JSON list of sources (default: RDAP, PeeringDB and RADb, and RDAP for '
+                      'the prefixes of RADb route objects)')
+  parser.add_argument('--cache', type=Path, default=DEFAULT_CACHE_PATH,
+                      help=f'Response cache (default: {DEFAULT_CACHE_PATH})')
+  parser.add_argument('--ttl', type=float, default=DEFAULT_TTL, help=f'Cache lifetime in seconds (default: {DEFAULT_TTL})')
+  parser.add_argument('--concurrency', type=int, default=32, help='ASNs researched at a time (default: 32)')
+  parser.add_argument('--per-host', type=int, default=4, help='Connections per HTTP host (default: 4)')
+  parser.add_argument('--retries', type=int, default=3, help='Retries per request (default: 3)')
+  parser.add_argument('--rate', action='append', default=[], metavar='HOST=N',
+                      help=f'Requests per second for HOST (default: per source, else {DEFAULT_RATE})')
+  args = parser.parse_args()
+  if not args.asns and not args.missing:
+    parser.error('give ASNs or --missing')
+
+  try:
+    rates = {host: float(rate) for host, _, rate in (item.partition('=') for item in args.rate)}
+  except ValueError:
+    parser.error('--rate takes HOST=N')
+  try:
+    sources = load_sources(args.sources) if args.sources else DEFAULT_SOURCES
+    asns = list(args.asns)
+    if args.missing:
+      asns += missing_asns(args.missing, {args.only} if args.only else None)
+  except (OSError, ValueError) as e:
+    print(f"✗ {e}", file=sys.stderr)
+    sys.exit(1)
+
+  cache = ResponseCache(args.cache, args.ttl)
+  collector = EvidenceCollector(sources, cache, args.output, args.concurrency, args.per_host, args.retries,
+                                rates=rates)
+  start = time.perf_counter()
+  try:
+    stats = asyncio.run(collector.run(asns))
+  finally:
+    cache.close()
+  elapsed = time.perf_counter() - start
+  print(f"✓ Collected evidence for {stats['asns']} ASNs in {elapsed:.1f}s: {stats['requests']} requests, "
+        f"{stats['cached']} cached, {stats['errors']} failed")
+  if stats['errors']:
+    sys.exit(1)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""Compile a validated overlay into a memory-mappable binary file.
+
+Layout (little-endian):
+
+  header    magic b'ASOV', version, record size, entry count and the offsets
+            of the sections below (HEADER)
+  asns      count x uint32, ascending
+  records   count x RECORD: country code (2 ASCII bytes, zeros if absent),
+            reason code (index into REASONS), handle and description as
+            (offset, length) into the string table, offset NO_STRING if absent
+  strings   UTF-8 text of every distinct handle and description
+
+CompiledOverlay maps the file and binary-searches the ASN column in place,
+so only the matching record and its strings are ever decoded. Processes
+that open the same file share one page-cached copy.
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+
+from overlay_index import OverlayEntry, OverlayIndex
+from validate import validate_overlay
+
+MAGIC = b'ASOV'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIIII')   # magic, version, record size, count, asns, records, strings
+RECORD = struct.Struct('<2sBxIHIH')   # country, reason, handle offset/length, description offset/length
+REASONS = (None, 'missing', 'inferred-fix', 'internal')
+NO_STRING = 0xFFFFFFFF
+MAX_STRING_BYTES = 0xFFFF
+
+
+def compile_overlay(entries, path):
+  """Write entries (OverlayEntry, in ascending ASN order) to path.
+
+  The file is written next to path and renamed over it, so readers that
+  still map the previous version are not disturbed.
+  """
+  asns = array('I')
+  records = bytearray()
+  strings = bytearray()
+  offsets = {}
+
+  def intern(value):
+    if value is None:
+      return NO_STRING, 0
+    data = value.encode('utf-8')
+    if len(data) > MAX_STRING_BYTES:
+      raise ValueError(f"String too long for the binary format: {value[:40]}...")
+    offset = offsets.get(value)
+    if offset is None:
+      offset = offsets[value] = len(strings)
+      strings.extend(data)
+    return offset, len(data)
+
+  for entry in entries:
+    if asns and entry.asn <= asns[-1]:
+      raise ValueError(f"ASNs must be unique and sorted (ASN {entry.asn} comes after {asns[-1]})")
+    if entry.reason not in REASONS:
+      raise ValueError(f"AS{entry.asn}: Unknown reason '{entry.reason}'")
+    asns.append(entry.asn)
+    country = entry.countryCode.encode('ascii') if entry.countryCode else b'\0\0'
+    records.extend(RECORD.pack(country, REASONS.index(entry.reason),
+                               *intern(entry.handle), *intern(entry.description)))
+
+  if sys.byteorder != 'little':
+    asns.byteswap()
+  asns_offset = HEADER.size
+  records_offset = asns_offset + len(asns) * 4
+  strings_offset = records_offset + len(records)
+  if strings_offset + len(strings) > NO_STRING:
+    raise ValueError("Overlay too large for the binary format")
+
+  path = Path(path)
+  tmp = path.with_name(path.name + '.tmp')
+  with open(tmp, 'wb') as f:
+    f.write(HEADER.pack(MAGIC, VERSION, RECORD.size, len(asns), asns_offset, records_offset, strings_offset))
+    f.write(asns.tobytes())
+    f.write(records)
+    f.write(strings)
+  os.replace(tmp, path)
+  return len(asns)
+
+
+class CompiledOverlay:
+  """Read-only view of a compiled overlay file, searched in place."""
+
+  def __init__(self, path):
+    with open(path, 'rb') as f:
+      self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    self._view = memoryview(self._mmap)
+    magic, version, record_size, count, asns_offset, records_offset, strings_offset = HEADER.unpack_from(self._view)
+    if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+      self.close()
+      raise ValueError(f"{path} is not a compiled overlay (version {VERSION})")
+    self._count = count
+    self._records = records_offset
+    self._strings = strings_offset
+    asns = self._view[asns_offset:asns_offset + count * 4]
+    if sys.byteorder == 'little':
+      self._asns = asns.cast('I')
+    else:
+      self._asns = array('I', asns)
+      self._asns.byteswap()
+
+  def close(self):
+    self._asns = None
+    self._view.release()
+    self._mmap.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
+
+  def __len__(self):
+    return self._count
+
+  def _string(self, offset, length):
+    if offset == NO_STRING:
+      return None
+    start = self._strings + offset
+    return str(self._view[start:start + length], 'utf-8')
+
+  def _entry(self, idx):
+    country, reason, handle_offset, handle_length, description_offset, description_length = RECORD.unpack_from(
+      self._view, self._records + idx * RECORD.size)
+    return OverlayEntry(self._asns[idx],
+                        self._string(handle_offset, handle_length),
+                        self._string(description_offset, description_length),
+                        country.decode('ascii') if country != b'\0\0' else None,
+                        REASONS[reason])
+
+  def __iter__(self):
+    return map(self._entry, range(self._count))
+
+  def __contains__(self, asn):
+    idx = bisect_left(self._asns, asn)
+    return idx < self._count and self._asns[idx] == asn
+
+  def lookup(self, asn):
+    """Return the OverlayEntry for asn, or None if the overlay has none."""
+    idx = bisect_left(self._asns, asn)
+    if idx < self._count and self._asns[idx] == asn:
+      return self._entry(idx)
+    return None
+
+  def lookup_range(self, start, end):
+    """Yield the entries with start <= asn <= end in ASN order."""
+    for idx in range(bisect_left(self._asns, start), bisect_right(self._asns, end)):
+      yield self._entry(idx)
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Compile a validated overlay into a memory-mappable binary file.')
+  parser.add_argument('overlay', nargs='?', default='overlay.json', help='Overlay file (default: overlay.json)')
+  parser.add_argument('-o', '--output', default='overlay.bin', help='Output file (default: overlay.bin)')
+  args = parser.parse_args()
+
+  if not validate_overlay(path=args.overlay):
+    print(f"✗ Not compiling {args.overlay}: fix the errors above first")
+    sys.exit(1)
+  count = compile_overlay(OverlayIndex.load(args.overlay), args.output)
+  print(f"✓ Compiled {count} entries to {args.output} ({os.path.getsize(args.output)} bytes)")
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Cross-check overlay.json against a missing list.
+
+The missing list has the layout of missing.json, one { "asn", "missing" }
+entry per AS with incomplete metadata. Both files are sorted by ASN and are
+walked together in a single sort-merge pass, so runtime is linear in the
+size of both files and memory stays flat. Reported:
+
+  incomplete-fix      error    an entry for an AS missing all metadata has no
+                               handle or no description
+  country-unresolved  warning  an AS missing its country has no entry, or one
+                               without a countryCode
+  not-missing         warning  an entry with reason 'missing' for an AS that
+                               the list no longer has
+
+Use the full missing list of an import, before the overlay is applied. The
+committed missing.json only lists ASes the overlay has not corrected yet, so
+against it every 'missing' entry is reported as no longer missing.
+"""
+
+import argparse
+import sys
+from functools import partial
+
+from apply_overlay import join_lines
+from validate import Finding, OverlayReader, ValidationResult, report_json, report_text
+
+MISSING_VALUES = ('all', 'country')
+
+
+def cross_check(overlay, missing):
+  """Cross-check overlay entries against a missing list; return a ValidationResult.
+
+  overlay and missing are iterables of (entry, line, column) sorted by ASN,
+  such as OverlayReader. Findings refer to overlay lines, and have none for
+  an AS without an entry. Raises ValueError
+  if either input is not sorted or the missing list has an unknown value.
+  """
+  errors = []
+  warnings = []
+  entries = listed = still_open = 0
+  for record, record_line, entry, line in join_lines(missing, overlay, ('missing list', 'overlay')):
+    if record is not None:
+      listed += 1
+      value = record.get('missing')
+      if value not in MISSING_VALUES:
+        raise ValueError(f"missing list line {record_line}: AS{record['asn']} has unknown missing value {value!r}")
+      if entry is None:
+        still_open += 1
+        if value == 'country':
+          asn = record['asn']
+          warnings.append(Finding('warning', 'country-unresolved', None, asn,
+                                  f"Missing list line {record_line}: ASN {asn} is missing its country, and no "
+                                  f"entry resolves it"))
+        continue
+    entries += 1
+    asn = entry['asn']
+    if record is None:
+      if entry.get('reason') == 'missing':
+        warnings.append(Finding('warning', 'not-missing', line, asn,
+                                f"Line {line}: ASN {asn} is no longer listed as missing; the entry may not be needed"))
+    elif value == 'all':
+      absent = [field for field in ('handle', 'description') if not entry.get(field)]
+      if absent:
+        errors.append(Finding('error', 'incomplete-fix', line, asn,
+                              f"Line {line}: ASN {asn} is missing all metadata, but the entry has no "
+                              f"{' or '.join(absent)}"))
+    elif not entry.get('countryCode'):
+      warnings.append(Finding('warning', 'country-unresolved', line, asn,
+                              f"Line {line}: ASN {asn} is missing its country, but the entry has no countryCode"))
+  note = f"Cross-checked {entries} entries against {listed} missing ASNs ({still_open} without an entry)"
+  return ValidationResult(errors, warnings, entries, [note])
+
+
+def summary(result):
+  """Return the closing line of the text report of a cross_check() result."""
+  if result.errors:
+    return f"✗ Cross-check failed with {len(result.errors)} error(s) and {len(result.warnings)} warning(s)"
+  warnings = f" (with {len(result.warnings)} warnings)" if result.warnings else ''
+  return f"✓ No conflicts between {result.count} entries and the missing list{warnings}"
+
+
+def cross_check_paths(overlay_path, missing_path):
+  """Cross-check the files at overlay_path and missing_path; see cross_check()."""
+  with open(overlay_path, encoding='utf-8') as overlay, open(missing_path, encoding='utf-8') as missing:
+    return cross_check(OverlayReader(overlay), OverlayReader(missing))
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Cross-check overlay.json against a missing list.')
+  parser.add_argument('missing', help='Missing list in the layout of missing.json, sorted by ASN')
+  parser.add_argument('--overlay', default='overlay.json', help='Overlay file (default: overlay.json)')
+  parser.add_argument('--format', choices=('json', 'text'), default='text', help='Report format (default: text)')
+  args = parser.parse_args()
+
+  try:
+    result = cross_check_paths(args.overlay, args.missing)
+  except (OSError, ValueError) as e:
+    print(f"✗ {e}", file=sys.stderr)
+    sys.exit(1)
+  report = report_json if args.format == 'json' else partial(report_text, summary=summary)
+  sys.exit(0 if report(result) else 1)
+
+
+if __name__ == '__main__':
+  main()
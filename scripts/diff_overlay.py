@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""Write the changes between two overlay versions as a JSON Lines delta.
+
+Both versions are streamed and compared in one sort-merge pass. Each line
+of the delta is one operation, in ASN order:
+
+  {"op": "add", "asn": 64512, "entry": {...}}
+  {"op": "remove", "asn": 64513}
+  {"op": "update", "asn": 64514, "set": {"countryCode": "DE"}, "unset": ["handle"]}
+
+followed by a last line with the size and checksum of the new version:
+
+  {"op": "checksum", "entries": 98, "checksum": "..."}
+
+The checksum is the sum, modulo 2**256, of the SHA-256 of every entry
+serialized as compact JSON with sorted keys. Being a sum, it can be kept up
+to date while applying a delta in O(changes): subtract the digests of
+replaced entries and add those of their replacements (see apply_delta()).
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+from apply_overlay import join
+from validate import OverlayReader
+
+CHECKSUM_MODULUS = 1 << 256
+_ABSENT = object()
+
+
+def entry_digest(entry):
+  """Return the SHA-256 of entry as an integer."""
+  text = json.dumps(entry, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+  return int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest(), 'big')
+
+
+def format_checksum(value):
+  return f'{value:064x}'
+
+
+def state_checksum(entries):
+  """Return the checksum of an overlay state, an iterable of entries."""
+  return format_checksum(sum(map(entry_digest, entries)) % CHECKSUM_MODULUS)
+
+
+def diff(old, new):
+  """Yield the delta operations that turn old into new.
+
+  old and new are iterables of (entry, line, column) sorted by ASN, such as
+  OverlayReader. The last operation is the checksum of new.
+  """
+  checksum = 0
+  count = 0
+  for before, after in join(old, new):
+    if after is not None:
+      checksum += entry_digest(after)
+      count += 1
+    if before is None:
+      yield {'op': 'add', 'asn': after['asn'], 'entry': after}
+    elif after is None:
+      yield {'op': 'remove', 'asn': before['asn']}
+    elif before != after:
+      changed = {field: value for field, value in after.items() if before.get(field, _ABSENT) != value}
+      removed = [field for field in before if field not in after]
+      op = {'op': 'update', 'asn': after['asn'], 'set': changed}
+      if removed:
+        op['unset'] = removed
+      yield op
+  yield {'op': 'checksum', 'entries': count, 'checksum': format_checksum(checksum % CHECKSUM_MODULUS)}
+
+
+def write_delta(ops, f):
+  """Write ops to f as JSON Lines; return the counts of each operation."""
+  encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+  counts = {'add': 0, 'remove': 0, 'update': 0}
+  for op in ops:
+    f.write(encode(op))
+    f.write('\n')
+    if op['op'] in counts:
+      counts[op['op']] += 1
+  return counts
+
+
+def apply_delta(state, ops, checksum=None):
+  """Apply delta operations to state, a dict of entries by ASN, in place.
+
+  checksum is the checksum of state before the delta; it is computed if
+  not given, which takes time proportional to the size of state. Each
+  operation then updates it in constant time, and the checksum operation
+  is verified against it. Returns the new checksum; raises ValueError if an
+  operation does not fit state or the checksum does not match.
+  """
+  value = int(checksum, 16) if checksum is not None else sum(map(entry_digest, state.values()))
+  for op in ops:
+    kind = op['op']
+    asn = op.get('asn')
+    if kind == 'checksum':
+      if len(state) != op['entries'] or format_checksum(value % CHECKSUM_MODULUS) != op['checksum']:
+        raise ValueError("Checksum mismatch: the delta does not apply to this overlay version")
+      continue
+    if (kind == 'add') == (asn in state):
+      raise ValueError(f"Cannot {kind} AS{asn}: it is {'already' if asn in state else 'not'} in the overlay")
+    if kind == 'add':
+      entry = op['entry']
+    else:
+      value -= entry_digest(state[asn])
+      if kind == 'remove':
+        del state[asn]
+        continue
+      entry = {**state[asn], **op['set']}
+      for field in op.get('unset', ()):
+        entry.pop(field, None)
+    state[asn] = entry
+    value += entry_digest(entry)
+  return format_checksum(value % CHECKSUM_MODULUS)
+
+
+@contextmanager
+def open_version(source, rev=None):
+  """Open an overlay version for reading: the file source, or source at git revision rev."""
+  if rev is None:
+    with open(source, encoding='utf-8') as f:
+      yield f
+    return
+  path = Path(source)
+  process = subprocess.Popen(['git', 'show', f'{rev}:./{path.name}'], cwd=path.parent, stdout=subprocess.PIPE,
+                             stderr=subprocess.PIPE, encoding='utf-8')
+  try:
+    yield process.stdout
+  finally:
+    process.stdout.close()
+    error = process.stderr.read()
+    process.stderr.close()
+    if process.wait() != 0 and error:
+      # Also replaces the decoding error caused by the missing output
+      raise ValueError(f"cannot read {path} at {rev}: {error.strip()}")
+
+
+def diff_overlay(old, new, output=None, rev=False, path='overlay.json'):
+  """Write the delta from overlay old to new to output (default stdout).
+
+  With rev=True, old and new are git revisions of the overlay at path.
+  Returns the counts of each operation.
+  """
+  with open_version(path if rev else old, old if rev else None) as before, \
+       open_version(path if rev else new, new if rev else None) as after:
+    ops = diff(OverlayReader(before), OverlayReader(after))
+    if output is None:
+      return write_delta(ops, sys.stdout)
+    output = Path(output)
+    fd, tmp = tempfile.mkstemp(dir=output.parent, prefix=f'.{output.name}.')
+    try:
+      with os.fdopen(fd, 'w', encoding='utf-8') as out:
+        counts = write_delta(ops, out)
+      os.replace(tmp, output)
+    except BaseException:
+      os.unlink(tmp)
+      raise
+    return counts
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Write the changes between two overlay versions as JSON Lines.')
+  parser.add_argument('old', help='Old overlay file, or git revision with --git')
+  parser.add_argument('new', help='New overlay file, or git revision with --git')
+  parser.add_argument('--git', action='store_true', help='Compare two git revisions of --path')
+  parser.add_argument('--path', default='overlay.json', help='Overlay file for --git (default: overlay.json)')
+  parser.add_argument('-o', '--output', help='Output file (default: stdout)')
+  args = parser.parse_args()
+
+  try:
+    counts = diff_overlay(args.old, args.new, args.output, args.git, args.path)
+  except (OSError, ValueError) as e:
+    print(f"✗ {e}", file=sys.stderr)
+    sys.exit(1)
+  print(f"✓ {counts['add']} added, {counts['remove']} removed, {counts['update']} updated", file=sys.stderr)
+
+
+if __name__ == '__main__':
+  main()
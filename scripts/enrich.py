@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""Attach overlay metadata to streams of ASNs or JSON Lines records.
+
+  printf '13335\\nAS4134\\n' | python scripts/enrich.py
+  zcat flows.jsonl.gz | python scripts/enrich.py --field src_as --prefix src_ > enriched.jsonl
+
+Each input line is an ASN, optionally written AS13335, or a JSON object
+whose --field holds the ASN as a number or an "AS..." string. An ASN line
+becomes a JSON object with the ASN and the handle, description,
+countryCode and reason the overlay has for it (just the ASN if it has
+none); a record gets the same fields added. --prefix is prepended to the
+names of the added fields. Records without an ASN in --field pass through
+unchanged; lines that are neither are skipped and counted.
+
+The overlay is loaded once: overlay.json into an OverlayIndex, a file from
+compile_overlay.py with --compiled, or a shard manifest with --shards.
+Lines are read and written in batches of --batch-size through large
+buffers, and the encoded result for each ASN is kept in an LRU cache, so
+the hot ASNs of a flow log cost one cache hit per line.
+"""
+
+import argparse
+import json
+import sys
+import time
+from functools import lru_cache
+from itertools import islice
+
+from overlay_index import FIELDS, OverlayIndex
+
+DEFAULT_BATCH_SIZE = 8192
+DEFAULT_CACHE_SIZE = 65536
+BUFFER_SIZE = 1 << 20
+
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+
+
+def parse_asn(value):
+  """Return the ASN in an int, or a str or bytes like '13335' or 'AS13335'; raise ValueError otherwise."""
+  if isinstance(value, bool):
+    raise ValueError(f"not an ASN: {value!r}")
+  if isinstance(value, int):
+    asn = value
+  elif isinstance(value, (str, bytes)):
+    value = value.strip()
+    if value[:2] in ('AS', 'as', b'AS', b'as'):
+      value = value[2:]
+    asn = int(value)
+  else:
+    raise ValueError(f"not an ASN: {value!r}")
+  if asn < 0:
+    raise ValueError(f"not an ASN: {value!r}")
+  return asn
+
+
+class Enricher:
+  """Look up ASNs in an overlay index and encode the results, caching the hot ones.
+
+  index is anything with lookup(asn) returning an OverlayEntry or None:
+  OverlayIndex, CompiledOverlay or ShardedOverlay.
+  """
+
+  def __init__(self, index, field='asn', prefix='', cache_size=DEFAULT_CACHE_SIZE):
+    self.index = index
+    self.field = field
+    self.prefix = prefix
+    self.stats = {'records': 0, 'matched': 0, 'skipped': 0}
+    self._fields = lru_cache(maxsize=cache_size)(self._lookup_fields)
+    self._line = lru_cache(maxsize=cache_size)(self._encode_line)
+    self._members = lru_cache(maxsize=cache_size)(self._encode_fields)
+
+  def _lookup_fields(self, asn):
+    """Return the (name, value) pairs to add for asn; empty if the overlay has no entry."""
+    entry = self.index.lookup(asn)
+    if entry is None:
+      return ()
+    return tuple((self.prefix + name, value) for name, value in zip(FIELDS[1:], entry[1:]) if value is not None)
+
+  def _encode_line(self, asn):
+    fields = self._fields(asn)
+    return (_encode({'asn': asn, **dict(fields)}) + '\n').encode('utf-8'), bool(fields)
+
+  def _encode_fields(self, asn):
+    """Return the added fields for asn encoded as JSON object members, without braces."""
+    fields = self._fields(asn)
+    return _encode(dict(fields))[1:-1].encode('utf-8') if fields else b''
+
+  def _enrich_record(self, line):
+    """Return (encoded, found) for a JSON Lines record, or None if it is not a JSON object.
+
+    Rather than re-encoding the record, the cached encoded fields are spliced
+    in before its closing brace, unless it already has fields of those names.
+    """
+    try:
+      record = json.loads(line)
+    except ValueError:
+      return None
+    if not isinstance(record, dict):
+      return None
+    try:
+      asn = parse_asn(record.get(self.field))
+    except ValueError:
+      return line.strip() + b'\n', False
+    fields = self._fields(asn)
+    if not fields:
+      return line.strip() + b'\n', False
+    if any(name in record for name, _ in fields):
+      record.update(fields)
+      return (_encode(record) + '\n').encode('utf-8'), True
+    return b''.join((line.rstrip()[:-1], b',', self._members(asn), b'}\n')), True
+
+  def enrich_lines(self, lines):
+    """Return the encoded output for a batch of input lines, given as bytes."""
+    out = []
+    stats = self.stats
+    matched = skipped = 0
+    for line in lines:
+      # Bare decimal ASNs, by far the common case, take the first branch.
+      try:
+        asn = int(line)
+      except ValueError:
+        if line.lstrip()[:1] == b'{':
+          result = self._enrich_record(line)
+        else:
+          try:
+            result = self._line(parse_asn(line))
+          except ValueError:
+            result = None
+        if result is None:
+          skipped += bool(line.strip())
+          continue
+      else:
+        if asn < 0:
+          skipped += 1
+          continue
+        result = self._line(asn)
+      out.append(result[0])
+      matched += result[1]
+    stats['records'] += len(out)
+    stats['matched'] += matched
+    stats['skipped'] += skipped
+    return b''.join(out)
+
+  def enrich_stream(self, infile, outfile, batch_size=DEFAULT_BATCH_SIZE):
+    """Enrich the lines of binary file infile into binary file outfile, batch_size lines at a time.
+
+    outfile is flushed after each batch, so results flow downstream as input
+    arrives. Returns the stats.
+    """
+    while True:
+      lines = list(islice(infile, batch_size))
+      if not lines:
+        return self.stats
+      outfile.write(self.enrich_lines(lines))
+      outfile.flush()
+
+
+def load_index(overlay=None, compiled=None, shards=None):
+  """Open the overlay to enrich from: a compiled file, a shard manifest or overlay.json."""
+  if compiled is not None:
+    from compile_overlay import CompiledOverlay
+    return CompiledOverlay(compiled)
+  if shards is not None:
+    from shard_overlay import ShardedOverlay
+    return ShardedOverlay(shards)
+  return OverlayIndex.load(overlay or 'overlay.json')
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Attach overlay metadata to ASNs or JSON Lines records on stdin.')
+  source = parser.add_mutually_exclusive_group()
+  source.add_argument('--overlay', default='overlay.json', help='Overlay file (default: overlay.json)')
+  source.add_argument('--compiled', metavar='PATH', help='Compiled overlay from compile_overlay.py')
+  source.add_argument('--shards', metavar='MANIFEST', help='Shard manifest from shard_overlay.py')
+  parser.add_argument('--field', default='asn', help='Field of JSON records holding the ASN (default: asn)')
+  parser.add_argument('--prefix', default='', help='Prefix for the names of the added fields (default: none)')
+  parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, metavar='N',
+                      help=f'Lines read and written at a time (default: {DEFAULT_BATCH_SIZE})')
+  parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE, metavar='N',
+                      help=f'ASNs kept in the LRU cache; 0 disables it (default: {DEFAULT_CACHE_SIZE})')
+  parser.add_argument('--quiet', action='store_true', help='Do not print a summary on stderr')
+  args = parser.parse_args()
+  if args.batch_size < 1:
+    parser.error('--batch-size must be at least 1')
+  if args.cache_size < 0:
+    parser.error('--cache-size must not be negative')
+
+  try:
+    index = load_index(args.overlay, args.compiled, args.shards)
+  except (OSError, ValueError) as e:
+    print(f"✗ {e}", file=sys.stderr)
+    sys.exit(1)
+
+  enricher = Enricher(index, args.field, args.prefix, args.cache_size)
+  start = time.perf_counter()
+  with open(sys.stdin.fileno(), 'rb', buffering=BUFFER_SIZE, closefd=False) as infile, \
+       open(sys.stdout.fileno(), 'wb', buffering=BUFFER_SIZE, closefd=False) as outfile:
+    try:
+      stats = enricher.enrich_stream(infile, outfile, args.batch_size)
+    except BrokenPipeError:
+      sys.exit(1)
+  elapsed = time.perf_counter() - start
+  if not args.quiet:
+    rate = stats['records'] / elapsed if elapsed else 0
+    print(f"✓ Enriched {stats['records']} records ({stats['matched']} in the overlay, {stats['skipped']} lines "
+          f"skipped) at {rate:,.0f} records/s", file=sys.stderr)
+
+
+if __name__ == '__main__':
+  main()
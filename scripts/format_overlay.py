@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""Rewrite an overlay file in canonical form.
+
+Canonical form is the layout of overlay.json: entries sorted by ASN, keys
+in the order asn, handle, description, countryCode, reason (unknown keys
+last, in their original order), one compact object per line.
+
+Entries are read with the streaming OverlayReader and sorted in runs of at
+most run_size entries. An input that fits in one run is sorted in memory;
+larger inputs are spilled to sorted temporary runs and merged, so memory is
+bounded by the run size for files of any size. Output goes to a temporary
+file next to the destination, which then replaces it, so the input can be
+rewritten in place. Entries with the same ASN are kept, in input order, and
+reported.
+"""
+
+import argparse
+import heapq
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+from validate import OverlayReader
+
+FIELD_ORDER = ('asn', 'handle', 'description', 'countryCode', 'reason')
+DEFAULT_RUN_SIZE = 200000
+
+
+def canonical_entry(entry):
+  """Return entry with its keys in canonical order."""
+  if not isinstance(entry, dict):
+    return entry
+  ordered = {key: entry[key] for key in FIELD_ORDER if key in entry}
+  ordered.update((key, value) for key, value in entry.items() if key not in ordered)
+  return ordered
+
+
+def format_entry(entry):
+  """Return the overlay.json line for entry, without indent or separator."""
+  text = json.dumps(canonical_entry(entry), ensure_ascii=False)
+  if isinstance(entry, dict) and entry:
+    return f"{{ {text[1:-1]} }}"
+  return text
+
+
+def _sort_key(entry, seq):
+  """Sort by ASN; entries without an integer ASN go last, in input order."""
+  asn = entry.get('asn') if isinstance(entry, dict) else None
+  if isinstance(asn, int) and not isinstance(asn, bool):
+    return (0, asn, seq)
+  return (1, 0, seq)
+
+
+class _Runs:
+  """Sorted runs of (key, line, text) records spilled to temporary files."""
+
+  def __init__(self, directory):
+    self.directory = directory
+    self.files = []
+
+  def spill(self, records):
+    records.sort()
+    f = tempfile.TemporaryFile('w+', encoding='utf-8', dir=self.directory)
+    for key, line, text in records:
+      f.write(json.dumps([key, line, text], ensure_ascii=False))
+      f.write('\n')
+    f.seek(0)
+    self.files.append(f)
+
+  def merge(self):
+    def read(f):
+      for row in f:
+        key, line, text = json.loads(row)
+        yield tuple(key), line, text
+    return heapq.merge(*(read(f) for f in self.files))
+
+  def close(self):
+    for f in self.files:
+      f.close()
+
+
+def sorted_entries(reader, run_size=DEFAULT_RUN_SIZE, directory=None):
+  """Yield (key, line, text) for the entries of reader in canonical order.
+
+  key is the sort key of the entry, line its line in the input and text its
+  formatted line.
+  """
+  records = []
+  runs = _Runs(directory)
+  try:
+    for seq, (entry, line, _) in enumerate(reader):
+      records.append((_sort_key(entry, seq), line, format_entry(entry)))
+      if len(records) >= run_size:
+        runs.spill(records)
+        records = []
+    if not runs.files:
+      records.sort()
+      yield from records
+      return
+    if records:
+      runs.spill(records)
+      records = []
+    yield from runs.merge()
+  finally:
+    runs.close()
+
+
+def write_overlay(records, f, duplicates=None):
+  """Write sorted (key, line, text) records as an overlay document to f.
+
+  If duplicates is a list, (asn, first line, line) is appended to it for each
+  entry whose ASN was already written. Returns the number of entries written.
+  """
+  count = 0
+  previous = None   # (asn, line) of the last entry with an integer ASN
+  f.write('{\n  "as": [')
+  for key, line, text in records:
+    f.write(',\n    ' if count else '\n    ')
+    f.write(text)
+    count += 1
+    if key[0] == 0:
+      if previous is not None and previous[0] == key[1]:
+        if duplicates is not None:
+          duplicates.append((key[1], previous[1], line))
+      else:
+        previous = (key[1], line)
+  f.write('\n  ]\n}\n' if count else ']\n}\n')
+  return count
+
+
+def format_overlay(path, output=None, run_size=DEFAULT_RUN_SIZE, duplicates=None):
+  """Rewrite the overlay at path in canonical form to output (default: path).
+
+  Returns (entries, changed), where changed is True if output did not
+  already hold the canonical text. An output that is already canonical is
+  left untouched. Raises json.JSONDecodeError and OverlayShapeError for
+  input that cannot be formatted, and ValueError for top-level keys other
+  than 'as', which canonical form would drop.
+  """
+  path = Path(path)
+  output = Path(output) if output is not None else path
+  fd, tmp = tempfile.mkstemp(dir=output.parent, prefix=f'.{output.name}.')
+  try:
+    with open(path, encoding='utf-8') as f, os.fdopen(fd, 'w', encoding='utf-8') as out:
+      reader = OverlayReader(f)
+      count = write_overlay(sorted_entries(reader, run_size, output.parent), out, duplicates)
+      other = [key for key in reader.keys if key != 'as']
+      if other:
+        raise ValueError(f"{path} has top-level keys other than 'as': {', '.join(other)}")
+      if reader.arrays > 1:
+        raise ValueError(f"{path} has more than one 'as' key")
+    changed = not output.exists() or not _same_file(tmp, output)
+    if changed:
+      os.replace(tmp, output)
+    return count, changed
+  finally:
+    if os.path.exists(tmp):
+      os.unlink(tmp)
+
+
+def _same_file(a, b, chunk_size=1 << 16):
+  with open(a, 'rb') as fa, open(b, 'rb') as fb:
+    while True:
+      chunk = fa.read(chunk_size)
+      if chunk != fb.read(chunk_size):
+        return False
+      if not chunk:
+        return True
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Rewrite an overlay file in canonical form.')
+  parser.add_argument('overlay', nargs='?', default='overlay.json', help='Overlay file (default: overlay.json)')
+  parser.add_argument('-o', '--output', help='Write to this file instead of rewriting the overlay in place')
+  parser.add_argument('--check', action='store_true',
+                      help='Exit with status 1 if the overlay is not in canonical form instead of rewriting it')
+  parser.add_argument('--run-size', type=int, default=DEFAULT_RUN_SIZE,
+                      help=f'Entries sorted in memory at a time (default: {DEFAULT_RUN_SIZE})')
+  args = parser.parse_args()
+
+  duplicates = []
+  try:
+    if args.check:
+      with tempfile.TemporaryDirectory() as tmp:
+        formatted = Path(tmp) / 'overlay.json'
+        count, _ = format_overlay(args.overlay, formatted, args.run_size, duplicates)
+        changed = not _same_file(formatted, args.overlay)
+    else:
+      count, changed = format_overlay(args.overlay, args.output, args.run_size, duplicates)
+  except json.JSONDecodeError as e:
+    print(f"Error: Invalid JSON syntax: {e}")
+    sys.exit(1)
+  except (OSError, ValueError) as e:
+    print(f"Error: {e}")
+    sys.exit(1)
+
+  for asn, first, line in duplicates:
+    print(f"  ✗ Line {line}: Duplicate ASN {asn} (first on line {first})")
+
+  target = args.output or args.overlay
+  if args.check:
+    print(f"✗ {args.overlay} is not in canonical form" if changed else f"✓ {args.overlay} is in canonical form")
+  elif changed:
+    print(f"✓ Formatted {count} entries into {target}")
+  else:
+    print(f"✓ {target} is already in canonical form")
+  if duplicates:
+    print(f"✗ {len(duplicates)} duplicate ASN(s) kept; resolve them by hand")
+  sys.exit(1 if duplicates or (args.check and changed) else 0)
+
+
+if __name__ == '__main__':
+  main()
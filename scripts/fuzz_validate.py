@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""Differential fuzzing of validate.py's fast paths against its reference checks.
+
+  python scripts/fuzz_validate.py --cases 100000 --jobs 8
+  python scripts/fuzz_validate.py --seed 3 --case 1234 --path stream
+
+Each case is a small overlay of generated entries: ASNs at the edges of
+MAX_ASN and of the reserved, private and other IANA ranges or of the wrong
+type, unicode and overlong handles, near-identical descriptions, fields
+missing, unexpected or out of order, and ASNs duplicated or out of order.
+The reference is validate_data() checking the entries one by one, with
+the near_duplicates() checks on; every
+fast path in FAST_PATHS validates the same case in memory and must report
+exactly the same findings and counts (less what the path leaves out by
+design, such as near_duplicates() when streaming). An exception anywhere,
+the reference included, is a failure. Cases are checked
+in parallel worker processes, and each is derived from --seed and its
+number, so a failure reproduces with --case. A failing case is shrunk to
+the fewest entries that still disagree before it is reported.
+
+A new fast path gets compared by registering it with @fast_path.
+"""
+
+import argparse
+import io
+import json
+import random
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from validate import (
+  ASN_REGISTRY, MAX_ASN, MAX_DESCRIPTION_LENGTH, MAX_HANDLE_LENGTH, PRIVATE_ASN_RANGES, RESERVED_ASN_RANGES,
+  RESERVED_ASNS, VALID_COUNTRY_CODES, OverlayWatcher, _CanonicalPositions, _Checker, _check_chunk, _check_columns,
+  _identity, _merge_chunks, _numpy, _validate_stream, near_duplicates, validate_bytes, validate_data,
+)
+
+DEFAULT_CASES = 10000
+DEFAULT_ENTRIES = 60
+BATCH_CASES = 200
+NEAR_DUPLICATE_CODES = frozenset({'similar-description', 'handle-collision'})
+
+
+def _boundary_asns():
+  edges = {0, 1, 2, MAX_ASN - 1, MAX_ASN, MAX_ASN + 1, 1 << 32, 1 << 63}
+  ranges = RESERVED_ASN_RANGES + PRIVATE_ASN_RANGES + [(r.start, r.end) for r in ASN_REGISTRY]
+  for start, end in ranges + [(asn, asn) for asn in RESERVED_ASNS]:
+    edges.update((start - 1, start, start + 1, end - 1, end, end + 1))
+  return sorted(edges)
+
+
+BOUNDARY_ASNS = _boundary_asns()
+ODD_ASNS = [-1, -65536, True, False, 2.0, 13335.5, '13335', 'AS13335', None, [13335]]
+
+_WORDS = ['Acme', 'Telecom', 'Network', 'Data', 'Cloud', 'Bank', 'Global', 'Fibra', 'Net', 'Online', 'Systems']
+_UNICODE = ['ÄRZTE', 'ТЕЛЕКОМ', 'STRAẞE', 'ß', 'İSTANBUL', 'ǅ', '网络', 'CAFÉ', '🛰', 'ÆØÅ', 'ﬁ']
+_SUFFIXES = ['Ltd.', 'LLC', 'Inc', 'S.A.', 'GmbH', 'Sdn Bhd', 'Limited', '']
+_COUNTRIES = sorted(VALID_COUNTRY_CODES)
+_ODD_VALUES = ['', None, 0, 7, True, ['X'], {'x': 1}]
+NON_OBJECTS = [[13335], ['asn', 13335], [], 'AS13335', '', 13335, 13335.5, True, None]
+FIELD_ORDER = ('asn', 'handle', 'description', 'countryCode', 'reason')
+
+Case = namedtuple('Case', 'number entries text before_text max_errors chunk_size')
+
+
+def _handle(rng):
+  roll = rng.random()
+  if roll < 0.6:
+    return '-'.join(rng.sample(_WORDS, rng.randint(1, 3))).upper() + rng.choice(['-AS', '', f'{rng.randint(1, 99)}'])
+  if roll < 0.75:
+    return rng.choice(_UNICODE) + rng.choice(['-NET', '-AS', '', 'ǆ'])
+  if roll < 0.85:
+    return 'A' * (MAX_HANDLE_LENGTH + rng.randint(-1, 1))
+  if roll < 0.9:
+    return rng.choice(['acme-net', 'ACME NET', ' ACME', 'Acme_Net', 'ACME-NET '])
+  return rng.choice(_ODD_VALUES)
+
+
+def _description(rng, names):
+  roll = rng.random()
+  if roll < 0.7:
+    name = rng.choice(names)
+    variant = rng.random()
+    if variant < 0.2 and name:
+      idx = rng.randrange(len(name))
+      return name[:idx] + rng.choice('aeiouxyz') + name[idx + 1:]
+    if variant < 0.3:
+      return name.upper()
+    if variant < 0.4:
+      return name.replace(' ', ', ')
+    return name
+  if roll < 0.8:
+    return 'D' * (MAX_DESCRIPTION_LENGTH + rng.randint(-1, 1))
+  if roll < 0.9:
+    return rng.choice(['Société Générale', 'Ümit Telekom A.Ş.', '東京通信株式会社', 'Straße Netz', 'Ağ ﬁber'])
+  return rng.choice(_ODD_VALUES)
+
+
+def _value(rng, good, odd):
+  return good() if rng.random() < 0.9 else rng.choice(odd)
+
+
+def random_entry(rng, asn, names):
+  """Return an entry for asn, mostly well-formed, with fields in random order now and then."""
+  entry = {} if asn is None else {'asn': asn}
+  roll = rng.random()
+  if roll < 0.6:
+    fields = ['handle', 'description', 'countryCode', 'reason']
+  elif roll < 0.85:
+    fields = ['countryCode', 'reason']
+  else:
+    fields = [field for field in FIELD_ORDER[1:] if rng.random() < 0.5]
+  for field in fields:
+    if field == 'handle':
+      entry[field] = _handle(rng)
+    elif field == 'description':
+      entry[field] = _description(rng, names)
+    elif field == 'countryCode':
+      entry[field] = _value(rng, lambda: rng.choice(_COUNTRIES), ['XX', 'us', 'USA', 'U', '', None, 840, ['US']])
+    else:
+      entry[field] = _value(rng, lambda: rng.choice(['missing', 'missing', 'internal', 'inferred-fix']),
+                            ['unknown', 'Missing', '', None, 1, ['missing']])
+  if rng.random() < 0.03:
+    entry[rng.choice(['comment', 'source', 'Handle'])] = 'x'
+  if rng.random() < 0.05:
+    items = list(entry.items())
+    rng.shuffle(items)
+    entry = dict(items)
+  return entry
+
+
+def random_entries(rng, count):
+  """Return count entries with mostly ascending ASNs, some of them at range boundaries."""
+  names = [' '.join(rng.sample(_WORDS, rng.randint(1, 3)) + [rng.choice(_SUFFIXES)]).strip()
+           for _ in range(rng.randint(1, 8))]
+  entries = []
+  asn = rng.choice([0, rng.randrange(MAX_ASN)])
+  for _ in range(count):
+    roll = rng.random()
+    if roll < 0.15:
+      value = asn = rng.choice(BOUNDARY_ASNS)
+    elif roll < 0.2:
+      value = rng.choice(ODD_ASNS + [None])   # None: no 'asn' field at all
+    elif roll < 0.22:
+      entries.append(rng.choice(NON_OBJECTS))
+      continue
+    else:
+      asn += rng.choice([1, 1, 2, rng.randint(1, 1 << rng.randint(1, 32))])
+      value = asn
+    entries.append(random_entry(rng, value, names))
+  # Out-of-order entries and duplicates
+  for _ in range(rng.choice([0, 0, 1, 2, 5])):
+    if len(entries) >= 2:
+      i, j = rng.randrange(len(entries)), rng.randrange(len(entries))
+      if rng.random() < 0.5:
+        entries[i], entries[j] = entries[j], entries[i]
+      elif isinstance(entries[i], dict) and isinstance(entries[j], dict) and 'asn' in entries[j]:
+        entries[i] = {**entries[i], 'asn': entries[j]['asn']}
+  return entries
+
+
+def edit_entries(rng, entries):
+  """Return a copy of entries with one entry replaced, inserted or removed."""
+  entries = list(entries)
+  idx = rng.randint(0, len(entries))
+  roll = rng.random()
+  if roll < 0.4 and idx < len(entries):
+    asn = entries[idx].get('asn') if isinstance(entries[idx], dict) else None
+    entries[idx] = random_entry(rng, asn, ['Acme Telecom', 'Data Net Ltd.'])
+  elif roll < 0.7 or not entries:
+    entries.insert(idx, random_entries(rng, 1)[0])
+  else:
+    del entries[min(idx, len(entries) - 1)]
+  return entries
+
+
+def overlay_text(entries):
+  """Return entries laid out as overlay.json is, one entry per line from line 3."""
+  if not entries:
+    return '{\n  "as": []\n}\n'
+  lines = ',\n'.join(f"    {json.dumps(entry, ensure_ascii=False)}" for entry in entries)
+  return f'{{\n  "as": [\n{lines}\n  ]\n}}\n'
+
+
+def generate_case(seed, number, max_entries=DEFAULT_ENTRIES):
+  """Return case number of the run with seed; the same arguments always give the same case."""
+  rng = random.Random(f'{seed}:{number}')
+  entries = random_entries(rng, rng.randint(0, max_entries))
+  before = edit_entries(rng, entries)
+  return make_case(number, entries, overlay_text(before), rng.randint(1, 5), rng.randint(1, max(1, len(entries))))
+
+
+def make_case(number, entries, before_text, max_errors, chunk_size):
+  return Case(number, entries, overlay_text(entries), before_text, max_errors, chunk_size)
+
+
+# Fast paths: name -> (run, near_duplicates, budget)
+FAST_PATHS = {}
+
+
+def fast_path(name, near_duplicates=True, budget=False):
+  """Register run(case), returning the ValidationResult for case.entries, for comparison with the reference.
+
+  near_duplicates=False marks paths that leave out the near_duplicates()
+  warnings, and budget=True those that stop at case.max_errors errors.
+  """
+  def register(run):
+    FAST_PATHS[name] = (run, near_duplicates, budget)
+    return run
+  return register
+
+
+@fast_path('text')
+def _run_text(case):
+  return validate_bytes(case.text.encode('utf-8'), similar=True)
+
+
+@fast_path('stream', near_duplicates=False)
+def _run_stream(case):
+  return _validate_stream(io.StringIO(case.text))
+
+
+@fast_path('error-budget', budget=True)
+def _run_error_budget(case):
+  return validate_data({'as': case.entries}, max_errors=case.max_errors, similar=True)
+
+
+@fast_path('stream-error-budget', near_duplicates=False, budget=True)
+def _run_stream_error_budget(case):
+  return validate_bytes(case.text, max_errors=case.max_errors)
+
+
+def _add_near_duplicates(checker, entries):
+  records = (_identity(entry, line) for entry, (line, _) in zip(entries, _CanonicalPositions(len(entries))))
+  checker.add_warnings(near_duplicates([record for record in records if record is not None]))
+  return checker.result()
+
+
+@fast_path('parallel')
+def _run_parallel(case):
+  # What validate_data(jobs=N) does, with the chunks checked in this process
+  entries = case.entries
+  size = case.chunk_size
+  checker = _Checker([], [])
+  chunks = [entries[start:start + size] for start in range(0, len(entries), size)]
+  _merge_chunks(map(_check_chunk, chunks), size, _CanonicalPositions(len(entries)), checker)
+  checker.count = len(entries)
+  return _add_near_duplicates(checker, entries)
+
+
+def _run_columns(case, numpy):
+  # What validate_data() does for large overlays
+  checker = _Checker([], [])
+  for idx, asn, head, tail, duplicate, previous in _check_columns(case.entries, numpy):
+    checker.count = idx + 1
+    checker.emit(idx + 3, asn, head, tail, duplicate, previous)
+  checker.count = len(case.entries)
+  return _add_near_duplicates(checker, case.entries)
+
+
+fast_path('columnar')(lambda case: _run_columns(case, None))
+if _numpy() is not None:
+  fast_path('columnar-numpy')(lambda case: _run_columns(case, _numpy()))
+
+
+@fast_path('watcher')
+def _run_watcher(case):
+  watcher = OverlayWatcher(similar=True)
+  watcher.update(case.before_text)
+  return watcher.update(case.text)
+
+
+@fast_path('watcher-error-budget', near_duplicates=False, budget=True)
+def _run_watcher_error_budget(case):
+  watcher = OverlayWatcher(max_errors=case.max_errors)
+  watcher.update(case.before_text)
+  return watcher.update(case.text)
+
+
+def _outcome(run, case):
+  """Return what run(case) reports, in a form that compares equal for equal verdicts."""
+  try:
+    result = run(case)
+  except Exception as e:
+    return ('raised', f"{type(e).__name__}: {e}")
+  return (result.count, result.stopped, [tuple(finding) for finding in result.errors],
+          [tuple(finding) for finding in result.warnings])
+
+
+def _reference(case):
+  """Return (outcome, findings in the order found) of the serial checks."""
+  findings = []
+  outcome = _outcome(lambda case: validate_data({'as': case.entries}, on_finding=findings.append, similar=True), case)
+  return outcome, [tuple(finding) for finding in findings]
+
+
+def expected_outcome(reference, case, near_duplicates=True, budget=False):
+  """Return the outcome a fast path should have, given the reference's."""
+  outcome, findings = reference
+  if not near_duplicates:
+    findings = [finding for finding in findings if finding[1] not in NEAR_DUPLICATE_CODES]
+  count = outcome[0]
+  stopped = False
+  if budget:
+    errors = 0
+    for idx, finding in enumerate(findings):
+      errors += finding[0] == 'error'
+      if errors == case.max_errors:
+        # Entries are on lines 3, 4, ...: the one with this error is the last checked
+        findings = findings[:idx + 1]
+        count = finding[2] - 2
+        stopped = True
+        break
+  return (count, stopped, [finding for finding in findings if finding[0] == 'error'],
+          [finding for finding in findings if finding[0] == 'warning'])
+
+
+def check_case(case, names=None):
+  """Return (name, expected, got) for each fast path that disagrees with the reference on case.
+
+  A reference that raises fails as path 'reference', before any fast path
+  is run.
+  """
+  reference = _reference(case)
+  if reference[0][0] == 'raised':
+    return [('reference', None, reference[0])]
+  mismatches = []
+  for name in names or FAST_PATHS:
+    if name == 'reference':
+      continue
+    run, near_duplicates, budget = FAST_PATHS[name]
+    expected = expected_outcome(reference, case, near_duplicates, budget)
+    got = _outcome(run, case)
+    if got != expected:
+      mismatches.append((name, expected, got))
+  return mismatches
+
+
+def shrink(case, name):
+  """Return the case with as few entries as possible on which fast path name still disagrees."""
+  def fails(entries):
+    return bool(check_case(case._replace(entries=entries, text=overlay_text(entries)), [name]))
+
+  entries = case.entries
+  size = len(entries) // 2 or 1
+  while entries:
+    idx = 0
+    while idx < len(entries):
+      candidate = entries[:idx] + entries[idx + size:]
+      if fails(candidate):
+        entries = candidate
+      else:
+        idx += size
+    if size == 1:
+      break
+    size //= 2
+  return case._replace(entries=entries, text=overlay_text(entries))
+
+
+def describe(expected, got):
+  """Return a one-line account of the first difference between two outcomes."""
+  if got[0] == 'raised':
+    return f"raised {got[1]}"
+  if expected[:2] != got[:2]:
+    return f"expected count={expected[0]} stopped={expected[1]}, got count={got[0]} stopped={got[1]}"
+  for kind, want, have in (('error', expected[2], got[2]), ('warning', expected[3], got[3])):
+    for idx in range(max(len(want), len(have))):
+      a = want[idx] if idx < len(want) else None
+      b = have[idx] if idx < len(have) else None
+      if a != b:
+        return f"{kind} {idx + 1}: expected {a[4] if a else 'none'}; got {b[4] if b else 'none'}"
+  return 'outcomes differ'
+
+
+Failure = namedtuple('Failure', 'number path entries max_errors chunk_size message')
+
+
+def run_cases(seed, start, stop, max_entries=DEFAULT_ENTRIES, names=None):
+  """Check cases start..stop-1; return (cases, entries, failures), shrinking each failure."""
+  entries = 0
+  failures = []
+  for number in range(start, stop):
+    case = generate_case(seed, number, max_entries)
+    entries += len(case.entries)
+    for name, expected, got in check_case(case, names):
+      small = shrink(case, name)
+      mismatch = check_case(small, [name])[0]
+      failures.append(Failure(number, name, small.entries, small.max_errors, small.chunk_size,
+                              describe(mismatch[1], mismatch[2])))
+  return stop - start, entries, failures
+
+
+def _run_batch(args):
+  return run_cases(*args)
+
+
+def fuzz(seed=0, cases=DEFAULT_CASES, jobs=1, max_entries=DEFAULT_ENTRIES, names=None, first=0):
+  """Check cases first..first+cases-1 across jobs processes and return a summary.
+
+  The summary has the number of cases and entries checked and the
+  Failures found, in case order.
+  """
+  batches = [(seed, start, min(start + BATCH_CASES, first + cases), max_entries, names)
+             for start in range(first, first + cases, BATCH_CASES)]
+  if jobs > 1 and len(batches) > 1:
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+      results = list(executor.map(_run_batch, batches))
+  else:
+    results = [_run_batch(batch) for batch in batches]
+  return {
+    'cases': sum(result[0] for result in results),
+    'entries': sum(result[1] for result in results),
+    'failures': [failure for result in results for failure in result[2]],
+  }
+
+
+def main():
+  parser = argparse.ArgumentParser(description="Compare validate.py's fast paths with its reference checks.")
+  parser.add_argument('--cases', type=int, default=DEFAULT_CASES, help=f'Cases to check (default: {DEFAULT_CASES})')
+  parser.add_argument('--case', type=int, metavar='N', help='Check only case N')
+  parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+  parser.add_argument('--entries', type=int, default=DEFAULT_ENTRIES,
+                      help=f'Most entries per case (default: {DEFAULT_ENTRIES})')
+  parser.add_argument('--jobs', type=int, default=1, help='Worker processes (default: 1)')
+  parser.add_argument('--path', action='append', choices=sorted(FAST_PATHS), dest='paths',
+                      help='Fast path to check; may be repeated (default: all)')
+  parser.add_argument('--out', metavar='PATH', help='Write the shrunk failing cases to PATH as JSON')
+  args = parser.parse_args()
+
+  start = time.perf_counter()
+  first, cases = (args.case, 1) if args.case is not None else (0, args.cases)
+  summary = fuzz(args.seed, cases, args.jobs, args.entries, args.paths, first)
+  elapsed = time.perf_counter() - start
+
+  failures = summary['failures']
+  for failure in failures[:20]:
+    print(f"✗ Case {failure.number} ({len(failure.entries)} entries after shrinking), {failure.path}: "
+          f"{failure.message}", file=sys.stderr)
+  if args.out and failures:
+    try:
+      with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump([{**failure._asdict(), 'seed': args.seed} for failure in failures], f, ensure_ascii=False, indent=2)
+    except OSError as e:
+      print(f"✗ {e}", file=sys.stderr)
+      sys.exit(1)
+  paths = len(args.paths or FAST_PATHS)
+  if failures:
+    print(f"✗ {len(failures)} failures in {summary['cases']} cases (seed {args.seed})", file=sys.stderr)
+    sys.exit(1)
+  print(f"✓ {summary['cases']} cases, {summary['entries']} entries: {paths} fast paths agree with the reference "
+        f"({elapsed:.1f}s)")
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""Load overlay.json into a compact, read-only ASN index.
+
+  from overlay_index import OverlayIndex
+
+  index = OverlayIndex.load('overlay.json')
+  entry = index.lookup(13335)          # OverlayEntry or None
+  entries = index.lookup_many(asns)    # one result per ASN, in order
+  for entry in index.lookup_range(64512, 65534):
+    ...
+"""
+
+import argparse
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+from validate import OverlayReader
+
+FIELDS = ('asn', 'handle', 'description', 'countryCode', 'reason')
+
+OverlayEntry = namedtuple('OverlayEntry', FIELDS)
+
+
+class _Codes:
+  """Dictionary-encoded column for fields with few distinct values."""
+
+  __slots__ = ('values', 'codes', '_lookup')
+
+  def __init__(self):
+    self.values = [None]
+    self.codes = array('B')
+    self._lookup = {None: 0}
+
+  def append(self, value):
+    code = self._lookup.get(value)
+    if code is None:
+      code = self._lookup[value] = len(self.values)
+      self.values.append(value)
+      if code == 256:
+        self.codes = array('H', self.codes)
+    self.codes.append(code)
+
+  def take(self, order):
+    self.codes = array(self.codes.typecode, (self.codes[i] for i in order))
+
+  def __getitem__(self, idx):
+    return self.values[self.codes[idx]]
+
+
+class OverlayIndex:
+  """Overlay entries stored column-wise and sorted by ASN.
+
+  ASNs live in an array('I') searched with bisect, handles and descriptions
+  in parallel lists, and country codes and reasons as one-byte codes.
+  Entries are materialized as OverlayEntry tuples only when looked up.
+  """
+
+  __slots__ = ('_asns', '_handles', '_descriptions', '_countries', '_reasons')
+
+  def __init__(self, entries=()):
+    self._asns = array('I')
+    self._handles = []
+    self._descriptions = []
+    self._countries = _Codes()
+    self._reasons = _Codes()
+    for entry in entries:
+      self._asns.append(entry['asn'])
+      self._handles.append(entry.get('handle'))
+      self._descriptions.append(entry.get('description'))
+      self._countries.append(entry.get('countryCode'))
+      self._reasons.append(entry.get('reason'))
+    self._sort()
+
+  @classmethod
+  def load(cls, path='overlay.json'):
+    """Build an index from an overlay file, decoding one entry at a time."""
+    with open(path, 'r', encoding='utf-8') as f:
+      return cls(entry for entry, _, _ in OverlayReader(f))
+
+  def _sort(self):
+    asns = self._asns
+    if any(a >= b for a, b in zip(asns, asns[1:])):
+      order = sorted(range(len(asns)), key=asns.__getitem__)
+      for a, b in zip(order, order[1:]):
+        if asns[a] == asns[b]:
+          raise ValueError(f"Duplicate ASN {asns[a]}")
+      self._asns = array('I', (asns[i] for i in order))
+      self._handles = [self._handles[i] for i in order]
+      self._descriptions = [self._descriptions[i] for i in order]
+      self._countries.take(order)
+      self._reasons.take(order)
+
+  def _entry(self, idx):
+    return OverlayEntry(self._asns[idx], self._handles[idx], self._descriptions[idx],
+                        self._countries[idx], self._reasons[idx])
+
+  def __len__(self):
+    return len(self._asns)
+
+  def __contains__(self, asn):
+    idx = bisect_left(self._asns, asn)
+    return idx < len(self._asns) and self._asns[idx] == asn
+
+  def __iter__(self):
+    return map(self._entry, range(len(self._asns)))
+
+  def lookup(self, asn):
+    """Return the OverlayEntry for asn, or None if the overlay has none."""
+    asns = self._asns
+    idx = bisect_left(asns, asn)
+    if idx < len(asns) and asns[idx] == asn:
+      return self._entry(idx)
+    return None
+
+  def lookup_many(self, asns):
+    """Return a list with lookup(asn) for each of asns.
+
+    Ascending runs of ASNs search only the part of the index after the
+    previous hit, so sorted input is close to a single merge pass.
+    """
+    index = self._asns
+    size = len(index)
+    results = []
+    lo = 0
+    previous = -1
+    for asn in asns:
+      if asn < previous:
+        lo = 0
+      idx = bisect_left(index, asn, lo)
+      if idx < size and index[idx] == asn:
+        results.append(self._entry(idx))
+      else:
+        results.append(None)
+      lo = idx
+      previous = asn
+    return results
+
+  def lookup_range(self, start, end):
+    """Yield the entries with start <= asn <= end in ASN order."""
+    for idx in range(bisect_left(self._asns, start), bisect_right(self._asns, end)):
+      yield self._entry(idx)
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Look up ASNs in overlay.json.')
+  parser.add_argument('asns', nargs='+', type=int, metavar='ASN')
+  parser.add_argument('--overlay', default='overlay.json', help='Overlay file (default: overlay.json)')
+  args = parser.parse_args()
+
+  index = OverlayIndex.load(args.overlay)
+  for asn, entry in zip(args.asns, index.lookup_many(args.asns)):
+    if entry is None:
+      print(f"AS{asn}: not in overlay")
+    else:
+      print(', '.join(f"{field}={value}" for field, value in zip(FIELDS, entry) if value is not None))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""Split a validated overlay into ASN-range shards with a manifest.
+
+The shards partition the ASN space: each covers a contiguous range, the
+first starts at 0 and the last ends at 4294967295, so every ASN belongs to
+exactly one shard. Each shard is an overlay file in canonical form holding
+the entries of its range. manifest.json lists them in ASN order:
+
+  {
+    "version": 1,
+    "entries": 98,
+    "shards": [
+      {"file": "overlay-0000000000-0000065535.json", "start": 0, "end": 65535, "count": 61, "sha256": "..."},
+      ...
+    ]
+  }
+
+ShardedOverlay reads the manifest and loads only the shards covering the
+ASNs asked for, checking each against its hash. validate.py --shards
+validates every shard on its own and the invariants across them.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from bisect import bisect_right
+from pathlib import Path
+
+from format_overlay import format_entry
+from overlay_index import OverlayIndex
+from validate import MAX_ASN, OverlayReader, validate_path
+
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+DEFAULT_SHARD_ENTRIES = 10000
+SHARD_PREFIX = 'overlay-'
+
+
+def shard_name(start, end):
+  return f'{SHARD_PREFIX}{start:010d}-{end:010d}.json'
+
+
+class _ShardWriter:
+  """One shard file, written under a temporary name next to its destination and hashed as it is written."""
+
+  def __init__(self, directory, start):
+    self.directory = directory
+    self.start = start
+    self.count = 0
+    self.digest = hashlib.sha256()
+    fd, self.tmp = tempfile.mkstemp(dir=directory, prefix='.shard.')
+    self.file = os.fdopen(fd, 'wb')
+    self._write('{\n  "as": [')
+
+  def _write(self, text):
+    data = text.encode('utf-8')
+    self.file.write(data)
+    self.digest.update(data)
+
+  def add(self, entry):
+    self._write(',\n    ' if self.count else '\n    ')
+    self._write(format_entry(entry))
+    self.count += 1
+
+  def close(self, end):
+    """Finish the shard as covering start..end; return its manifest record."""
+    self._write('\n  ]\n}\n' if self.count else ']\n}\n')
+    self.file.close()
+    self.name = shard_name(self.start, end)
+    return {'file': self.name, 'start': self.start, 'end': end, 'count': self.count,
+            'sha256': self.digest.hexdigest()}
+
+  def commit(self):
+    """Move the closed shard into place."""
+    os.replace(self.tmp, self.directory / self.name)
+
+  def discard(self):
+    self.file.close()
+    os.unlink(self.tmp)
+
+
+def write_shards(entries, directory, shard_entries=DEFAULT_SHARD_ENTRIES, boundaries=None):
+  """Write entries, sorted by ASN, as shards in directory; return the manifest.
+
+  Shards hold up to shard_entries entries each, or, if boundaries is given,
+  cover fixed ranges starting at 0 and at each boundary (empty shards
+  included). Shards and the manifest are written under temporary names and
+  renamed into place only once all of them are complete, the manifest last,
+  so a failed run leaves the earlier ones as they were. Files of an earlier
+  manifest that are no longer listed are removed once the new manifest is in
+  place.
+  """
+  if boundaries is not None and not all(0 <= asn <= MAX_ASN for asn in boundaries):
+    raise ValueError(f"Shard boundaries must be ASNs from 0 to {MAX_ASN}")
+  directory = Path(directory)
+  directory.mkdir(parents=True, exist_ok=True)
+  starts = sorted(set(boundaries or ()) - {0})
+  shards = []
+  total = 0
+  writers = [_ShardWriter(directory, 0)]
+  tmp = None
+  try:
+    for entry in entries:
+      asn = entry['asn']
+      if boundaries is not None:
+        while starts and asn >= starts[0]:
+          shards.append(writers[-1].close(starts[0] - 1))
+          writers.append(_ShardWriter(directory, starts.pop(0)))
+      elif writers[-1].count >= shard_entries:
+        shards.append(writers[-1].close(asn - 1))
+        writers.append(_ShardWriter(directory, asn))
+      writers[-1].add(entry)
+      total += 1
+    for start in starts:
+      shards.append(writers[-1].close(start - 1))
+      writers.append(_ShardWriter(directory, start))
+    shards.append(writers[-1].close(MAX_ASN))
+
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=f'.{MANIFEST_NAME}.')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+      f.write(f'{{\n  "version": {MANIFEST_VERSION},\n  "entries": {total},\n  "shards": [')
+      f.write(','.join('\n    ' + json.dumps(shard) for shard in shards))
+      f.write('\n  ]\n}\n')
+  except BaseException:
+    for writer in writers:
+      writer.discard()
+    if tmp is not None:
+      os.unlink(tmp)
+    raise
+
+  for writer in writers:
+    writer.commit()
+  os.replace(tmp, directory / MANIFEST_NAME)
+  manifest = {'version': MANIFEST_VERSION, 'entries': total, 'shards': shards}
+
+  listed = {shard['file'] for shard in shards}
+  for path in directory.glob(f'{SHARD_PREFIX}*.json'):
+    if path.name not in listed:
+      path.unlink()
+  return manifest
+
+
+def shard_overlay(path, directory, shard_entries=DEFAULT_SHARD_ENTRIES, boundaries=None):
+  """Split the overlay at path into shards in directory; return the manifest.
+
+  Raises ValueError if the overlay does not validate.
+  """
+  result = validate_path(path)
+  if not result.valid:
+    raise ValueError(f"{path} does not validate ({len(result.errors)} error(s)); fix it before sharding")
+  with open(path, encoding='utf-8') as f:
+    return write_shards((entry for entry, _, _ in OverlayReader(f)), directory, shard_entries, boundaries)
+
+
+def read_manifest(path):
+  """Read and check the structure of a shard manifest; raise ValueError if it is malformed."""
+  with open(path, encoding='utf-8') as f:
+    manifest = json.load(f)
+  if not isinstance(manifest, dict) or manifest.get('version') != MANIFEST_VERSION:
+    raise ValueError(f"{path} is not a shard manifest (version {MANIFEST_VERSION})")
+  shards = manifest.get('shards')
+  fields = {'file': str, 'start': int, 'end': int, 'count': int, 'sha256': str}
+  if not isinstance(shards, list) or not all(
+      isinstance(shard, dict) and all(isinstance(shard.get(field), kind) for field, kind in fields.items())
+      for shard in shards):
+    raise ValueError(f"{path} has a malformed 'shards' list")
+  for shard in shards:
+    if Path(shard['file']).name != shard['file']:
+      raise ValueError(f"{path}: shard file {shard['file']!r} must be in the manifest's directory")
+  return manifest
+
+
+class ShardedOverlay:
+  """Load only the shards of a sharded overlay that cover the ASNs in use.
+
+  Shards are read on first use, checked against the manifest's hash and
+  kept as OverlayIndex objects.
+  """
+
+  def __init__(self, manifest_path):
+    self.manifest_path = Path(manifest_path)
+    self.manifest = read_manifest(self.manifest_path)
+    self.shards = self.manifest['shards']
+    self._starts = [shard['start'] for shard in self.shards]
+    self._loaded = {}
+
+  def shard_for(self, asn):
+    """Return the manifest record of the shard covering asn, or None."""
+    idx = bisect_right(self._starts, asn) - 1
+    if idx >= 0 and asn <= self.shards[idx]['end']:
+      return self.shards[idx]
+    return None
+
+  def _index(self, shard):
+    index = self._loaded.get(shard['file'])
+    if index is None:
+      data = (self.manifest_path.parent / shard['file']).read_bytes()
+      if hashlib.sha256(data).hexdigest() != shard['sha256']:
+        raise ValueError(f"Shard {shard['file']} does not match the hash in {self.manifest_path}")
+      entries = json.loads(data.decode('utf-8'))['as']
+      index = self._loaded[shard['file']] = OverlayIndex(entries)
+    return index
+
+  def lookup(self, asn):
+    """Return the OverlayEntry for asn, or None if the overlay has none."""
+    shard = self.shard_for(asn)
+    return self._index(shard).lookup(asn) if shard is not None else None
+
+  def lookup_many(self, asns):
+    """Return a list with the OverlayEntry or None for each ASN."""
+    return [self.lookup(asn) for asn in asns]
+
+  def lookup_range(self, start, end):
+    """Yield the entries with start <= asn <= end in ASN order."""
+    for idx in range(max(bisect_right(self._starts, start) - 1, 0), bisect_right(self._starts, end)):
+      yield from self._index(self.shards[idx]).lookup_range(start, end)
+
+  @property
+  def loaded(self):
+    """Files of the shards loaded so far."""
+    return sorted(self._loaded)
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Split a validated overlay into ASN-range shards with a manifest.')
+  parser.add_argument('overlay', nargs='?', default='overlay.json', help='Overlay file (default: overlay.json)')
+  parser.add_argument('-o', '--output', default='shards', help='Directory for shards and manifest (default: shards)')
+  size = parser.add_mutually_exclusive_group()
+  size.add_argument('--entries', type=int, default=DEFAULT_SHARD_ENTRIES, metavar='N',
+                    help=f'Entries per shard (default: {DEFAULT_SHARD_ENTRIES})')
+  size.add_argument('--boundaries', type=lambda text: [int(asn) for asn in text.split(',')], metavar='ASN,...',
+                    help='Fixed shard ranges starting at 0 and at each of these ASNs')
+  args = parser.parse_args()
+  if args.entries < 1:
+    parser.error('--entries must be at least 1')
+
+  try:
+    manifest = shard_overlay(args.overlay, args.output, args.entries, args.boundaries)
+  except (OSError, ValueError) as e:
+    print(f"✗ {e}", file=sys.stderr)
+    sys.exit(1)
+  print(f"✓ Wrote {manifest['entries']} entries in {len(manifest['shards'])} shards to {args.output}")
+
+
+if __name__ == '__main__':
+  main()
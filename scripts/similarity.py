@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Find near-identical strings with a character n-gram index.
+
+similar_pairs() finds the pairs of strings whose sets of character trigrams
+have a Jaccard similarity of at least a threshold, without comparing all
+pairs. Each string's trigrams are ranked rarest first, and only a short
+prefix of them is indexed: two sets can reach the threshold only if their
+prefixes share trigrams (prefix filtering, as in PPJoin), so only such
+pairs are compared, and frequent trigrams rarely make it into the index.
+Unlike MinHash, the result is exact, unless max_postings caps the index.
+"""
+
+import math
+import re
+from collections import Counter, defaultdict
+from itertools import chain
+
+DEFAULT_THRESHOLD = 0.8
+NGRAM_SIZE = 3
+
+_SEPARATORS = re.compile(r'[\W_]+')
+
+
+def normalize(text):
+  """Casefold text and reduce punctuation and whitespace runs to single spaces."""
+  return ' '.join(_SEPARATORS.sub(' ', text.casefold()).split())
+
+
+def ngrams(text, n=NGRAM_SIZE):
+  """Return the set of character n-grams of text, padded with a space at each end."""
+  padded = f' {text} '
+  if len(padded) <= n:
+    return {padded}
+  return {padded[idx:idx + n] for idx in range(len(padded) - n + 1)}
+
+
+def similar_pairs(strings, threshold=DEFAULT_THRESHOLD, n=NGRAM_SIZE, max_postings=None):
+  """Yield (i, j, similarity) with i < j for each pair of strings at least threshold similar.
+
+  similarity is the Jaccard similarity of the strings' n-gram sets. Pairs
+  come out in no particular order. With max_postings, an n-gram indexes at
+  most that many strings, which bounds the work per string when thousands
+  of them are alike, at the price of missing pairs found only through such
+  crowded n-grams.
+  """
+  if not 0 < threshold <= 1:
+    raise ValueError(f"Similarity threshold must be in (0, 1], got {threshold}")
+  grams = [ngrams(text, n) for text in strings]
+  frequency = Counter(chain.from_iterable(grams))
+  rank = {gram: idx for idx, gram in enumerate(sorted(frequency, key=frequency.get))}.get
+
+  # Sets are indexed smallest first, so the indexed sets are at most as large
+  # as the one probing, which then needs only a shorter prefix of them. A pair
+  # that reaches the threshold shares its two rarest common trigrams within
+  # both prefixes extended by one, so candidates are the strings found in two
+  # postings, which set operations find without visiting each string that
+  # shares a single trigram.
+  index_share = 2 * threshold / (1 + threshold)
+  index = defaultdict(set)
+  for i in sorted(range(len(grams)), key=lambda idx: len(grams[idx])):
+    x = grams[i]
+    size = len(x)
+    min_size = threshold * size
+    overlap = math.ceil(min_size - 1e-9)
+    ranked = sorted(map(rank, x))
+    postings = [index[gram] for gram in ranked[:size - overlap + 2] if gram in index]
+    if overlap < 2:
+      candidates = set().union(*postings)
+    else:
+      candidates = set()
+      seen = set()
+      for strings in postings:
+        candidates |= seen & strings
+        seen |= strings
+    for gram in ranked[:size - math.ceil(index_share * size - 1e-9) + 2]:
+      if max_postings is None or len(index[gram]) < max_postings:
+        index[gram].add(i)
+    for j in candidates:
+      y = grams[j]
+      if len(y) >= min_size:
+        common = len(x & y)
+        similarity = common / (size + len(y) - common)
+        if similarity >= threshold:
+          yield (j, i, similarity) if j < i else (i, j, similarity)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""Test suite for applying the overlay to a base dataset."""
+
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import tracemalloc
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from apply_overlay import BaseReader, apply_entry, apply_overlay, merge
+from validate import OverlayReader
+
+
+def overlay_text(entries):
+    return json.dumps({"as": entries})
+
+
+class TestApplyEntry(unittest.TestCase):
+    """Test cases for the per-reason merge semantics."""
+
+    def test_missing_fills_gaps_only(self):
+        record = {"asn": 10, "handle": "BASE-NET", "description": "Base", "origin": "authoritative"}
+        entry = {"asn": 10, "handle": "NEW-NET", "description": "New", "countryCode": "US", "reason": "missing"}
+        self.assertEqual(apply_entry(record, entry),
+                         {"asn": 10, "handle": "BASE-NET", "description": "Base", "origin": "authoritative",
+                          "countryCode": "US"})
+        self.assertIsNone(apply_entry({**record, "countryCode": "DE"}, entry))
+
+    def test_missing_adds_absent_as(self):
+        entry = {"asn": 10, "countryCode": "US", "reason": "missing"}
+        self.assertEqual(apply_entry(None, entry), {"asn": 10, "countryCode": "US"})
+
+    def test_inferred_fix(self):
+        entry = {"asn": 10, "handle": "NEW-NET", "description": "New", "countryCode": "US", "reason": "inferred-fix"}
+        inferred = {"asn": 10, "handle": "OLD-NET", "description": "Old", "countryCode": "DE", "origin": "inferred"}
+        self.assertEqual(apply_entry(inferred, entry),
+                         {"asn": 10, "handle": "NEW-NET", "description": "New", "countryCode": "US",
+                          "origin": "inferred"})
+        self.assertIsNone(apply_entry({**inferred, "origin": "authoritative"}, entry))
+
+    def test_internal_overrides(self):
+        record = {"asn": 10, "handle": "OLD-NET", "countryCode": "DE", "origin": "authoritative"}
+        entry = {"asn": 10, "countryCode": "US", "reason": "internal"}
+        self.assertEqual(apply_entry(record, entry)["countryCode"], "US")
+        self.assertEqual(record["countryCode"], "DE")
+
+
+class TestMerge(unittest.TestCase):
+    """Test cases for the sort-merge join."""
+
+    def merged(self, base, entries, stats=None):
+        return list(merge(BaseReader(io.StringIO(base)), OverlayReader(io.StringIO(overlay_text(entries))), stats))
+
+    def test_jsonl_and_array_inputs(self):
+        records = [{"asn": 1, "handle": "A"}, {"asn": 5, "handle": "B"}]
+        entries = [{"asn": 3, "countryCode": "US", "reason": "missing"},
+                   {"asn": 5, "countryCode": "DE", "reason": "missing"},
+                   {"asn": 9, "countryCode": "FR", "reason": "missing"}]
+        expected = [{"asn": 1, "handle": "A"}, {"asn": 3, "countryCode": "US"},
+                    {"asn": 5, "handle": "B", "countryCode": "DE"}, {"asn": 9, "countryCode": "FR"}]
+        stats = {}
+        jsonl = ''.join(json.dumps(record) + '\n' for record in records)
+        self.assertEqual(self.merged(jsonl, entries, stats), expected)
+        self.assertEqual(stats, {"added": 2, "updated": 1, "skipped": 0, "unchanged": 1})
+        self.assertEqual(self.merged(json.dumps(records, indent=2), entries), expected)
+
+    def test_empty_inputs(self):
+        self.assertEqual(self.merged('', []), [])
+        self.assertEqual(self.merged('[]', [{"asn": 1, "countryCode": "US", "reason": "missing"}]),
+                         [{"asn": 1, "countryCode": "US"}])
+
+    def test_unsorted_base_rejected(self):
+        with self.assertRaisesRegex(ValueError, 'base line 2: AS1 is out of order'):
+            self.merged('{"asn": 2}\n{"asn": 1}\n', [])
+        with self.assertRaisesRegex(ValueError, 'base line 2: AS2 is duplicate'):
+            self.merged('{"asn": 2}\n{"asn": 2}\n', [])
+
+    def test_unsorted_overlay_rejected(self):
+        entries = [{"asn": 2, "countryCode": "US", "reason": "missing"},
+                   {"asn": 1, "countryCode": "US", "reason": "missing"}]
+        with self.assertRaisesRegex(ValueError, 'overlay'):
+            self.merged('', entries)
+
+    def test_malformed_base(self):
+        with self.assertRaises(json.JSONDecodeError):
+            self.merged('{"asn": 1}\n{"asn": \n', [])
+        with self.assertRaisesRegex(ValueError, "no integer 'asn'"):
+            self.merged('{"asn": "1"}\n', [])
+
+
+class TestApplyOverlay(unittest.TestCase):
+    """Test cases for applying overlay files."""
+
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_writes_output_file(self):
+        (self.test_dir / 'base.jsonl').write_text('{"asn": 1, "handle": "Æ-NET"}\n')
+        (self.test_dir / 'overlay.json').write_text(overlay_text([{"asn": 1, "countryCode": "DK", "reason": "missing"}]))
+        output = self.test_dir / 'merged.jsonl'
+        count = apply_overlay(self.test_dir / 'base.jsonl', self.test_dir / 'overlay.json', output)
+        self.assertEqual(count, 1)
+        self.assertEqual(output.read_text(encoding='utf-8'), '{"asn":1,"handle":"Æ-NET","countryCode":"DK"}\n')
+        self.assertEqual(sorted(os.listdir(self.test_dir)), ['base.jsonl', 'merged.jsonl', 'overlay.json'])
+
+    def test_memory_is_flat(self):
+        """Test that memory does not grow with the size of the base dataset."""
+        base = self.test_dir / 'base.jsonl'
+        with open(base, 'w') as f:
+            for asn in range(1, 50001):
+                f.write(json.dumps({"asn": asn, "handle": f"AS{asn}-NET", "description": "Example Network",
+                                    "origin": "inferred"}) + '\n')
+        (self.test_dir / 'overlay.json').write_text(overlay_text(
+            [{"asn": asn, "countryCode": "US", "reason": "inferred-fix"} for asn in range(1, 50001, 100)]))
+        tracemalloc.start()
+        try:
+            count = apply_overlay(base, self.test_dir / 'overlay.json', self.test_dir / 'merged.jsonl')
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(count, 50000)
+        self.assertLess(peak, 1 << 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
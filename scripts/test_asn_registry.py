@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""Test suite for ASN registry classification."""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from asn_registry import AsnRange, AsnRegistry
+from update_asn_registry import merge, parse_iana, read_source
+
+
+class TestAsnRegistry(unittest.TestCase):
+    """Test cases for AsnRegistry lookups."""
+
+    def setUp(self):
+        self.registry = AsnRegistry.load()
+
+    def test_special_purpose_boundaries(self):
+        """Test categories at the edges of the special-purpose ranges."""
+        cases = {
+            0: 'reserved', 1: None, 23455: None, 23456: 'as-trans', 23457: None,
+            64495: None, 64496: 'documentation', 64511: 'documentation', 64512: 'private',
+            65534: 'private', 65535: 'reserved', 65536: 'documentation', 65551: 'documentation',
+            65552: None, 4199999999: None, 4200000000: 'private', 4294967294: 'private',
+            4294967295: 'reserved',
+        }
+        for asn, category in cases.items():
+            self.assertEqual(self.registry.category(asn), category, asn)
+
+    def test_classify_reports_range_and_rir(self):
+        """Test that classify returns the containing range with its RIR."""
+        registry = AsnRegistry([
+            AsnRange(1, 6, 'allocated', 'ARIN', 'Assigned by ARIN'),
+            AsnRange(7, 7, 'allocated', 'RIPE NCC', 'Assigned by RIPE NCC'),
+        ])
+        self.assertEqual(registry.classify(5).rir, 'ARIN')
+        self.assertEqual(registry.classify(7), AsnRange(7, 7, 'allocated', 'RIPE NCC', 'Assigned by RIPE NCC'))
+        self.assertIsNone(registry.classify(8))
+
+    def test_many_ranges(self):
+        """Test lookups against thousands of adjacent ranges."""
+        registry = AsnRegistry(AsnRange(n * 10, n * 10 + 4, 'allocated', str(n % 5), '') for n in range(5000))
+        self.assertEqual(len(registry), 5000)
+        for asn in range(0, 50000, 7):
+            r = registry.classify(asn)
+            if asn % 10 < 5:
+                self.assertEqual((r.start, r.rir), (asn - asn % 10, str(asn // 10 % 5)))
+            else:
+                self.assertIsNone(r)
+
+    def test_overlapping_ranges_rejected(self):
+        """Test that overlapping ranges are refused."""
+        with self.assertRaises(ValueError):
+            AsnRegistry([AsnRange(1, 10, 'reserved', None, ''), AsnRange(10, 20, 'private', None, '')])
+
+    def test_unknown_category_rejected(self):
+        """Test that unknown categories are refused."""
+        with self.assertRaises(ValueError):
+            AsnRegistry([AsnRange(1, 10, 'bogus', None, '')])
+
+    def test_load_csv(self):
+        """Test loading ranges from a CSV file."""
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write('start,end,category,rir,description\n1,6,allocated,ARIN,Assigned by ARIN\n')
+        try:
+            registry = AsnRegistry.load(f.name)
+        finally:
+            Path(f.name).unlink()
+        self.assertEqual(list(registry), [AsnRange(1, 6, 'allocated', 'ARIN', 'Assigned by ARIN')])
+
+
+class TestUpdateAsnRegistry(unittest.TestCase):
+    """Test cases for importing the IANA registry."""
+
+    # Rows laid out as in IANA's as-numbers-1.csv and as-numbers-2.csv:
+    # quoted Reference cells that span lines, and empty trailing cells
+    IANA_SAMPLE = (
+        'Number,Description,WHOIS,Reference,Registration Date\r\n'
+        '0,Reserved,,"[RFC1930][RFC7607]",\r\n'
+        '1-6,Assigned by ARIN,whois.arin.net,"https://rdap.arin.net/registry\r\nhttp://rdap.arin.net/registry",\r\n'
+        '7,Assigned by RIPE NCC,whois.ripe.net,"https://rdap.db.ripe.net/",\r\n'
+        '23456,AS_TRANS,,"[RFC6793]",\r\n'
+        '64496-64511,Reserved for use in documentation and sample code,,"[RFC5398]",\r\n'
+        '64512-65534,Reserved for Private Use,,"[RFC6996]",\r\n'
+        '65535,Reserved,,"[RFC7300]",\r\n'
+        '399261-400000,Assigned by LACNIC,whois.lacnic.net,"https://rdap.lacnic.net/rdap/",2021-01-27\r\n'
+        '4200000000-4294967294,Reserved for Private Use,,"[RFC6996]",\r\n'
+        '400001-4199999999,Unallocated,,,\r\n'
+    )
+
+    def test_parse_iana_sample(self):
+        """Test parsing rows in the layout of IANA's CSV exports."""
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', encoding='utf-8-sig', newline='', delete=False) as f:
+            f.write(self.IANA_SAMPLE)
+        try:
+            rows = list(parse_iana(read_source(f.name)))
+        finally:
+            Path(f.name).unlink()
+        self.assertEqual([(r.start, r.end, r.category, r.rir) for r in rows], [
+            (0, 0, 'reserved', None),
+            (1, 6, 'allocated', 'ARIN'),
+            (7, 7, 'allocated', 'RIPE NCC'),
+            (23456, 23456, 'as-trans', None),
+            (64496, 64511, 'documentation', None),
+            (64512, 65534, 'private', None),
+            (65535, 65535, 'reserved', None),
+            (399261, 400000, 'allocated', 'LACNIC'),
+            (4200000000, 4294967294, 'private', None),
+            (400001, 4199999999, 'unallocated', None),
+        ])
+        special = [r for r in AsnRegistry.load() if r.category != 'allocated']
+        registry = AsnRegistry(merge(special, rows))
+        self.assertEqual(registry.classify(7).rir, 'RIPE NCC')
+        self.assertEqual(registry.category(23456), 'as-trans')
+        self.assertEqual(registry.category(65536), 'documentation')
+        self.assertEqual(registry.category(1000000), 'unallocated')
+
+    def test_parse_iana_unknown_description(self):
+        """Test that a description with no known category or RIR is rejected."""
+        for description in ('Assigned by IANA', 'Reserved by IETF'):
+            with self.subTest(description=description):
+                with self.assertRaisesRegex(ValueError, f"Unknown IANA description '{description}' for AS1-6"):
+                    list(parse_iana(f'Number,Description,WHOIS,Reference,Registration Date\n1-6,{description},,,\n'))
+
+    def test_merge_keeps_special_purpose_ranges(self):
+        """Test that special-purpose ranges cut through IANA blocks."""
+        iana = list(parse_iana(
+            'Number,Description,WHOIS,Reference,Registration Date\n'
+            '0,Reserved,,,\n'
+            '1-64495,Assigned by ARIN,whois.arin.net,,\n'
+            '64496-64511,Reserved for use in documentation and sample code,,,\n'
+            '64512-65535,Unallocated,,,\n'))
+        special = [
+            AsnRange(0, 0, 'reserved', None, 'Reserved (RFC 7607)'),
+            AsnRange(23456, 23456, 'as-trans', None, 'AS_TRANS (RFC 6793)'),
+            AsnRange(64496, 64511, 'documentation', None, 'Documentation'),
+            AsnRange(65535, 65535, 'reserved', None, 'Reserved (RFC 7300)'),
+        ]
+        self.assertEqual([(r.start, r.end, r.category, r.rir) for r in merge(special, iana)], [
+            (0, 0, 'reserved', None),
+            (1, 23455, 'allocated', 'ARIN'),
+            (23456, 23456, 'as-trans', None),
+            (23457, 64495, 'allocated', 'ARIN'),
+            (64496, 64511, 'documentation', None),
+            (64512, 65534, 'unallocated', None),
+            (65535, 65535, 'reserved', None),
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
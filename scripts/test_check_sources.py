@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""Test suite for the aggregator reference checker."""
+
+import io
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from check_sources import check_sources
+from validate import AggregatorScanner
+
+
+class TestCheckSources(unittest.TestCase):
+    """Test cases for check_sources()."""
+
+    def test_reports_positions(self):
+        text = "Fix AS12140\n\nSource: https://ipinfo.io/AS12140 (via whois.cymru.com)\n"
+        out = io.StringIO()
+        count = check_sources(io.StringIO(text), 'msg', AggregatorScanner(), out)
+        self.assertEqual(count, 2)
+        self.assertEqual(out.getvalue().splitlines(), [
+            "msg:3:17: disallowed aggregator ipinfo.io (ipinfo.io)",
+            "msg:3:40: disallowed aggregator cymru.com (whois.cymru.com)",
+        ])
+
+    def test_clean_text(self):
+        out = io.StringIO()
+        self.assertEqual(check_sources(io.StringIO("Source: https://bgp.he.net/AS12140"), 'msg',
+                                       AggregatorScanner(), out), 0)
+        self.assertEqual(out.getvalue(), '')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""Test suite for the evidence collector, against local mock RDAP and whois servers."""
+
+import asyncio
+import json
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from collect_evidence import EvidenceCollector, RateLimiter, ResponseCache, missing_asns
+
+
+class MockServers:
+    """An HTTP/1.1 keep-alive RDAP server and a whois server on localhost."""
+
+    def __init__(self):
+        self.requests = []
+        self.connections = 0
+        self.failures = {}      # path -> number of 503 answers before a 200
+
+    async def start(self):
+        self.http = await asyncio.start_server(self.serve_http, '127.0.0.1', 0)
+        self.whois = await asyncio.start_server(self.serve_whois, '127.0.0.1', 0)
+        self.http_port = self.http.sockets[0].getsockname()[1]
+        self.whois_port = self.whois.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        for server in (self.http, self.whois):
+            server.close()
+            await server.wait_closed()
+
+    async def serve_http(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                path = line.split()[1].decode()
+                while (await reader.readline()) not in (b'\r\n', b''):
+                    pass
+                self.requests.append(path)
+                if path.startswith('/old/'):
+                    status, body = 302, b''
+                    extra = f'Location: /autnum/{path.rsplit("/", 1)[1]}\r\n'
+                elif self.failures.get(path):
+                    self.failures[path] -= 1
+                    status, body, extra = 503, b'busy', ''
+                elif path == '/autnum/404':
+                    status, body, extra = 404, b'{"errorCode": 404}', ''
+                elif path.startswith('/ip/'):
+                    status, body, extra = 200, json.dumps({'handle': path[len('/ip/'):], 'country': 'DE'}).encode(), ''
+                else:
+                    asn = int(path.rsplit('/', 1)[1])
+                    status, body, extra = 200, json.dumps({'handle': f'AS{asn}', 'name': 'EXAMPLE'}).encode(), ''
+                writer.write(f'HTTP/1.1 {status} X\r\nContent-Type: application/rdap+json\r\n'
+                             f'Content-Length: {len(body)}\r\n{extra}\r\n'.encode() + body)
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve_whois(self, reader, writer):
+        query = (await reader.readline()).decode().strip()
+        self.requests.append(query)
+        if query.startswith('-i origin '):
+            origin = query.split()[-1]
+            answer = ''.join(f'route: {prefix}\norigin: {origin}\n\n'
+                             for prefix in ('192.0.2.0/24', '198.51.100.0/24', '192.0.2.0/24'))
+            answer += f'route6: 2001:db8::/32\norigin: {origin}\n'
+        else:
+            answer = f'aut-num: {query}\ncountry: DE\n'
+        writer.write(answer.encode())
+        await writer.drain()
+        writer.close()
+
+    def sources(self):
+        return [{'name': 'rdap', 'url': f'http://127.0.0.1:{self.http_port}/autnum/{{asn}}'},
+                {'name': 'radb', 'whois': f'localhost:{self.whois_port}', 'query': 'AS{asn}'}]
+
+
+class TestEvidenceCollector(unittest.IsolatedAsyncioTestCase):
+    """Test cases for EvidenceCollector."""
+
+    async def asyncSetUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.servers = MockServers()
+        await self.servers.start()
+        self.cache = ResponseCache(self.test_dir / 'cache.sqlite', ttl=3600)
+
+    async def asyncTearDown(self):
+        self.cache.close()
+        await self.servers.stop()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def collector(self, sources=None, **kwargs):
+        kwargs.setdefault('rates', {'127.0.0.1': 0, 'localhost': 0})
+        kwargs.setdefault('backoff', 0.01)
+        return EvidenceCollector(sources or self.servers.sources(), self.cache, self.test_dir / 'out', **kwargs)
+
+    def evidence(self, asn):
+        lines = (self.test_dir / 'out' / f'AS{asn}.jsonl').read_text(encoding='utf-8').splitlines()
+        return [json.loads(line) for line in lines]
+
+    async def test_collects_jsonl_per_asn(self):
+        collector = self.collector(per_host=2)
+        stats = await collector.run(range(64512, 64532))
+        self.assertEqual(stats, {'asns': 20, 'requests': 40, 'cached': 0, 'errors': 0})
+        records = self.evidence(64520)
+        self.assertEqual([(record['source'], record['status']) for record in records], [('rdap', 200), ('radb', None)])
+        self.assertEqual(records[0]['body'], {'handle': 'AS64520', 'name': 'EXAMPLE'})
+        self.assertEqual(records[1]['body'], 'aut-num: AS64520\ncountry: DE\n')
+        self.assertEqual(records[1]['request'], f'whois://localhost:{self.servers.whois_port}/AS64520')
+        # 20 HTTP requests over at most two pooled connections
+        self.assertLessEqual(self.servers.connections, 2)
+        self.assertEqual(collector.pool.opened, self.servers.connections)
+
+    async def test_cache(self):
+        await self.collector().run([64512, 404])
+        requests = len(self.servers.requests)
+        stats = await self.collector().run([64512, 404])
+        self.assertEqual(stats['cached'], 4)
+        self.assertEqual(len(self.servers.requests), requests)
+        self.assertEqual([record['cached'] for record in self.evidence(64512)], [True, True])
+        self.assertEqual(self.evidence(404)[0]['status'], 404)
+
+    async def test_cache_ttl_eviction(self):
+        self.cache.put('old', time.time() - 7200, 200, {'a': 1})
+        self.cache.put('new', time.time(), None, 'text')
+        self.assertIsNone(self.cache.get('old'))
+        self.assertEqual(self.cache.get('new')[1:], (None, 'text'))
+        self.cache.close()
+        self.cache = ResponseCache(self.test_dir / 'cache.sqlite', ttl=3600)
+        self.assertEqual(self.cache.db.execute('SELECT key FROM responses').fetchall(), [('new',)])
+
+    async def test_retries(self):
+        self.servers.failures = {'/autnum/64512': 2, '/autnum/64513': 5}
+        stats = await self.collector(retries=2).run([64512, 64513])
+        self.assertEqual(self.evidence(64512)[0]['status'], 200)
+        self.assertEqual(self.evidence(64513)[0]['error'], 'HTTP 503')
+        self.assertEqual(stats['errors'], 1)
+        self.assertEqual(self.servers.requests.count('/autnum/64513'), 3)
+        self.assertIsNone(self.cache.get(f'rdap\0http://127.0.0.1:{self.servers.http_port}/autnum/64513'))
+
+    async def test_unreachable_source(self):
+        sources = [{'name': 'down', 'whois': '127.0.0.1:1', 'query': 'AS{asn}'}]
+        stats = await self.collector(sources, retries=1).run([64512])
+        self.assertEqual(stats['errors'], 1)
+        self.assertIn('error', self.evidence(64512)[0])
+
+    async def test_redirect(self):
+        sources = [{'name': 'rdap', 'url': f'http://127.0.0.1:{self.servers.http_port}/old/{{asn}}'}]
+        await self.collector(sources).run([64512])
+        self.assertEqual(self.servers.requests, ['/old/64512', '/autnum/64512'])
+        self.assertEqual(self.evidence(64512)[0]['body']['handle'], 'AS64512')
+
+    async def test_prefix_sources(self):
+        sources = [{'name': 'routes', 'whois': f'localhost:{self.servers.whois_port}', 'query': '-i origin AS{asn}'},
+                   {'name': 'rdap-prefix', 'url': f'http://127.0.0.1:{self.servers.http_port}/ip/{{prefix}}',
+                    'prefixes': 'routes'}]
+        stats = await self.collector(sources).run([64512])
+        self.assertEqual(stats['requests'], 4)
+        records = self.evidence(64512)
+        self.assertEqual([(record['source'], record.get('prefix')) for record in records], [
+            ('routes', None), ('rdap-prefix', '192.0.2.0/24'), ('rdap-prefix', '198.51.100.0/24'),
+            ('rdap-prefix', '2001:db8::/32'),
+        ])
+        self.assertEqual(records[3]['body'], {'handle': '2001:db8::/32', 'country': 'DE'})
+
+    async def test_rate_limit(self):
+        limiter = RateLimiter(50)
+        start = asyncio.get_running_loop().time()
+        await asyncio.gather(*(limiter.wait() for _ in range(6)))
+        self.assertGreaterEqual(asyncio.get_running_loop().time() - start, 0.09)
+
+
+class TestMissingAsns(unittest.TestCase):
+    """Test cases for reading ASNs from missing.json."""
+
+    def test_missing_asns(self):
+        test_dir = Path(tempfile.mkdtemp())
+        try:
+            path = test_dir / 'missing.json'
+            path.write_text(json.dumps({'as': [{'asn': 1, 'missing': 'all'}, {'asn': 2, 'missing': 'country'}]}))
+            self.assertEqual(list(missing_asns(path)), [1, 2])
+            self.assertEqual(list(missing_asns(path, {'country'})), [2])
+        finally:
+            shutil.rmtree(test_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Test suite for the compiled binary overlay."""
+
+import json
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from compile_overlay import CompiledOverlay, compile_overlay
+from overlay_index import OverlayEntry, OverlayIndex
+from validate import AsnOrder, check_entry
+
+OVERLAY_PATH = Path(__file__).parent.parent / 'overlay.json'
+
+
+class TestCompiledOverlay(unittest.TestCase):
+    """Test cases for compiling and reading binary overlays."""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = Path(self.test_dir) / 'overlay.bin'
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def compile(self, entries):
+        compile_overlay(OverlayIndex(entries), self.path)
+        return CompiledOverlay(self.path)
+
+    def test_round_trip_passes_validation(self):
+        """Test that overlay.json reads back unchanged and still validates."""
+        with open(OVERLAY_PATH, encoding='utf-8') as f:
+            entries = json.load(f)['as']
+        with self.compile(entries) as compiled:
+            self.assertEqual(len(compiled), len(entries))
+            order = AsnOrder()
+            for entry, record in zip(entries, compiled):
+                self.assertEqual(record, compiled.lookup(entry['asn']))
+                restored = {field: value for field, value in record._asdict().items() if value is not None}
+                self.assertEqual(list(restored.items()), list(entry.items()))
+                asn, head, tail = check_entry(restored)
+                self.assertEqual((asn, head, tail), (entry['asn'], [], []))
+                self.assertEqual(order.add(asn), (False, None))
+
+    def test_lookups(self):
+        """Test hits, misses, membership and range queries."""
+        entries = [
+            {"asn": 10, "countryCode": "US", "reason": "missing"},
+            {"asn": 20, "handle": "ÆGIR-NET", "description": "Ægir Netværk ApS", "countryCode": "DK", "reason": "inferred-fix"},
+            {"asn": 4294967294, "handle": "EDGE", "description": "Edge", "countryCode": "US", "reason": "internal"},
+        ]
+        with self.compile(entries) as compiled:
+            self.assertEqual(compiled.lookup(20), OverlayEntry(20, "ÆGIR-NET", "Ægir Netværk ApS", "DK", "inferred-fix"))
+            self.assertEqual(compiled.lookup(10), OverlayEntry(10, None, None, "US", "missing"))
+            self.assertEqual(compiled.lookup(4294967294).handle, "EDGE")
+            self.assertIsNone(compiled.lookup(15))
+            self.assertIsNone(compiled.lookup(4294967295))
+            self.assertNotIn(0, compiled)
+            self.assertEqual([entry.asn for entry in compiled.lookup_range(5, 20)], [10, 20])
+
+    def test_shared_strings_stored_once(self):
+        """Test that repeated handles and descriptions share storage."""
+        entries = [{"asn": n, "handle": "SAME-NET", "description": "Same Network", "countryCode": "US",
+                    "reason": "missing"} for n in range(1, 101)]
+        self.compile(entries).close()
+        self.assertLess(self.path.stat().st_size, 100 * 20 + 100)
+
+    def test_unsorted_entries_rejected(self):
+        """Test that entries must arrive in ascending ASN order."""
+        with self.assertRaises(ValueError):
+            compile_overlay([OverlayEntry(2, None, None, "US", "missing"),
+                             OverlayEntry(1, None, None, "US", "missing")], self.path)
+
+    def test_not_a_compiled_overlay(self):
+        """Test that other files are refused."""
+        self.path.write_bytes(b'{"as": []}' + b'\0' * 32)
+        with self.assertRaises(ValueError):
+            CompiledOverlay(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""Test suite for the generated country code table."""
+
+import subprocess
+import sys
+import unittest
+from importlib.util import find_spec
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from country_codes import COUNTRY_CODES
+from update_country_codes import render
+
+
+class TestCountryCodes(unittest.TestCase):
+    """Test cases for country_codes.py."""
+
+    def test_codes_are_alpha2(self):
+        """Test that every code is two uppercase letters."""
+        self.assertGreater(len(COUNTRY_CODES), 240)
+        for code in COUNTRY_CODES:
+            self.assertRegex(code, r'^[A-Z]{2}$')
+
+    @unittest.skipUnless(find_spec('pycountry'), 'pycountry not installed')
+    def test_matches_pycountry(self):
+        """Test that the table is up to date with pycountry."""
+        import pycountry
+        self.assertEqual(COUNTRY_CODES, {country.alpha_2 for country in pycountry.countries})
+
+    def test_render_round_trip(self):
+        """Test that the rendered module defines the same codes."""
+        namespace = {}
+        exec(render(COUNTRY_CODES, 'test'), namespace)
+        self.assertEqual(namespace['COUNTRY_CODES'], COUNTRY_CODES)
+
+    def test_validate_does_not_import_pycountry(self):
+        """Test that importing validate leaves pycountry unloaded."""
+        result = subprocess.run(
+            [sys.executable, '-c', "import sys, validate; print('pycountry' in sys.modules)"],
+            cwd=Path(__file__).parent, capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), 'False')
+
+    def test_validate_imports_command_modules_lazily(self):
+        """Test that importing validate leaves the modules only some commands need unloaded."""
+        modules = ['argparse', 'concurrent.futures', 'similarity', 'subprocess', 'tempfile']
+        result = subprocess.run(
+            [sys.executable, '-c', f"import sys, validate; print([m for m in {modules!r} if m in sys.modules])"],
+            cwd=Path(__file__).parent, capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), '[]')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Test suite for cross-checking the overlay against a missing list."""
+
+import io
+import json
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from cross_check import cross_check, cross_check_paths, summary
+from validate import OverlayReader, report_text
+
+OVERLAY_PATH = Path(__file__).parent.parent / 'overlay.json'
+
+
+def reader(entries):
+    return OverlayReader(io.StringIO(json.dumps({"as": entries}, indent=2)))
+
+
+class TestCrossCheck(unittest.TestCase):
+    """Test cases for cross_check()."""
+
+    def check(self, overlay, missing):
+        return cross_check(reader(overlay), reader(missing))
+
+    def test_consistent(self):
+        result = self.check(
+            [{"asn": 1, "handle": "A", "description": "A Net", "countryCode": "US", "reason": "missing"},
+             {"asn": 2, "countryCode": "DE", "reason": "missing"},
+             {"asn": 4, "handle": "D", "description": "D Net", "countryCode": "FR", "reason": "internal"}],
+            [{"asn": 1, "missing": "all"}, {"asn": 2, "missing": "country"}, {"asn": 3, "missing": "all"}])
+        self.assertTrue(result.valid)
+        self.assertEqual((result.errors, result.warnings, result.count), ([], [], 3))
+        self.assertEqual(result.notes, ["Cross-checked 3 entries against 3 missing ASNs (1 without an entry)"])
+
+    def test_findings(self):
+        result = self.check(
+            [{"asn": 1, "countryCode": "US", "reason": "missing"},
+             {"asn": 2, "handle": "B", "description": "B Net", "reason": "missing"},
+             {"asn": 3, "handle": "C", "countryCode": "US", "reason": "missing"},
+             {"asn": 5, "countryCode": "US", "reason": "missing"},
+             {"asn": 6, "countryCode": "US", "reason": "internal"}],
+            [{"asn": 1, "missing": "all"}, {"asn": 2, "missing": "country"}, {"asn": 3, "missing": "all"},
+             {"asn": 4, "missing": "country"}])
+        self.assertFalse(result.valid)
+        self.assertEqual([(f.code, f.asn, f.line) for f in result.errors],
+                         [('incomplete-fix', 1, 4), ('incomplete-fix', 3, 15)])
+        self.assertEqual(result.errors[0].message,
+                         "Line 4: ASN 1 is missing all metadata, but the entry has no handle or description")
+        self.assertEqual(result.errors[1].message,
+                         "Line 15: ASN 3 is missing all metadata, but the entry has no description")
+        self.assertEqual([(f.code, f.asn, f.line) for f in result.warnings],
+                         [('country-unresolved', 2, 9), ('country-unresolved', 4, None), ('not-missing', 5, 21)])
+        self.assertEqual(result.warnings[1].message,
+                         "Missing list line 16: ASN 4 is missing its country, and no entry resolves it")
+
+    def test_text_report(self):
+        result = self.check([{"asn": 1, "countryCode": "US", "reason": "missing"}],
+                            [{"asn": 1, "missing": "country"}, {"asn": 2, "missing": "country"}])
+        out = io.StringIO()
+        self.assertTrue(report_text(result, out, summary=summary))
+        self.assertEqual(out.getvalue().splitlines()[-1],
+                         "✓ No conflicts between 1 entries and the missing list (with 1 warnings)")
+
+    def test_unsorted_input(self):
+        for overlay, missing, message in [
+            ([{"asn": 2}, {"asn": 1}], [], 'overlay line 7: AS1 is out of order after AS2'),
+            ([], [{"asn": 1, "missing": "all"}, {"asn": 1, "missing": "all"}], 'missing list line 8: AS1 is duplicate'),
+            ([], [{"asn": 1, "missing": "none"}], "missing list line 4: AS1 has unknown missing value 'none'"),
+        ]:
+            with self.assertRaises(ValueError) as cm:
+                self.check(overlay, missing)
+            self.assertIn(message, str(cm.exception))
+
+    def test_files(self):
+        """Test the committed overlay against a full missing list derived from it."""
+        test_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, test_dir, ignore_errors=True)
+        overlay = json.loads(OVERLAY_PATH.read_text(encoding='utf-8'))['as']
+        missing = [{"asn": entry["asn"], "missing": "all" if "handle" in entry else "country"}
+                   for entry in overlay if entry["reason"] == "missing"]
+        path = test_dir / 'missing.json'
+        path.write_text(json.dumps({"as": missing}), encoding='utf-8')
+        result = cross_check_paths(OVERLAY_PATH, path)
+        self.assertEqual((result.errors, result.warnings, result.count), ([], [], len(overlay)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Test suite for the overlay delta generator."""
+
+import io
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from diff_overlay import apply_delta, diff, diff_overlay, state_checksum
+from validate import OverlayReader
+
+OLD = [
+    {"asn": 100, "countryCode": "US", "reason": "missing"},
+    {"asn": 200, "handle": "B-NET", "description": "B Network", "countryCode": "DE", "reason": "missing"},
+    {"asn": 300, "countryCode": "GB", "reason": "missing"},
+]
+NEW = [
+    {"asn": 50, "countryCode": "FR", "reason": "missing"},
+    {"asn": 100, "reason": "missing", "countryCode": "US"},
+    {"asn": 200, "description": "B Network GmbH", "countryCode": "DE", "reason": "internal"},
+]
+
+
+def reader(entries):
+    return OverlayReader(io.StringIO(json.dumps({"as": entries})))
+
+
+class TestDiffOverlay(unittest.TestCase):
+    """Test cases for diff() and apply_delta()."""
+
+    def test_operations(self):
+        ops = list(diff(reader(OLD), reader(NEW)))
+        self.assertEqual(ops, [
+            {"op": "add", "asn": 50, "entry": NEW[0]},
+            {"op": "update", "asn": 200, "set": {"description": "B Network GmbH", "reason": "internal"},
+             "unset": ["handle"]},
+            {"op": "remove", "asn": 300},
+            {"op": "checksum", "entries": 3, "checksum": state_checksum(NEW)},
+        ])
+
+    def test_checksum_ignores_key_order(self):
+        self.assertEqual(state_checksum(OLD[:1]), state_checksum([NEW[1]]))
+        self.assertNotEqual(state_checksum(OLD), state_checksum(NEW))
+        self.assertEqual(state_checksum(reversed(OLD)), state_checksum(OLD))
+
+    def test_apply_delta(self):
+        """Test that applying the delta yields the new version and checks the checksum."""
+        state = {entry["asn"]: entry for entry in OLD}
+        checksum = apply_delta(state, diff(reader(OLD), reader(NEW)), state_checksum(OLD))
+        self.assertEqual(state, {entry["asn"]: entry for entry in NEW})
+        self.assertEqual(checksum, state_checksum(NEW))
+        # Without a starting checksum, it is computed
+        state = {entry["asn"]: entry for entry in OLD}
+        self.assertEqual(apply_delta(state, diff(reader(OLD), reader(NEW))), checksum)
+
+    def test_apply_delta_mismatch(self):
+        ops = list(diff(reader(OLD), reader(NEW)))
+        with self.assertRaisesRegex(ValueError, "Cannot add AS50: it is already in the overlay"):
+            apply_delta({entry["asn"]: entry for entry in NEW}, ops)
+        state = {entry["asn"]: entry for entry in OLD}
+        state[100] = {"asn": 100, "countryCode": "CA", "reason": "missing"}
+        with self.assertRaisesRegex(ValueError, "Checksum mismatch"):
+            apply_delta(state, ops)
+
+    def test_unsorted_input(self):
+        with self.assertRaisesRegex(ValueError, "overlay line 1: AS100 is out of order after AS200"):
+            list(diff(reader(OLD), reader([NEW[2], NEW[1]])))
+
+
+class TestDiffOverlayFiles(unittest.TestCase):
+    """Test cases for diff_overlay() on files and git revisions."""
+
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.path = self.test_dir / 'overlay.json'
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def git(self, *args):
+        subprocess.run(['git', '-c', 'user.name=test', '-c', 'user.email=test@example.com', *args],
+                       cwd=self.test_dir, check=True, capture_output=True)
+
+    def read_delta(self, path):
+        return [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+
+    def test_files(self):
+        old = self.test_dir / 'old.json'
+        old.write_text(json.dumps({"as": OLD}), encoding='utf-8')
+        self.path.write_text(json.dumps({"as": NEW}), encoding='utf-8')
+        output = self.test_dir / 'delta.jsonl'
+        counts = diff_overlay(old, self.path, output)
+        self.assertEqual(counts, {'add': 1, 'remove': 1, 'update': 1})
+        self.assertEqual(self.read_delta(output), list(diff(reader(OLD), reader(NEW))))
+
+    def test_git_revisions(self):
+        self.git('init', '-q')
+        for entries in (OLD, NEW):
+            self.path.write_text(json.dumps({"as": entries}, indent=2), encoding='utf-8')
+            self.git('add', 'overlay.json')
+            self.git('commit', '-q', '-m', 'update')
+        output = self.test_dir / 'delta.jsonl'
+        diff_overlay('HEAD~1', 'HEAD', output, rev=True, path=self.path)
+        self.assertEqual(self.read_delta(output), list(diff(reader(OLD), reader(NEW))))
+        with self.assertRaisesRegex(ValueError, "cannot read .*overlay.json at no-such-rev"):
+            diff_overlay('no-such-rev', 'HEAD', output, rev=True, path=self.path)
+        self.assertEqual(sorted(path.name for path in self.test_dir.iterdir()), ['.git', 'delta.jsonl', 'overlay.json'])
+
+
+if __name__ == '__main__':
+    unittest.main()
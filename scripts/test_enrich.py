@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Test suite for the bulk enrichment CLI."""
+
+import io
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from compile_overlay import compile_overlay
+from enrich import Enricher, parse_asn
+from overlay_index import OverlayIndex
+
+SCRIPTS_DIR = Path(__file__).parent
+
+ENTRIES = [
+    {'asn': 100, 'handle': 'EXAMPLE-AS', 'description': 'Example Networks Ltd.', 'countryCode': 'DE',
+     'reason': 'missing'},
+    {'asn': 200, 'countryCode': 'BR', 'reason': 'internal'},
+]
+
+
+class CountingIndex:
+    """An OverlayIndex wrapper that counts lookups."""
+
+    def __init__(self, index):
+        self.index = index
+        self.lookups = 0
+
+    def lookup(self, asn):
+        self.lookups += 1
+        return self.index.lookup(asn)
+
+
+class TestEnricher(unittest.TestCase):
+    """Test cases for parse_asn() and Enricher."""
+
+    def setUp(self):
+        self.index = OverlayIndex(ENTRIES)
+
+    def enrich(self, text, batch_size=2, **kwargs):
+        enricher = Enricher(self.index, **kwargs)
+        outfile = io.BytesIO()
+        enricher.enrich_stream(io.BytesIO(text.encode()), outfile, batch_size)
+        return [json.loads(line) for line in outfile.getvalue().decode().splitlines()], enricher.stats
+
+    def test_parse_asn(self):
+        for value in (13335, '13335', 'AS13335', b' as13335\n'):
+            with self.subTest(value=value):
+                self.assertEqual(parse_asn(value), 13335)
+        for value in (True, -1, 'AS-1', 'ASN1', '', None, 1.5):
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    parse_asn(value)
+
+    def test_bare_asns(self):
+        records, stats = self.enrich("100\nAS200\n\n300\nnot an asn\n-5\n")
+        self.assertEqual(records, [{'asn': 100, **{k: v for k, v in ENTRIES[0].items() if k != 'asn'}},
+                                   {'asn': 200, 'countryCode': 'BR', 'reason': 'internal'},
+                                   {'asn': 300}])
+        self.assertEqual(stats, {'records': 3, 'matched': 2, 'skipped': 2})
+
+    def test_json_records(self):
+        text = ('{"ts": 1, "src_as": "AS100"}\n{"ts": 2, "src_as": 200, "src_reason": "old"}\n'
+                '{"ts": 3}\n{"ts": 4, "src_as": 300}\n[100]\n{broken\n')
+        records, stats = self.enrich(text, field='src_as', prefix='src_')
+        self.assertEqual(records, [
+            {'ts': 1, 'src_as': 'AS100', 'src_handle': 'EXAMPLE-AS', 'src_description': 'Example Networks Ltd.',
+             'src_countryCode': 'DE', 'src_reason': 'missing'},
+            {'ts': 2, 'src_as': 200, 'src_reason': 'internal', 'src_countryCode': 'BR'},
+            {'ts': 3},
+            {'ts': 4, 'src_as': 300},
+        ])
+        self.assertEqual(stats, {'records': 4, 'matched': 2, 'skipped': 2})
+
+    def test_batch_size_does_not_change_output(self):
+        text = ''.join(f'{asn}\n{{"asn": {asn}}}\n' for asn in [100, 200, 300] * 50)
+        self.assertEqual(self.enrich(text, batch_size=1), self.enrich(text, batch_size=1000))
+
+    def test_cache(self):
+        index = CountingIndex(self.index)
+        enricher = Enricher(index, cache_size=2)
+        enricher.enrich_lines([b'100\n', b'100\n', b'{"asn": 100}\n', b'200\n', b'100\n'])
+        self.assertEqual(index.lookups, 2)
+        enricher.enrich_lines([b'300\n', b'400\n', b'100\n'])
+        self.assertEqual(index.lookups, 5)
+
+        uncached = CountingIndex(self.index)
+        Enricher(uncached, cache_size=0).enrich_lines([b'100\n', b'100\n'])
+        self.assertEqual(uncached.lookups, 2)
+
+
+class TestEnrichCli(unittest.TestCase):
+    """Test cases for running enrich.py."""
+
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.overlay = self.test_dir / 'overlay.json'
+        self.overlay.write_text(json.dumps({'as': ENTRIES}), encoding='utf-8')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def run_enrich(self, *args, stdin=''):
+        return subprocess.run([sys.executable, str(SCRIPTS_DIR / 'enrich.py'), *args], input=stdin,
+                              capture_output=True, text=True)
+
+    def test_overlay_and_compiled_agree(self):
+        compiled = self.test_dir / 'overlay.bin'
+        compile_overlay(OverlayIndex(ENTRIES), compiled)
+        stdin = '100\nAS200\n{"asn": 100, "bytes": 40}\n'
+        result = self.run_enrich('--overlay', str(self.overlay), stdin=stdin)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn('✓ Enriched 3 records (3 in the overlay, 0 lines skipped)', result.stderr)
+        self.assertEqual(json.loads(result.stdout.splitlines()[2])['handle'], 'EXAMPLE-AS')
+        self.assertEqual(self.run_enrich('--compiled', str(compiled), '--quiet', stdin=stdin).stdout, result.stdout)
+
+    def test_missing_overlay(self):
+        result = self.run_enrich('--overlay', str(self.test_dir / 'absent.json'))
+        self.assertEqual(result.returncode, 1)
+        self.assertIn('✗', result.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
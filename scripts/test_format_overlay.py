@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Test suite for the canonical overlay formatter."""
+
+import json
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from format_overlay import format_entry, format_overlay
+from validate import OverlayShapeError, validate_path
+
+OVERLAY_PATH = Path(__file__).parent.parent / 'overlay.json'
+
+
+class TestFormatOverlay(unittest.TestCase):
+    """Test cases for format_overlay()."""
+
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.path = self.test_dir / 'overlay.json'
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def scrambled_overlay(self):
+        """Write overlay.json's entries shuffled, with keys reversed and indent=2."""
+        entries = json.loads(OVERLAY_PATH.read_text(encoding='utf-8'))['as']
+        random.Random(1).shuffle(entries)
+        entries = [dict(reversed(list(entry.items()))) for entry in entries]
+        self.path.write_text(json.dumps({"as": entries}, indent=2), encoding='utf-8')
+        return entries
+
+    def test_committed_overlay_is_canonical(self):
+        shutil.copy(OVERLAY_PATH, self.path)
+        self.assertEqual(format_overlay(self.path), (len(json.loads(self.path.read_text())['as']), False))
+        self.assertEqual(self.path.read_bytes(), OVERLAY_PATH.read_bytes())
+
+    def test_restores_canonical_form(self):
+        """Test that sorting and key order are restored, in memory and with merged runs."""
+        for run_size in (1000, 7, 1):
+            entries = self.scrambled_overlay()
+            count, changed = format_overlay(self.path, run_size=run_size)
+            self.assertEqual((count, changed), (len(entries), True))
+            self.assertEqual(self.path.read_bytes(), OVERLAY_PATH.read_bytes())
+            self.assertEqual(sorted(path.name for path in self.test_dir.iterdir()), ['overlay.json'])
+
+    def test_output_file(self):
+        self.scrambled_overlay()
+        before = self.path.read_bytes()
+        output = self.test_dir / 'formatted.json'
+        format_overlay(self.path, output)
+        self.assertEqual(self.path.read_bytes(), before)
+        self.assertEqual(output.read_bytes(), OVERLAY_PATH.read_bytes())
+        self.assertTrue(validate_path(output).valid)
+
+    def test_duplicates_kept_and_reported(self):
+        entries = [
+            {"asn": 20, "countryCode": "US", "reason": "missing"},
+            {"asn": 10, "countryCode": "DE", "reason": "missing"},
+            {"asn": 20, "countryCode": "GB", "reason": "missing"},
+        ]
+        for run_size in (10, 1):
+            duplicates = []
+            self.path.write_text(json.dumps({"as": entries}, indent=2))
+            self.assertEqual(format_overlay(self.path, run_size=run_size, duplicates=duplicates)[0], 3)
+            self.assertEqual(duplicates, [(20, 4, 14)])
+            self.assertEqual([entry["countryCode"] for entry in json.loads(self.path.read_text())["as"]],
+                             ["DE", "US", "GB"])
+
+    def test_unknown_keys_and_invalid_asns(self):
+        """Test that nothing is dropped: unknown keys go last, entries without an ASN go to the end."""
+        entries = [{"reason": "missing", "asn": 5, "note": "x", "countryCode": "US"}, {"countryCode": "US"}, 7,
+                   {"asn": 1, "countryCode": "US", "reason": "missing"}]
+        self.path.write_text(json.dumps({"as": entries}))
+        format_overlay(self.path)
+        self.assertEqual(self.path.read_text().splitlines()[2:6], [
+            '    { "asn": 1, "countryCode": "US", "reason": "missing" },',
+            '    { "asn": 5, "countryCode": "US", "reason": "missing", "note": "x" },',
+            '    { "countryCode": "US" },',
+            '    7',
+        ])
+
+    def test_empty_overlay(self):
+        self.path.write_text('{"as": []}')
+        format_overlay(self.path)
+        self.assertEqual(json.loads(self.path.read_text()), {"as": []})
+
+    def test_unformattable_input_left_untouched(self):
+        for text, error in [('{"as": [{"asn": 1}', json.JSONDecodeError), ('[1]', OverlayShapeError),
+                            ('{"as": [], "meta": 1}', ValueError)]:
+            self.path.write_text(text)
+            with self.assertRaises(error):
+                format_overlay(self.path)
+            self.assertEqual(self.path.read_text(), text)
+            self.assertEqual([path.name for path in self.test_dir.iterdir()], ['overlay.json'])
+
+    def test_format_entry(self):
+        self.assertEqual(format_entry({"reason": "missing", "countryCode": "BR", "asn": 1, "description": "Telecomunicações",
+                                       "handle": "X"}),
+                         '{ "asn": 1, "handle": "X", "description": "Telecomunicações", "countryCode": "BR", '
+                         '"reason": "missing" }')
+
+
+if __name__ == '__main__':
+    unittest.main()
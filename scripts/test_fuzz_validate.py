@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Test suite for the differential fuzzer of validate.py."""
+
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).parent))
+from fuzz_validate import FAST_PATHS, NON_OBJECTS, fuzz, generate_case, run_cases
+from validate import MAX_ASN, PRIVATE_ASN_RANGES, RESERVED_ASNS, validate_data
+
+
+class TestFuzzValidate(unittest.TestCase):
+    """Test cases for the case generator and the comparison of fast paths."""
+
+    def test_fast_paths_agree(self):
+        summary = fuzz(seed=1, cases=150)
+        self.assertEqual(summary['failures'], [], summary['failures'][:1])
+        self.assertEqual(summary['cases'], 150)
+
+    def test_cases_reproduce(self):
+        self.assertEqual(generate_case(3, 17), generate_case(3, 17))
+        self.assertNotEqual(generate_case(3, 17), generate_case(4, 17))
+
+    def test_cases_reach_edges(self):
+        cases = [entry for number in range(300) for entry in generate_case(0, number).entries]
+        entries = [entry for entry in cases if isinstance(entry, dict)]
+        self.assertEqual({repr(entry) for entry in cases if not isinstance(entry, dict)},
+                         {repr(value) for value in NON_OBJECTS})
+        asns = [entry.get('asn') for entry in entries]
+        self.assertIn(MAX_ASN + 1, asns)
+        self.assertTrue(RESERVED_ASNS & {asn for asn in asns if type(asn) is int})
+        self.assertIn(PRIVATE_ASN_RANGES[0][1] + 1, asns)
+        self.assertIn(True, asns)
+        self.assertTrue(any(not entry.get('handle', 'A').isascii() for entry in entries
+                            if isinstance(entry.get('handle'), str)))
+        self.assertTrue(any(list(entry)[:1] not in (['asn'], []) for entry in entries))
+        codes = {finding.code for finding in validate_data({'as': cases}).errors}
+        self.assertTrue({'duplicate', 'sort-order', 'asn-range', 'reserved-asn', 'field-order'} <= codes)
+
+    def test_disagreement_is_caught_and_shrunk(self):
+        def drop_last_error(case):
+            result = validate_data({'as': case.entries})
+            result.errors = result.errors[:-1]
+            return result
+
+        with patch.dict(FAST_PATHS, {'broken': (drop_last_error, True, False)}):
+            cases, _, failures = run_cases(0, 0, 20, names=['broken'])
+        self.assertEqual(cases, 20)
+        self.assertTrue(failures)
+        for failure in failures:
+            self.assertEqual(failure.path, 'broken')
+            # One entry with an error, or two for a duplicate or sort-order error
+            self.assertLessEqual(len(failure.entries), 2)
+            self.assertIn("; got none", failure.message)
+
+    def test_exceptions_are_failures(self):
+        """Test that a path that raises fails, even when the reference raises as well."""
+        def crash(case):
+            raise TypeError('crashed')
+
+        with patch.dict(FAST_PATHS, {'crashing': (crash, True, False)}):
+            _, _, failures = run_cases(0, 0, 3, names=['crashing'])
+        self.assertEqual([(failure.path, failure.message) for failure in failures],
+                         [('crashing', 'raised TypeError: crashed')] * 3)
+
+        with patch('fuzz_validate.validate_data', side_effect=TypeError('crashed')):
+            _, _, failures = run_cases(0, 0, 3, names=['error-budget'])
+        self.assertEqual([(failure.path, failure.entries, failure.message) for failure in failures],
+                         [('reference', [], 'raised TypeError: crashed')] * 3)
+
+    def test_cli(self):
+        result = subprocess.run([sys.executable, str(Path(__file__).parent / 'fuzz_validate.py'), '--cases', '20',
+                                 '--seed', '2', '--path', 'stream', '--path', 'parallel'],
+                                capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn('✓ 20 cases', result.stdout)
+        self.assertIn('2 fast paths agree', result.stdout)
+
+
+if __name__ == '__main__':
+    unittest.main()
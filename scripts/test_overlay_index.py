@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Test suite for the overlay lookup index."""
+
+import json
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from overlay_index import OverlayEntry, OverlayIndex
+
+OVERLAY_PATH = Path(__file__).parent.parent / 'overlay.json'
+
+
+class TestOverlayIndex(unittest.TestCase):
+    """Test cases for OverlayIndex."""
+
+    ENTRIES = [
+        {"asn": 300, "countryCode": "GB", "reason": "missing"},
+        {"asn": 100, "handle": "ACME-NET", "description": "Acme Corporation", "countryCode": "US", "reason": "missing"},
+        {"asn": 200, "handle": "TEST-AS", "description": "Test Network", "countryCode": "DE", "reason": "inferred-fix"},
+    ]
+
+    def setUp(self):
+        self.index = OverlayIndex(self.ENTRIES)
+
+    def test_lookup(self):
+        """Test lookups of present and absent ASNs."""
+        self.assertEqual(self.index.lookup(100),
+                         OverlayEntry(100, "ACME-NET", "Acme Corporation", "US", "missing"))
+        self.assertEqual(self.index.lookup(300), OverlayEntry(300, None, None, "GB", "missing"))
+        self.assertIsNone(self.index.lookup(150))
+        self.assertIsNone(self.index.lookup(400))
+        self.assertIn(200, self.index)
+        self.assertNotIn(0, self.index)
+
+    def test_lookup_many_keeps_input_order(self):
+        """Test that batch lookups answer each ASN in order, sorted or not."""
+        asns = [300, 100, 100, 50, 200, 250, 300, 1]
+        self.assertEqual(self.index.lookup_many(asns), [self.index.lookup(asn) for asn in asns])
+
+    def test_lookup_range(self):
+        """Test range queries with inclusive bounds."""
+        self.assertEqual([entry.asn for entry in self.index.lookup_range(100, 200)], [100, 200])
+        self.assertEqual([entry.asn for entry in self.index.lookup_range(101, 299)], [200])
+        self.assertEqual(list(self.index.lookup_range(400, 500)), [])
+
+    def test_iterates_in_asn_order(self):
+        """Test that unsorted input is stored in ASN order."""
+        self.assertEqual([entry.asn for entry in self.index], [100, 200, 300])
+        self.assertEqual(len(self.index), 3)
+
+    def test_duplicate_asn_rejected(self):
+        """Test that duplicate ASNs are refused."""
+        with self.assertRaises(ValueError):
+            OverlayIndex(self.ENTRIES + [{"asn": 200, "countryCode": "FR", "reason": "missing"}])
+
+    def test_many_distinct_values(self):
+        """Test columns with more distinct values than fit in a byte."""
+        entries = [{"asn": n, "countryCode": f"C{n}", "reason": "missing"} for n in range(1, 400)]
+        index = OverlayIndex(reversed(entries))
+        self.assertEqual([entry.countryCode for entry in index], [entry["countryCode"] for entry in entries])
+
+    def test_load_overlay_file(self):
+        """Test that loading overlay.json indexes every entry."""
+        index = OverlayIndex.load(OVERLAY_PATH)
+        with open(OVERLAY_PATH, encoding='utf-8') as f:
+            entries = json.load(f)['as']
+        self.assertEqual(len(index), len(entries))
+        for entry in entries:
+            self.assertEqual(index.lookup(entry['asn'])._asdict(),
+                             {field: entry.get(field) for field in OverlayEntry._fields})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""Test suite for ASN-range shards of the overlay."""
+
+import json
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from overlay_index import OverlayIndex
+from shard_overlay import MANIFEST_NAME, ShardedOverlay, shard_overlay, write_shards
+from validate import MAX_ASN, validate_shards
+
+OVERLAY_PATH = Path(__file__).parent.parent / 'overlay.json'
+
+
+class TestShardOverlay(unittest.TestCase):
+    """Test cases for writing and loading shards."""
+
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.entries = json.loads(OVERLAY_PATH.read_text(encoding='utf-8'))['as']
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def shard_entries(self, manifest):
+        return [json.loads((self.test_dir / shard['file']).read_text(encoding='utf-8'))['as']
+                for shard in manifest['shards']]
+
+    def test_shards_by_entry_count(self):
+        manifest = shard_overlay(OVERLAY_PATH, self.test_dir, shard_entries=30)
+        self.assertEqual(json.loads((self.test_dir / MANIFEST_NAME).read_text()), manifest)
+        self.assertEqual([shard['count'] for shard in manifest['shards']], [30, 30, 30, 8])
+        self.assertEqual(manifest['entries'], len(self.entries))
+        self.assertEqual(sum(self.shard_entries(manifest), []), self.entries)
+        ranges = [(shard['start'], shard['end']) for shard in manifest['shards']]
+        self.assertEqual(ranges[0][0], 0)
+        self.assertEqual(ranges[-1][1], MAX_ASN)
+        self.assertEqual([start for start, _ in ranges[1:]], [end + 1 for _, end in ranges[:-1]])
+
+    def test_shards_by_boundaries(self):
+        """Test fixed ranges, including empty shards, and removal of stale shard files."""
+        shard_overlay(OVERLAY_PATH, self.test_dir, shard_entries=10)
+        manifest = shard_overlay(OVERLAY_PATH, self.test_dir, boundaries=[65536, 4200000000])
+        self.assertEqual([(shard['start'], shard['end'], shard['count']) for shard in manifest['shards']],
+                         [(0, 65535, sum(entry['asn'] < 65536 for entry in self.entries)),
+                          (65536, 4199999999, sum(entry['asn'] >= 65536 for entry in self.entries)),
+                          (4200000000, MAX_ASN, 0)])
+        self.assertEqual(sorted(path.name for path in self.test_dir.iterdir()),
+                         sorted([MANIFEST_NAME] + [shard['file'] for shard in manifest['shards']]))
+        self.assertTrue(validate_shards(self.test_dir / MANIFEST_NAME).valid)
+
+    def test_failed_run_leaves_shards(self):
+        """Test that a run that fails part-way leaves the earlier shards and manifest as they were."""
+        shard_overlay(OVERLAY_PATH, self.test_dir, shard_entries=30)
+        before = {path.name: path.read_bytes() for path in self.test_dir.iterdir()}
+
+        def entries():
+            for entry in self.entries[:50]:
+                yield {**entry, 'reason': 'internal'}
+            raise OSError('read failed')
+
+        with self.assertRaisesRegex(OSError, 'read failed'):
+            write_shards(entries(), self.test_dir, shard_entries=30)
+        self.assertEqual({path.name: path.read_bytes() for path in self.test_dir.iterdir()}, before)
+
+    def test_invalid_overlay_refused(self):
+        path = self.test_dir / 'overlay.json'
+        path.write_text(json.dumps({"as": [{"asn": 1, "countryCode": "XX", "reason": "missing"}]}))
+        with self.assertRaisesRegex(ValueError, "does not validate"):
+            shard_overlay(path, self.test_dir / 'shards')
+        self.assertFalse((self.test_dir / 'shards').exists())
+
+    def test_partial_loading(self):
+        """Test that lookups load only the shards covering the requested ASNs."""
+        manifest = shard_overlay(OVERLAY_PATH, self.test_dir, shard_entries=30)
+        sharded = ShardedOverlay(self.test_dir / MANIFEST_NAME)
+        index = OverlayIndex(self.entries)
+        asn = self.entries[0]['asn']
+        self.assertEqual(sharded.lookup(asn), index.lookup(asn))
+        self.assertIsNone(sharded.lookup(asn + 1))
+        self.assertEqual(sharded.loaded, [manifest['shards'][0]['file']])
+        last = self.entries[-1]['asn']
+        self.assertEqual(sharded.lookup_many([last, 1, asn]), index.lookup_many([last, 1, asn]))
+        self.assertEqual(len(sharded.loaded), 2)
+        start, end = self.entries[25]['asn'], self.entries[35]['asn']
+        self.assertEqual(list(sharded.lookup_range(start, end)), list(index.lookup_range(start, end)))
+
+    def test_hash_mismatch(self):
+        manifest = write_shards(self.entries, self.test_dir, shard_entries=50)
+        path = self.test_dir / manifest['shards'][1]['file']
+        path.write_text(path.read_text().replace('"US"', '"CA"'))
+        sharded = ShardedOverlay(self.test_dir / MANIFEST_NAME)
+        self.assertIsNotNone(sharded.lookup(self.entries[0]['asn']))
+        with self.assertRaisesRegex(ValueError, "does not match the hash"):
+            sharded.lookup(self.entries[-1]['asn'])
+
+
+class TestValidateShards(unittest.TestCase):
+    """Test cases for validate_shards()."""
+
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.entries = json.loads(OVERLAY_PATH.read_text(encoding='utf-8'))['as']
+        self.manifest = write_shards(self.entries, self.test_dir, shard_entries=30)
+        self.manifest_path = self.test_dir / MANIFEST_NAME
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def write_manifest(self):
+        self.manifest_path.write_text(json.dumps(self.manifest), encoding='utf-8')
+
+    def codes(self, result):
+        return [(finding.code, finding.message.split(':')[0]) for finding in result.errors]
+
+    def test_valid(self):
+        for jobs in (1, 2):
+            result = validate_shards(self.manifest_path, jobs)
+            self.assertTrue(result.valid)
+            self.assertEqual(result.count, 98)
+
+    def test_shard_findings_are_prefixed(self):
+        shard = self.manifest['shards'][2]
+        path = self.test_dir / shard['file']
+        path.write_text(path.read_text().replace('"reason": "missing"', '"reason": "unknown"', 1))
+        result = validate_shards(self.manifest_path)
+        self.assertEqual(self.codes(result), [('reason', shard['file']), ('shard-hash', shard['file'])])
+        self.assertRegex(result.errors[0].message, r"^overlay-\d+-\d+\.json: Line \d+ \(AS\d+\): Invalid reason")
+
+    def test_cross_shard_invariants(self):
+        """Test ranges that do not partition the ASN space, and counts that do not add up."""
+        shards = self.manifest['shards']
+        shards[1]['start'] += 1
+        shards[2]['count'] += 1
+        shards.pop()
+        self.write_manifest()
+        result = validate_shards(self.manifest_path)
+        self.assertEqual(self.codes(result), [
+            ('shard-range', shards[1]['file']),
+            ('shard-range', MANIFEST_NAME),
+            ('shard-range', shards[1]['file']),     # its first entry is now outside the range
+            ('shard-count', shards[2]['file']),
+            ('shard-count', MANIFEST_NAME),
+        ])
+
+    def test_entry_outside_range(self):
+        shards = self.manifest['shards']
+        asn = self.entries[29]['asn']
+        shards[0]['end'], shards[1]['start'] = asn - 1, asn
+        self.write_manifest()
+        result = validate_shards(self.manifest_path)
+        self.assertEqual([finding.code for finding in result.errors], ['shard-range'])
+        self.assertIn(f"Line 32: ASN {asn} is outside the shard's range 0-{asn - 1}", result.errors[0].message)
+
+    def test_bad_manifest(self):
+        self.manifest_path.write_text('{"version": 1, "shards": [{"file": "../overlay.json"}]}')
+        result = validate_shards(self.manifest_path)
+        self.assertIsNone(result.count)
+        self.assertEqual(result.errors[0].code, 'shard-manifest')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Test suite for the n-gram similarity index."""
+
+import itertools
+import random
+import string
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from similarity import ngrams, normalize, similar_pairs
+
+
+class TestSimilarity(unittest.TestCase):
+    """Test cases for normalize(), ngrams() and similar_pairs()."""
+
+    def brute_force(self, strings, threshold):
+        grams = [ngrams(text) for text in strings]
+        return sorted((i, j) for i, j in itertools.combinations(range(len(strings)), 2)
+                      if len(grams[i] & grams[j]) / len(grams[i] | grams[j]) >= threshold)
+
+    def test_normalize(self):
+        self.assertEqual(normalize("  ACME  Corp., Inc_ "), "acme corp inc")
+        self.assertEqual(normalize("Straße"), "strasse")
+
+    def test_ngrams(self):
+        self.assertEqual(ngrams("abc"), {" ab", "abc", "bc "})
+        self.assertEqual(ngrams(""), {"  "})
+
+    def test_matches_brute_force(self):
+        """Test that the index finds exactly the pairs that pairwise comparison does."""
+        rng = random.Random(7)
+        words = [''.join(rng.choice('abcdefgh') for _ in range(rng.randint(2, 7))) for _ in range(300)]
+        strings = []
+        for _ in range(400):
+            text = ' '.join(rng.choice(words) for _ in range(rng.randint(1, 4)))
+            strings.append(text)
+            if rng.random() < 0.3:
+                idx = rng.randrange(len(text))
+                strings.append(text[:idx] + rng.choice(string.ascii_lowercase) + text[idx + 1:])
+        for threshold in (0.3, 0.6, 0.8, 0.95, 1.0):
+            with self.subTest(threshold=threshold):
+                pairs = list(similar_pairs(strings, threshold))
+                self.assertTrue(all(i < j and similarity >= threshold for i, j, similarity in pairs))
+                self.assertEqual(sorted((i, j) for i, j, _ in pairs), self.brute_force(strings, threshold))
+
+    def test_max_postings(self):
+        """Test that a capped index finds a subset of the pairs, and all of them with a loose cap."""
+        strings = [f"{a}{b}{c} telecom networks" for a in 'abcd' for b in 'abcd' for c in 'abcd']
+        exact = self.brute_force(strings, 0.8)
+        capped = sorted((i, j) for i, j, _ in similar_pairs(strings, 0.8, max_postings=4))
+        self.assertTrue(set(capped) < set(exact))
+        self.assertEqual(sorted((i, j) for i, j, _ in similar_pairs(strings, 0.8, max_postings=len(strings))), exact)
+
+    def test_short_and_identical_strings(self):
+        strings = ["a", "a", "ab", "b", "abc", "abd"]
+        self.assertEqual(sorted((i, j) for i, j, _ in similar_pairs(strings, 0.5)), self.brute_force(strings, 0.5))
+        self.assertEqual([(i, j) for i, j, _ in similar_pairs(strings, 1.0)], [(0, 1)])
+
+    def test_invalid_threshold(self):
+        with self.assertRaises(ValueError):
+            list(similar_pairs(["a"], 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Test suite for regenerating missing.json and STATS.md."""
+
+import json
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from update_missing import MISSING_PATH, OVERLAY_PATH, STATS_PATH, classify, render_stats, update_missing
+
+
+class TestUpdateMissing(unittest.TestCase):
+    """Test cases for the missing.json and STATS.md generator."""
+
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.missing = self.test_dir / 'missing.json'
+        self.stats = self.test_dir / 'STATS.md'
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def write_base(self, records):
+        path = self.test_dir / 'base.jsonl'
+        with open(path, 'w', encoding='utf-8') as f:
+            for record in sorted(records, key=lambda record: record['asn']):
+                f.write(json.dumps(record) + '\n')
+        return path
+
+    def test_reproduces_committed_files(self):
+        """Test that a base dataset consistent with the repo regenerates it byte for byte."""
+        overlay = json.loads(OVERLAY_PATH.read_text(encoding='utf-8'))['as']
+        missing = json.loads(MISSING_PATH.read_text(encoding='utf-8'))['as']
+        records = [{"asn": entry["asn"]} if "handle" in entry else
+                   {"asn": entry["asn"], "handle": "SOME-NET", "description": "Some Network", "origin": "authoritative"}
+                   for entry in overlay]
+        records += [{"asn": entry["asn"]} if entry["missing"] == "all" else {"asn": entry["asn"], "handle": "X"}
+                    for entry in missing]
+        records += [{"asn": 5000000 + n, "handle": "INFERRED", "countryCode": "US", "origin": "inferred"}
+                    for n in range(4514)]
+        records += [{"asn": 6000000 + n, "handle": "FINE", "countryCode": "US", "origin": "authoritative"}
+                    for n in range(100)]
+        base = self.write_base(records)
+
+        changed = update_missing(base, OVERLAY_PATH, self.missing, self.stats)
+        self.assertEqual(changed, ['missing.json', 'STATS.md'])
+        self.assertEqual(self.missing.read_bytes(), MISSING_PATH.read_bytes())
+        self.assertEqual(self.stats.read_bytes(), STATS_PATH.read_bytes())
+        self.assertEqual(update_missing(base, OVERLAY_PATH, self.missing, self.stats, check=True), [])
+        self.assertEqual(sorted(path.name for path in self.test_dir.iterdir()), ['STATS.md', 'base.jsonl', 'missing.json'])
+
+    def test_check_leaves_files_untouched(self):
+        base = self.write_base([{"asn": 1}])
+        overlay = self.test_dir / 'overlay.json'
+        overlay.write_text('{"as": []}')
+        self.missing.write_text('stale')
+        changed = update_missing(base, overlay, self.missing, self.stats, check=True)
+        self.assertEqual(changed, ['missing.json', 'STATS.md'])
+        self.assertEqual(self.missing.read_text(), 'stale')
+        self.assertFalse(self.stats.exists())
+
+    def test_empty_missing_list(self):
+        base = self.write_base([{"asn": 1, "countryCode": "US"}])
+        overlay = self.test_dir / 'overlay.json'
+        overlay.write_text('{"as": []}')
+        update_missing(base, overlay, self.missing, self.stats)
+        self.assertEqual(json.loads(self.missing.read_text()), {"as": []})
+
+    def test_classify(self):
+        self.assertEqual(classify({"asn": 1}), 'all')
+        self.assertEqual(classify({"asn": 1, "handle": "", "countryCode": ""}), 'all')
+        self.assertEqual(classify({"asn": 1, "description": "Example"}), 'country')
+        self.assertEqual(classify({"asn": 1, "countryCode": "US", "origin": "inferred"}), 'inferred')
+        self.assertIsNone(classify({"asn": 1, "countryCode": "US", "origin": "authoritative"}))
+
+    def test_thousands_separator(self):
+        stats = render_stats({'all': [1234567, 1000], 'country': [0, 0], 'inferred': [12, 0]})
+        self.assertIn('| Missing all metadata | 1 234 567 | 1 000 | 1 233 567 |\n', stats)
+        self.assertIn('| Inferred | 12 | 0 | |\n', stats)
+
+
+if __name__ == '__main__':
+    unittest.main()
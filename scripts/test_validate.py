@@ -1,47 +1,45 @@
 #!/usr/bin/env python3
 """Test suite for overlay.json validation."""
 
+import io
 import json
+import os
+import random
+import shutil
+import subprocess
 import tempfile
+import time
+import tracemalloc
 import unittest
+from contextlib import redirect_stdout
+from importlib.util import find_spec
 from pathlib import Path
 from unittest.mock import patch
 import sys
 
 # Import the validation function
 sys.path.insert(0, str(Path(__file__).parent))
-from validate import validate_overlay, validate_pr_body
+from validate import (
+    RULE_NAMES, AggregatorMatch, AggregatorScanner, AsnOrder, Finding, OverlayReader, OverlayShapeError, OverlayWatcher,
+    RuleProfile, add_phase_hook, add_rule_hook, _check_columns, check_entry, load_overlay, near_duplicates,
+    remove_phase_hook, remove_rule_hook, report_json, report_sarif, report_text, validate_bytes, validate_data,
+    validate_overlay, validate_path, validate_pr_body,
+)
 
 
 class TestValidation(unittest.TestCase):
     """Test cases for overlay.json validation."""
 
-    def setUp(self):
-        """Create a temporary directory for test files."""
-        self.test_dir = tempfile.mkdtemp()
-        self.original_cwd = Path.cwd()
-        Path(self.test_dir).mkdir(exist_ok=True)
-
-    def tearDown(self):
-        """Clean up temporary files."""
-        import shutil
-        shutil.rmtree(self.test_dir, ignore_errors=True)
-
     def write_overlay(self, data):
-        """Write test overlay.json file."""
-        overlay_path = Path(self.test_dir) / 'overlay.json'
-        with open(overlay_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2)
+        """Set the test overlay text, wrapping entry lists in { "as": [...] }."""
+        if isinstance(data, list):
+            data = {"as": data}
+        self.text = json.dumps(data, indent=2)
 
     def run_validation(self):
-        """Run validation in test directory."""
-        import os
-        old_cwd = os.getcwd()
-        try:
-            os.chdir(self.test_dir)
-            return validate_overlay()
-        finally:
-            os.chdir(old_cwd)
+        """Validate the test overlay in memory, keeping the result."""
+        self.result = validate_bytes(self.text.encode('utf-8'))
+        return self.result.valid
 
     def test_valid_country_only_entry(self):
         """Test valid entry with only country code."""
@@ -131,6 +129,17 @@ class TestValidation(unittest.TestCase):
         ])
         self.assertFalse(self.run_validation())
 
+    def test_non_string_reason(self):
+        """Test error for a reason that is not a string."""
+        self.write_overlay([
+            {
+                "asn": 12345,
+                "countryCode": "US",
+                "reason": ["missing"]
+            }
+        ])
+        self.assertFalse(self.run_validation())
+        self.assertEqual(self.result.errors[0].code, 'reason')
 
     def test_duplicate_asn(self):
         """Test error for duplicate ASN."""
@@ -268,6 +277,17 @@ class TestValidation(unittest.TestCase):
         ])
         self.assertFalse(self.run_validation())
 
+    def test_documentation_asn_16bit(self):
+        """Test error for the 16-bit documentation range."""
+        self.write_overlay([
+            {
+                "asn": 64500,
+                "countryCode": "US",
+                "reason": "missing"
+            }
+        ])
+        self.assertFalse(self.run_validation())
+
     def test_asn_exceeds_max(self):
         """Test error for ASN exceeding maximum value."""
         self.write_overlay([
@@ -290,6 +310,28 @@ class TestValidation(unittest.TestCase):
         ])
         self.assertFalse(self.run_validation())
 
+    def test_entries_that_are_not_objects(self):
+        """Test error for entries that are lists, strings, numbers or null, in memory and streamed."""
+        self.write_overlay({"as": [["x"], "abc", "asn", 5, None]})
+        self.assertFalse(self.run_validation())
+        messages = [finding.message for finding in self.result.errors]
+        self.assertEqual(len(messages), 5)
+        self.assertTrue(all(message.endswith(": Missing required field 'asn'") for message in messages))
+        streamed = validate_bytes(self.text.encode('utf-8'), max_errors=10)
+        self.assertEqual([finding.message for finding in streamed.errors], messages)
+
+    def test_boolean_asn(self):
+        """Test error for a JSON true as ASN, which Python would take for 1."""
+        self.write_overlay([
+            {
+                "asn": True,
+                "countryCode": "US",
+                "reason": "missing"
+            }
+        ])
+        self.assertFalse(self.run_validation())
+        self.assertEqual(self.result.errors[0].message, "Line 4: ASN must be a positive integer, got True")
+
     def test_private_asn_warning(self):
         """Test warning for private ASN (should pass but warn)."""
         self.write_overlay([
@@ -305,10 +347,9 @@ class TestValidation(unittest.TestCase):
 
     def test_invalid_json(self):
         """Test error for invalid JSON syntax."""
-        overlay_path = Path(self.test_dir) / 'overlay.json'
-        with open(overlay_path, 'w') as f:
-            f.write('{ invalid json }')
+        self.text = '{ invalid json }'
         self.assertFalse(self.run_validation())
+        self.assertEqual(self.result.errors[0].code, 'json-syntax')
 
     def test_not_array(self):
         """Test error when JSON is not an array."""
@@ -365,6 +406,802 @@ class TestValidation(unittest.TestCase):
         self.assertTrue(self.run_validation())
 
 
+class TestValidationApi(unittest.TestCase):
+    """Test cases for the structured validation entry points and reporters."""
+
+    ENTRIES = [
+        {"asn": 10, "countryCode": "XX", "reason": "missing"},
+        {"asn": 5, "countryCode": "US", "reason": "missing", "extra": 1},
+        {"asn": 23456, "countryCode": "US", "reason": "missing"},
+    ]
+
+    def test_validate_data_records(self):
+        """Test that findings carry code, line, ASN and message."""
+        result = validate_data({"as": self.ENTRIES})
+        self.assertFalse(result.valid)
+        self.assertEqual(result.count, 3)
+        self.assertEqual(result.errors, [
+            Finding('error', 'country-code', 3, 10,
+                    "Line 3 (AS10): Invalid country code 'XX' (must be valid ISO 3166-1 alpha-2)"),
+            Finding('error', 'sort-order', 4, 5, "Line 4: ASNs must be sorted (ASN 5 comes after 10)"),
+            Finding('error', 'field-order', 4, 5,
+                    "Line 4 (AS5): Incorrect field order. Expected: asn, countryCode, reason, got: asn, countryCode, reason, extra"),
+            Finding('error', 'reserved-asn', 5, 23456, "Line 5 (AS23456): Reserved ASN cannot be used"),
+        ])
+        self.assertEqual(result.warnings, [
+            Finding('warning', 'unexpected-fields', 4, 5, "Line 4 (AS5): Unexpected fields: extra"),
+        ])
+
+    def test_entry_points_agree(self):
+        """Test that data, bytes and path validation find the same problems."""
+        text = json.dumps({"as": self.ENTRIES}, indent=2)
+        from_bytes = validate_bytes(text.encode('utf-8'))
+        with tempfile.TemporaryDirectory() as test_dir:
+            path = Path(test_dir) / 'overlay.json'
+            path.write_text(text, encoding='utf-8')
+            from_path = validate_path(path)
+            streamed = validate_path(path, stream=True)
+            self.assertEqual(list(streamed.errors), from_path.errors)
+        self.assertEqual(from_bytes.errors, from_path.errors)
+        self.assertEqual(from_bytes.warnings, from_path.warnings)
+        self.assertEqual([error.code for error in from_bytes.errors],
+                         [error.code for error in validate_data({"as": self.ENTRIES}).errors])
+
+    def test_stopping_problems(self):
+        """Test that unreadable documents give a single error and no count."""
+        cases = [
+            (validate_bytes(b'{"as": ['), 'json-syntax'),
+            (validate_bytes(b'\xff'), 'read-error'),
+            (validate_data([1]), 'shape'),
+            (validate_data({"as": 5}), 'shape'),
+            (validate_path('does-not-exist/overlay.json'), 'not-found'),
+        ]
+        for result, code in cases:
+            self.assertIsNone(result.count)
+            self.assertFalse(result.valid)
+            self.assertEqual([error.code for error in result.errors], [code])
+
+    def test_streamed_invalid_utf8(self):
+        """Test that a streamed file that is not UTF-8 is a read error."""
+        with tempfile.TemporaryDirectory() as test_dir:
+            path = Path(test_dir) / 'overlay.json'
+            path.write_bytes(b'{"as": [{"asn": 1, "handle": "\xff"}]}')
+            result = validate_path(path, stream=True)
+        self.assertEqual([error.code for error in result.errors], ['read-error'])
+
+    def test_text_report_matches_validate_overlay(self):
+        """Test that the text reporter prints what validate_overlay() prints."""
+        text = json.dumps({"as": self.ENTRIES}, indent=2)
+        with tempfile.TemporaryDirectory() as test_dir:
+            path = Path(test_dir) / 'overlay.json'
+            path.write_text(text, encoding='utf-8')
+            expected = io.StringIO()
+            with redirect_stdout(expected):
+                self.assertFalse(validate_overlay(path=path))
+        output = io.StringIO()
+        self.assertFalse(report_text(validate_bytes(text), output))
+        self.assertEqual(output.getvalue(), expected.getvalue())
+
+    def test_json_report(self):
+        output = io.StringIO()
+        self.assertFalse(report_json(validate_data({"as": self.ENTRIES}), output))
+        report = json.loads(output.getvalue())
+        self.assertEqual((report["valid"], report["entries"]), (False, 3))
+        self.assertEqual(report["errors"][0], {
+            "severity": "error", "code": "country-code", "line": 3, "asn": 10,
+            "message": "Line 3 (AS10): Invalid country code 'XX' (must be valid ISO 3166-1 alpha-2)",
+        })
+        self.assertEqual(len(report["warnings"]), 1)
+
+        output = io.StringIO()
+        self.assertTrue(report_json(validate_data({"as": []}), output))
+        self.assertEqual(json.loads(output.getvalue()), {"valid": True, "entries": 0, "stopped": False, "errors": [], "warnings": []})
+
+    def test_sarif_report(self):
+        output = io.StringIO()
+        self.assertFalse(report_sarif(validate_data({"as": self.ENTRIES}), output, 'overlay.json'))
+        log = json.loads(output.getvalue())
+        self.assertEqual(log["version"], "2.1.0")
+        run = log["runs"][0]
+        self.assertIn({"id": "reserved-asn"}, run["tool"]["driver"]["rules"])
+        self.assertEqual(len(run["results"]), 5)
+        first = run["results"][0]
+        self.assertEqual((first["ruleId"], first["level"]), ("country-code", "error"))
+        self.assertEqual(first["locations"][0]["physicalLocation"],
+                         {"artifactLocation": {"uri": "overlay.json"}, "region": {"startLine": 3}})
+        self.assertEqual(run["results"][-1]["level"], "warning")
+
+
+class TestErrorBudget(unittest.TestCase):
+    """Test cases for stopping early with --fail-fast and --max-errors."""
+
+    def broken_entries(self, count):
+        return [{"asn": count - n, "reason": "missing", "countryCode": "US"} for n in range(count)]
+
+    def test_stops_at_budget(self):
+        """Test that checking stops once the budget is used up."""
+        text = json.dumps({"as": self.broken_entries(1000)}, indent=2)
+        full = validate_bytes(text)
+        seen = []
+        result = validate_bytes(text, max_errors=3, on_finding=seen.append)
+        self.assertTrue(result.stopped)
+        self.assertFalse(result.valid)
+        self.assertEqual(list(result.errors), full.errors[:3])
+        self.assertEqual(seen, full.errors[:3])
+        self.assertEqual(result.count, 2)
+
+    def test_within_budget_is_a_full_run(self):
+        text = json.dumps({"as": self.broken_entries(3)}, indent=2)
+        result = validate_bytes(text, max_errors=100)
+        self.assertFalse(result.stopped)
+        self.assertEqual((len(result.errors), result.count), (5, 3))
+        self.assertTrue(validate_bytes(json.dumps({"as": []}), max_errors=1).valid)
+
+    def test_stops_reading(self):
+        """Test that a file is not read past the first error on --fail-fast."""
+        entries = [{"asn": n, "countryCode": "US", "reason": "missing"} for n in range(1, 20000)]
+        entries[0]["countryCode"] = "XX"
+        text = json.dumps({"as": entries}, indent=2)[:-1] + '!!'
+        with tempfile.TemporaryDirectory() as test_dir:
+            path = Path(test_dir) / 'overlay.json'
+            path.write_text(text, encoding='utf-8')
+            result = validate_path(path, max_errors=1)
+            self.assertEqual(validate_path(path).errors[0].code, 'json-syntax')
+        self.assertTrue(result.stopped)
+        self.assertEqual([error.code for error in result.errors], ['country-code'])
+        self.assertEqual(result.count, 1)
+
+    def test_parallel_budget(self):
+        """Test that worker processes stop with the same findings as a serial run."""
+        entries = self.broken_entries(40)
+        with patch('validate._PARALLEL_MIN_CHUNK', 4):
+            result = validate_data({"as": entries}, jobs=3, max_errors=12)
+        self.assertTrue(result.stopped)
+        self.assertEqual(result.errors, validate_data({"as": entries}).errors[:12])
+
+    def test_text_summary(self):
+        output = io.StringIO()
+        result = validate_bytes(json.dumps({"as": self.broken_entries(10)}), max_errors=1)
+        self.assertFalse(report_text(result, output))
+        self.assertEqual(output.getvalue().splitlines()[-1], "✗ Validation stopped after 1 error(s) and 0 warning(s)")
+
+
+class TestLoadOverlay(unittest.TestCase):
+    """Test cases for the position-tracking overlay loader."""
+
+    def test_positions_compact(self):
+        """Test positions of one-entry-per-line entries."""
+        text = ('{\n  "as": [\n'
+                '    { "asn": 1, "countryCode": "US", "reason": "missing" },\n'
+                '    { "asn": 2, "countryCode": "GB", "reason": "missing" }\n'
+                '  ]\n}\n')
+        data, positions = load_overlay(text)
+        self.assertEqual(data, json.loads(text))
+        self.assertEqual(positions, [(3, 7), (4, 7)])
+
+    def test_positions_match_asn_lines(self):
+        """Test that pretty-printed entries map to the line of their "asn" key."""
+        entries = [{"asn": n, "countryCode": "US", "reason": "missing"} for n in range(1, 6)]
+        text = json.dumps({"as": entries}, indent=2)
+        asn_lines = [n for n, line in enumerate(text.splitlines(), 1) if '"asn"' in line]
+        _, positions = load_overlay(text)
+        self.assertEqual([line for line, _ in positions], asn_lines)
+
+    def test_entry_without_asn_uses_element_start(self):
+        """Test that an entry without "asn" maps to where the element starts."""
+        _, positions = load_overlay('{"as": [\n{"reason": "missing"}]}')
+        self.assertEqual(positions, [(2, 1)])
+
+    def test_other_keys_and_empty_array(self):
+        """Test that keys other than 'as' are decoded and skipped."""
+        data, positions = load_overlay('{"meta": {"as": [1]}, "as": [], "x": [1, 2]}')
+        self.assertEqual(data, {"meta": {"as": [1]}, "as": [], "x": [1, 2]})
+        self.assertEqual(positions, [])
+
+    def test_other_shapes_have_no_positions(self):
+        """Test that documents without the { "as": [...] } shape still decode."""
+        self.assertEqual(load_overlay('[1, 2]'), ([1, 2], None))
+        self.assertEqual(load_overlay('{"as": 5}'), ({"as": 5}, None))
+
+    def test_syntax_errors_match_json(self):
+        """Test that syntax errors carry the same message as json.loads()."""
+        for text in ['', '{ invalid json }', '{"as": [{"asn": 1},]}', '{"as": []} x', '{"as": [1 2]}']:
+            with self.assertRaises(json.JSONDecodeError) as expected:
+                json.loads(text)
+            with self.assertRaises(json.JSONDecodeError) as actual:
+                load_overlay(text)
+            self.assertEqual(str(actual.exception), str(expected.exception))
+
+    def test_error_lines_unchanged(self):
+        """Test that error messages point at the line of the entry's "asn" key."""
+        entries = [{"asn": n, "countryCode": "US", "reason": "missing"} for n in range(1, 4)]
+        entries[2]["countryCode"] = "XX"
+        result = validate_bytes(json.dumps({"as": entries}, indent=2))
+        self.assertFalse(result.valid)
+        self.assertTrue(result.errors[0].message.startswith("Line 14 (AS3): Invalid country code 'XX'"))
+
+    def test_validation_scales_linearly(self):
+        """Test that validation time grows linearly with the number of entries."""
+        def timed(count):
+            entries = [{"asn": n, "countryCode": "US", "reason": "missing"} for n in range(1, count + 1)]
+            text = json.dumps({"as": entries}, indent=2)
+            best = float('inf')
+            for _ in range(3):
+                start = time.perf_counter()
+                load_overlay(text)
+                best = min(best, time.perf_counter() - start)
+            return best
+
+        small, large = timed(20000), timed(80000)
+        # 4x the entries: about 4x the time when linear, 16x when quadratic
+        self.assertLess(large / small, 8)
+
+
+class TestStreamValidation(unittest.TestCase):
+    """Test cases for streaming validation."""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def run_validation(self, data, stream):
+        """Validate data in the test directory, returning (result, output)."""
+        with open(Path(self.test_dir) / 'overlay.json', 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        output = io.StringIO()
+        old_cwd = os.getcwd()
+        try:
+            os.chdir(self.test_dir)
+            with redirect_stdout(output):
+                result = validate_overlay(stream=stream)
+        finally:
+            os.chdir(old_cwd)
+        return result, output.getvalue()
+
+    def test_stream_output_matches_default(self):
+        """Test that streaming reports exactly what the default mode reports."""
+        entries = [
+            {"asn": 3000, "countryCode": "US", "reason": "missing"},
+            {"asn": 1000, "handle": "bad name", "description": "X", "countryCode": "XX", "reason": "missing"},
+            {"reason": "missing"},
+            {"asn": 64512, "countryCode": "US", "reason": "missing"},
+            {"asn": 1000, "countryCode": "USA", "reason": "inferred-fix"},
+            {"asn": 0, "countryCode": "US", "reason": "missing"},
+            {"asn": 5000, "reason": "missing", "countryCode": "GB"},
+        ]
+        for data in [{"as": entries}, {"as": entries[:1]}, {"as": []}, {"as": 5}, [1], {"x": 1}]:
+            self.assertEqual(self.run_validation(data, True), self.run_validation(data, False))
+
+    def test_stream_invalid_json(self):
+        """Test that syntax errors in streaming mode match the default mode."""
+        for text in ['{ invalid json }', '{"as": [\n{"asn": 1},\n{"asn" 2}]}', '{"as": []} x']:
+            with open(Path(self.test_dir) / 'overlay.json', 'w', encoding='utf-8') as f:
+                f.write(text)
+            outputs = []
+            for stream in (True, False):
+                output = io.StringIO()
+                old_cwd = os.getcwd()
+                try:
+                    os.chdir(self.test_dir)
+                    with redirect_stdout(output):
+                        self.assertFalse(validate_overlay(stream=stream))
+                finally:
+                    os.chdir(old_cwd)
+                outputs.append(output.getvalue())
+            self.assertEqual(outputs[0], outputs[1])
+
+    def test_reader_matches_loader_across_chunk_sizes(self):
+        """Test that entries and positions do not depend on where chunks split."""
+        entries = [{"asn": n * 7, "handle": "H", "score": n * 1.5e-3, "reason": "missing"} for n in range(1, 60)]
+        for indent in (None, 2):
+            text = json.dumps({"meta": {"as": [1.25]}, "as": entries, "tail": 12.5e3}, indent=indent)
+            data, positions = load_overlay(text)
+            for chunk_size in (1, 3, 64, 1 << 16):
+                items = list(OverlayReader(io.StringIO(text), chunk_size=chunk_size))
+                self.assertEqual([entry for entry, _, _ in items], data["as"])
+                self.assertEqual([(line, column) for _, line, column in items], positions)
+
+    def test_reader_syntax_errors_match_json(self):
+        """Test that syntax errors carry json's message and document position."""
+        for text in ['', '{"as": [1 2]}', '{"as": [{"asn": 1, "x": "a\nb"}]}', '{"as": [1], }', '[1, 2']:
+            with self.assertRaises(json.JSONDecodeError) as expected:
+                json.loads(text)
+            for chunk_size in (1, 4, 1 << 16):
+                with self.assertRaises(json.JSONDecodeError) as actual:
+                    list(OverlayReader(io.StringIO(text), chunk_size=chunk_size))
+                self.assertEqual(str(actual.exception), str(expected.exception))
+
+    def test_reader_shape_errors(self):
+        """Test that documents without an 'as' array raise OverlayShapeError."""
+        for text in ['[1]', '{"x": 1}', '{"as": {"asn": 1}}']:
+            with self.assertRaises(OverlayShapeError):
+                list(OverlayReader(io.StringIO(text)))
+
+    def test_stream_memory_is_flat(self):
+        """Test that streaming does not hold the document in memory."""
+        with open(Path(self.test_dir) / 'overlay.json', 'w', encoding='utf-8') as f:
+            f.write('{"as": [\n')
+            f.write(',\n'.join(
+                json.dumps({"asn": n, "handle": "EXAMPLE", "description": "Example", "countryCode": "US", "reason": "missing"})
+                for n in range(1, 20001)))
+            f.write('\n]}\n')
+        old_cwd = os.getcwd()
+        tracemalloc.start()
+        try:
+            os.chdir(self.test_dir)
+            with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+                self.assertTrue(validate_overlay(stream=True))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            os.chdir(old_cwd)
+        self.assertLess(peak, 1 << 20)
+
+
+class TestIncrementalValidation(unittest.TestCase):
+    """Test cases for validation against a git base revision."""
+
+    BASE = [
+        {"asn": 1000, "countryCode": "US", "reason": "missing"},
+        {"asn": 2000, "countryCode": "XX", "reason": "missing"},  # pre-existing error
+        {"asn": 3000, "countryCode": "GB", "reason": "missing"},
+        {"asn": 4000, "countryCode": "DE", "reason": "missing"},
+    ]
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.git('init', '-q')
+        self.write(self.BASE)
+        self.git('add', 'overlay.json')
+        self.git('-c', 'user.name=test', '-c', 'user.email=test@example.com', 'commit', '-q', '-m', 'base')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def git(self, *args):
+        subprocess.run(['git', *args], cwd=self.test_dir, check=True, capture_output=True)
+
+    def write(self, entries):
+        with open(Path(self.test_dir) / 'overlay.json', 'w', encoding='utf-8') as f:
+            f.write('{\n  "as": [\n')
+            f.write(',\n'.join('    ' + json.dumps(entry) for entry in entries))
+            f.write('\n  ]\n}\n')
+
+    def run_validation(self, **kwargs):
+        output = io.StringIO()
+        old_cwd = os.getcwd()
+        try:
+            os.chdir(self.test_dir)
+            with redirect_stdout(output):
+                result = validate_overlay(**kwargs)
+        finally:
+            os.chdir(old_cwd)
+        return result, output.getvalue()
+
+    def test_unchanged_overlay_passes(self):
+        """Test that pre-existing problems are not reported again."""
+        result, output = self.run_validation(base='HEAD')
+        self.assertTrue(result)
+        self.assertIn("Validating 0 of 4 entries", output)
+        self.assertIn("✓ No entries changed since HEAD", output)
+        self.assertNotIn("All 0 entries", output)
+
+    def test_added_entry_is_checked(self):
+        """Test that an added entry gets the same messages as full validation."""
+        entries = self.BASE[:3] + [{"asn": 3500, "reason": "missing", "countryCode": "FR"}] + self.BASE[3:]
+        self.write(entries)
+        result, output = self.run_validation(base='HEAD')
+        self.assertFalse(result)
+        self.assertIn("Line 6 (AS3500): Incorrect field order", output)
+        self.assertNotIn("AS2000", output)
+
+    def test_order_checked_around_changes(self):
+        """Test that moved and copied entries break sort order and uniqueness."""
+        entries = [self.BASE[1], self.BASE[0], self.BASE[2], self.BASE[3], self.BASE[2]]
+        self.write(entries)
+        result, output = self.run_validation(base='HEAD')
+        self.assertFalse(result)
+        self.assertIn("Line 4: ASNs must be sorted (ASN 1000 comes after 2000)", output)
+        self.assertIn("Line 7: Duplicate ASN 3000", output)
+        self.assertIn("Line 7: ASNs must be sorted (ASN 3000 comes after 4000)", output)
+
+    def test_duplicate_of_later_entry(self):
+        """Test that a changed entry duplicating a later, unchanged and non-adjacent ASN is reported."""
+        entries = [{**self.BASE[0], "asn": 3000}] + self.BASE[1:]
+        self.write(entries)
+        result, output = self.run_validation(base='HEAD')
+        self.assertFalse(result)
+        self.assertIn("Line 5: Duplicate ASN 3000", output)
+
+    def test_results_are_cached(self):
+        """Test that a second run reuses cached per-entry results."""
+        self.write(self.BASE + [{"asn": 5000, "countryCode": "FR", "reason": "missing"}])
+        first = self.run_validation(base='HEAD')
+        self.assertTrue((Path(self.test_dir) / '.validate-cache.json').exists())
+        with patch('validate.check_entry', side_effect=AssertionError('not cached')):
+            self.assertEqual(self.run_validation(base='HEAD'), first)
+
+    def test_near_duplicates_of_changed_entries(self):
+        """Test that a pair is reported when one of its entries changed, and only then."""
+        acme = {"asn": 1000, "handle": "ACME-NET", "description": "Acme Corporation", "countryCode": "US",
+                "reason": "missing"}
+        self.write([acme] + self.BASE[1:])
+        self.git('-c', 'user.name=test', '-c', 'user.email=test@example.com', 'commit', '-q', '-a', '-m', 'acme')
+        self.write([acme] + self.BASE[1:] + [{**acme, "asn": 5000, "countryCode": "DE"}])
+        result, output = self.run_validation(base='HEAD', similar=True)
+        self.assertTrue(result)
+        self.assertIn("Line 7 (AS5000): Description matches AS1000 (line 3), but countryCode 'DE' differs", output)
+        self.assertNotIn("Description matches", self.run_validation(base='HEAD')[1])
+
+    def test_unknown_revision(self):
+        """Test error when the base revision does not exist."""
+        result, output = self.run_validation(base='no-such-rev')
+        self.assertFalse(result)
+        self.assertIn("Error: cannot read overlay.json at no-such-rev", output)
+
+
+class TestOverlayWatcher(unittest.TestCase):
+    """Test cases for revalidation in --watch mode."""
+
+    ENTRIES = [
+        {"asn": 1000, "countryCode": "US", "reason": "missing"},
+        {"asn": 2000, "countryCode": "XX", "reason": "missing"},
+        {"asn": 3000, "countryCode": "GB", "reason": "missing"},
+        {"asn": 4000, "countryCode": "DE", "reason": "missing"},
+    ]
+
+    def render(self, entries):
+        return '{\n  "as": [\n' + ',\n'.join('    ' + json.dumps(entry) for entry in entries) + '\n  ]\n}\n'
+
+    def assertSameResult(self, result, text):
+        expected = validate_bytes(text)
+        self.assertEqual((list(result.errors), list(result.warnings), result.count),
+                         (list(expected.errors), list(expected.warnings), expected.count))
+
+    def test_edits_match_full_validation(self):
+        """Test that revalidating after each edit gives the same findings as a full run."""
+        watcher = OverlayWatcher()
+        text = self.render(self.ENTRIES)
+        self.assertSameResult(watcher.update(text), text)
+        self.assertFalse(watcher.incremental)
+        extra = '{"asn": 2500, "countryCode": "FR", "reason": "missing"}'
+        edits = [
+            lambda t: t.replace('"XX"', '"NL"'),                                  # fix an entry
+            lambda t: t.replace('"GB"', '"ZZ"'),                                  # break one
+            lambda t: t.replace('"asn": 3000', '"asn": 1000'),                    # duplicate, out of order
+            lambda t: t.replace('    {"asn": 1000, "countryCode": "ZZ"', '    ' + extra + ',\n    {"asn": 1000, '
+                                '"countryCode": "ZZ"'),                           # insert a line
+            lambda t: t.replace('    ' + extra + ',\n', ''),                     # delete it again
+            lambda t: t.replace('\n    {"asn": 4000', '\n\n\n    {"asn": 4000'),    # shift lines only
+            lambda t: t.replace(',\n\n\n    {"asn": 4000, "countryCode": "DE", "reason": "missing"}', ''),
+            lambda t: t.replace('    {"asn": 1000, "countryCode": "US", "reason": "missing"},\n', ''),
+        ]
+        for edit in edits:
+            changed = edit(text)
+            self.assertNotEqual(changed, text)
+            text = changed
+            self.assertSameResult(watcher.update(text), text)
+            self.assertTrue(watcher.incremental)
+
+    def test_only_changed_entries_are_checked(self):
+        watcher = OverlayWatcher()
+        text = self.render(self.ENTRIES)
+        watcher.update(text)
+        with patch('validate.check_entry', wraps=check_entry) as check:
+            result = watcher.update(text.replace('"XX"', '"NL"'))
+        self.assertEqual(check.call_count, 1)
+        self.assertTrue(result.valid)
+
+    def test_full_parse_fallback(self):
+        """Test syntax errors, recovery and edits outside the 'as' array."""
+        watcher = OverlayWatcher()
+        text = self.render(self.ENTRIES)
+        watcher.update(text)
+        broken = text.replace('"XX"', '"XX')
+        result = watcher.update(broken)
+        self.assertEqual(result.errors[0].code, 'json-syntax')
+        self.assertSameResult(watcher.update(text), text)
+        self.assertFalse(watcher.incremental)
+        for changed in [text.replace('"as"', '"meta": 1, "as"'), '{"as": []}', '[]', text]:
+            self.assertSameResult(watcher.update(changed), changed)
+            self.assertFalse(watcher.incremental)
+
+    def test_poll(self):
+        """Test that the file is re-read only when it changes."""
+        test_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, test_dir, ignore_errors=True)
+        path = test_dir / 'overlay.json'
+        watcher = OverlayWatcher(path)
+        self.assertEqual(watcher.poll().errors[0].code, 'not-found')
+        self.assertIsNone(watcher.poll())
+        path.write_text(self.render(self.ENTRIES), encoding='utf-8')
+        self.assertEqual(len(watcher.poll().errors), 1)
+        self.assertIsNone(watcher.poll())
+        path.write_text(self.render(self.ENTRIES[:1]), encoding='utf-8')
+        self.assertTrue(watcher.poll().valid)
+        self.assertTrue(watcher.incremental)
+
+    def test_error_budget(self):
+        watcher = OverlayWatcher(max_errors=1)
+        result = watcher.update(self.render(self.ENTRIES).replace('"US"', '"YY"'))
+        self.assertTrue(result.stopped)
+        self.assertEqual([error.asn for error in result.errors], [1000])
+
+
+class TestParallelValidation(unittest.TestCase):
+    """Test cases for validation in worker processes."""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def run_validation(self, entries, jobs):
+        with open(Path(self.test_dir) / 'overlay.json', 'w', encoding='utf-8') as f:
+            json.dump({"as": entries}, f, indent=2)
+        output = io.StringIO()
+        old_cwd = os.getcwd()
+        try:
+            os.chdir(self.test_dir)
+            with redirect_stdout(output), patch('validate._PARALLEL_MIN_CHUNK', 4):
+                result = validate_overlay(jobs=jobs)
+        finally:
+            os.chdir(old_cwd)
+        return result, output.getvalue()
+
+    def test_matches_serial_output(self):
+        """Test that errors spanning chunk boundaries come out as in serial mode."""
+        asns = [10, 20, 30, 40, 50, 60, 55, 70, 20, 80, 90, 100, 100, 110, 5, 120, 130, 140, 40, 150]
+        entries = [{"asn": asn, "countryCode": "US", "reason": "missing"} for asn in asns]
+        entries[3]["countryCode"] = "XX"
+        entries[9] = {"reason": "missing"}
+        entries[16]["asn"] = 64512
+        self.assertEqual(self.run_validation(entries, 3), self.run_validation(entries, 1))
+
+    def test_valid_sorted_overlay(self):
+        """Test that a valid overlay passes with several workers."""
+        entries = [{"asn": asn, "countryCode": "US", "reason": "missing"} for asn in range(1, 40)]
+        result, output = self.run_validation(entries, 2)
+        self.assertTrue(result)
+        self.assertIn("All 39 entries are valid", output)
+
+
+class TestColumnarValidation(unittest.TestCase):
+    """Test cases for the ASN checks run over an ASN column."""
+
+    def setUp(self):
+        asns = [10, 20, 0, 30, 4294967296, 2 ** 70, True, "40", 23456, 64500, 64512, 20, 15, 4200000000, 50, 50]
+        self.entries = [{"asn": asn, "countryCode": "US", "reason": "missing"} for asn in asns]
+        self.entries[1]["countryCode"] = "XX"
+        self.entries[3] = {"asn": 30, "reason": "missing"}
+        self.entries.insert(5, {"countryCode": "US", "reason": "missing"})
+
+    def findings(self, result):
+        return result.count, result.errors, result.warnings
+
+    def test_matches_entry_by_entry(self):
+        reference = self.findings(validate_data({"as": self.entries}))
+        self.assertIn('reserved-asn', {finding.code for finding in reference[1]})
+        with patch('validate._COLUMNAR_MIN_ENTRIES', 1):
+            self.assertEqual(self.findings(validate_data({"as": self.entries})), reference)
+            self.assertEqual(self.findings(validate_data({"as": []})), (0, [], []))
+        with patch('validate._COLUMNAR_MIN_ENTRIES', 1), patch('validate._numpy', lambda: None):
+            self.assertEqual(self.findings(validate_data({"as": self.entries})), reference)
+        with patch('validate._COLUMNAR_MIN_ENTRIES', 1):
+            result = validate_data({"as": self.entries}, max_errors=3)
+        self.assertEqual(result.errors, reference[1][:3])
+        self.assertTrue(result.stopped)
+
+    @unittest.skipUnless(find_spec('numpy'), 'numpy not installed')
+    def test_numpy_matches_loops(self):
+        import numpy
+        rng = random.Random(5)
+        entries = list(self.entries)
+        for _ in range(5000):
+            asn = rng.choice([rng.randint(1, 70000), rng.randint(4199999990, 4294967300)])
+            entries.append({"asn": asn, "countryCode": "US", "reason": "missing"})
+        self.assertEqual(_check_columns(entries, numpy), _check_columns(entries))
+
+
+class TestRuleProfile(unittest.TestCase):
+    """Test cases for per-rule instrumentation."""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def run_validation(self, entries, **kwargs):
+        with open(Path(self.test_dir) / 'overlay.json', 'w', encoding='utf-8') as f:
+            json.dump({"as": entries}, f, indent=2)
+        output = io.StringIO()
+        with redirect_stdout(output), patch('validate._PARALLEL_MIN_CHUNK', 4):
+            result = validate_overlay(path=Path(self.test_dir) / 'overlay.json', **kwargs)
+        return result, output.getvalue()
+
+    def test_phase_hooks(self):
+        """Test that phase hooks see each phase of a whole-file validation, and only reporting when streamed."""
+        entries = [{"asn": 10, "handle": "ACME", "description": "Acme", "countryCode": "US", "reason": "missing"}]
+        for kwargs, expected in [
+            ({}, ['read', 'load', 'checks', 'reporting']),
+            ({'similar': True}, ['read', 'load', 'checks', 'near_duplicates', 'reporting']),
+            ({'stream': True}, ['reporting']),
+        ]:
+            with self.subTest(**kwargs):
+                phases = []
+                hook = lambda phase, seconds: phases.append((phase, seconds >= 0))
+                add_phase_hook(hook)
+                try:
+                    self.assertTrue(self.run_validation(entries, **kwargs)[0])
+                finally:
+                    remove_phase_hook(hook)
+                self.assertEqual(phases, [(phase, True) for phase in expected])
+
+    def test_rule_names(self):
+        """Test that each check is a named rule."""
+        for name in ['reserved-asn', 'private-asn', 'duplicate', 'sort-order', 'country-code',
+                     'handle-format', 'field-order', 'unexpected-fields']:
+            self.assertIn(name, RULE_NAMES)
+        self.assertEqual(len(RULE_NAMES), len(set(RULE_NAMES)))
+
+    def test_counts_calls_and_hits(self):
+        """Test that the profile counts every rule run and every rule that fired."""
+        entries = [
+            {"asn": 10, "countryCode": "XX", "reason": "missing"},
+            {"asn": 23456, "countryCode": "US", "reason": "missing"},
+            {"asn": 64512, "countryCode": "US", "reason": "missing", "extra": 1},
+            {"asn": 64512, "countryCode": "US", "reason": "missing"},
+            {"asn": 30, "handle": "ACME NET", "description": "Acme", "countryCode": "US", "reason": "missing"},
+        ]
+        unprofiled = self.run_validation(entries)
+        profile = RuleProfile()
+        add_rule_hook(profile)
+        try:
+            self.assertEqual(self.run_validation(entries, jobs=2), unprofiled)
+        finally:
+            remove_rule_hook(profile)
+
+        stats = profile.snapshot()
+        self.assertEqual(stats['asn']['calls'], 5)
+        self.assertEqual(stats['reserved-asn']['hits'], 1)
+        # The reserved ASN is rejected before the remaining rules
+        self.assertEqual(stats['private-asn']['calls'], 4)
+        self.assertEqual(stats['private-asn']['hits'], 2)
+        self.assertEqual(stats['duplicate']['hits'], 1)
+        self.assertEqual(stats['sort-order']['hits'], 1)
+        self.assertEqual(stats['country-code']['hits'], 1)
+        self.assertEqual(stats['handle-format']['hits'], 1)
+        self.assertEqual(stats['unexpected-fields']['hits'], 1)
+        self.assertEqual(stats['field-order']['hits'], 1)
+        self.assertTrue(all(rule['seconds'] >= 0 for rule in stats.values()))
+
+        output = io.StringIO()
+        with redirect_stdout(output):
+            profile.report()
+        self.assertIn("RULE PROFILE:", output.getvalue())
+        self.assertIn("reserved-asn", output.getvalue())
+
+    def test_hooks_removed(self):
+        """Test that a removed hook sees no further runs."""
+        calls = []
+        hook = lambda rule, seconds, hit: calls.append(rule)
+        add_rule_hook(hook)
+        remove_rule_hook(hook)
+        self.run_validation([{"asn": 10, "countryCode": "US", "reason": "missing"}])
+        self.assertEqual(calls, [])
+
+
+class TestAsnOrder(unittest.TestCase):
+    """Test cases for duplicate and sort-order tracking."""
+
+    def test_duplicates_and_order(self):
+        """Test that duplicates are found whether or not they are adjacent."""
+        order = AsnOrder()
+        results = [order.add(asn) for asn in [10, 20, 20, 15, 30, 10, 15, 5]]
+        self.assertEqual(results, [
+            (False, None), (False, None), (True, None), (False, 20),
+            (False, None), (True, 30), (True, None), (False, 15),
+        ])
+
+    def test_separate_checks(self):
+        """Test that the duplicate and sort-order checks can run one at a time."""
+        order = AsnOrder()
+        self.assertEqual([(order.seen(asn), order.follows(asn)) for asn in [10, 20, 10, 5]],
+                         [(False, None), (False, None), (True, 20), (False, 10)])
+
+
+class TestNearDuplicates(unittest.TestCase):
+    """Test cases for near-duplicate descriptions and handle collisions."""
+
+    def entry(self, asn, handle, description, country='US'):
+        return {"asn": asn, "handle": handle, "description": description, "countryCode": country,
+                "reason": "missing"}
+
+    def warnings(self, entries):
+        result = validate_data({"as": entries}, similar=True)
+        self.assertTrue(result.valid)
+        return [(finding.code, finding.message) for finding in result.warnings
+                if finding.code in ('similar-description', 'handle-collision')]
+
+    def test_similar_descriptions(self):
+        """Test that spelling variants are reported and the same name in one country is not."""
+        self.assertEqual(self.warnings([
+            self.entry(11000, "ACME-NET", "Acme Telecommunications Corporation"),
+            self.entry(11001, "ACME-BACKUP", "ACME telecommunications corporation."),
+            self.entry(11002, "ACME-LABS", "Acme Telecomunications Corporation"),
+            self.entry(11003, "OTHER", "Other Telecommunications Inc"),
+        ]), [
+            ('similar-description',
+             "Line 5 (AS11002): Description 'Acme Telecomunications Corporation' is nearly identical to "
+             "'Acme Telecommunications Corporation' of AS11000 (line 3)"),
+        ])
+
+    def test_opt_in(self):
+        """Test that near-duplicates are only checked when asked for."""
+        entries = [self.entry(11000, "ACME-NET", "Acme Telecommunications Corporation"),
+                   self.entry(11002, "ACME-LABS", "Acme Telecomunications Corporation")]
+        self.assertEqual(validate_data({"as": entries}).warnings, [])
+        self.assertEqual(len(self.warnings(entries)), 1)
+
+    def test_same_description_other_country(self):
+        self.assertEqual(self.warnings([
+            self.entry(11000, "ACME-NET", "Acme Corporation"),
+            self.entry(11001, "ACME-DE", "Acme Corporation", "DE"),
+        ]), [
+            ('similar-description',
+             "Line 4 (AS11001): Description matches AS11000 (line 3), but countryCode 'DE' differs from 'US'"),
+        ])
+
+    def test_handle_collisions(self):
+        """Test handles that differ only in punctuation, and one handle used for two organizations."""
+        self.assertEqual(self.warnings([
+            self.entry(11000, "ACME-NET", "Acme Corporation"),
+            self.entry(11001, "ACMENET", "Acme Corporation"),
+            self.entry(11002, "ACME-NET", "Globex Industries"),
+            self.entry(11003, "ACME-NET", "Acme Corporation"),
+        ]), [
+            ('handle-collision', "Line 4 (AS11001): Handle 'ACMENET' is a variant of 'ACME-NET' of AS11000 (line 3)"),
+            ('handle-collision',
+             "Line 5 (AS11002): Handle 'ACME-NET' is also used by AS11000 (line 3) with a different description"),
+        ])
+
+    def test_changed_only(self):
+        """Test that only pairs involving a changed record are reported."""
+        records = [
+            (3, 11000, "ACME-NET", "Acme Corporation", "US"),
+            (4, 11001, "ACME-DE", "Acme Corporation", "DE"),
+            (5, 11002, "GLOBEX", "Globex Industries", "US"),
+            (6, 11003, "GLOBEX-2", "Globex Industriess", "US"),
+        ]
+        self.assertEqual(len(near_duplicates(records)), 2)
+        self.assertEqual([finding[:3] for finding in near_duplicates(records, changed={2})],
+                         [(6, 'similar-description', 11003)])
+        self.assertEqual(near_duplicates(records, changed=set()), [])
+
+    def test_many_entries(self):
+        """Test that thousands of descriptions sharing stems and suffixes are compared in near-linear time."""
+        rng = random.Random(1)
+        syllables = ['ka', 'to', 'ri', 'net', 'lan', 'mo', 'vi', 'sa', 'tel', 'co', 'ra', 'zen', 'bi', 'dor']
+        suffixes = ['Networks LLC', 'Telecom', 'Telecom Ltd', 'Internet Services', 'Communications Inc',
+                    'Telecomunicações Ltda']
+        names = set()
+        while len(names) < 20000:
+            stem = ''.join(rng.choice(syllables) for _ in range(rng.randint(3, 5))).title()
+            names.add(f"{stem} {rng.choice(suffixes)}")
+        entries = [self.entry(asn, f"NET-{asn}", name) for asn, name in zip(range(100000, 120000), sorted(names))]
+        entries[123]["description"] = "Quixotic Fjordwerk Networks LLC"
+        entries.append(self.entry(120000, "NET-DUP", "Quixotic Fjordwerks Networks LLC"))
+        start = time.perf_counter()
+        warnings = self.warnings(entries)
+        self.assertLess(time.perf_counter() - start, 5)
+        self.assertIn("Line 20003 (AS120000): Description 'Quixotic Fjordwerks Networks LLC' is nearly identical "
+                      "to 'Quixotic Fjordwerk Networks LLC' of AS100123 (line 126)", [message for _, message in warnings])
+
+
 class TestPRBodyValidation(unittest.TestCase):
     """Test cases for PR body aggregator validation."""
 
@@ -386,6 +1223,20 @@ class TestPRBodyValidation(unittest.TestCase):
         self.assertEqual(len(errors), 1)
         self.assertIn("cymru.com", errors[0])
 
+    def test_team_cymru_detected(self):
+        """Test that team-cymru.com and its subdomains are detected."""
+        for text in ("See team-cymru.com", "See https://www.team-cymru.com/ip-asn-mapping"):
+            with self.subTest(text=text):
+                errors = validate_pr_body(text)
+                self.assertEqual(errors, ["PR body references disallowed aggregator: team-cymru.com"])
+
+    def test_markdown_emphasis_detected(self):
+        """Test that _domain_ and __domain__ are detected."""
+        self.assertEqual(validate_pr_body("Data from _ipinfo.io_ and __bgp.tools__"), [
+            "PR body references disallowed aggregator: ipinfo.io",
+            "PR body references disallowed aggregator: bgp.tools",
+        ])
+
     def test_ipinfo_detected(self):
         """Test that ipinfo.io is detected."""
         errors = validate_pr_body("Source: ipinfo.io/AS12345")
@@ -447,5 +1298,53 @@ class TestPRBodyValidation(unittest.TestCase):
         self.assertEqual(len(errors), 1)
 
 
+    def test_lookalike_domains_pass(self):
+        """Test that only the domains and their subdomains are matched, not lookalikes."""
+        errors = validate_pr_body("See notbgp.tools, ipinfo.iona and bgp.tools.example.com")
+        self.assertEqual(errors, [])
+
+
+class TestAggregatorScanner(unittest.TestCase):
+    """Test cases for the single-pass aggregator scanner."""
+
+    TEXT = "Sources:\n- https://BGP.tools/as/1 and\n  noc@asn.cymru.com, bgp.he.net"
+
+    def test_positions(self):
+        matches = list(AggregatorScanner().finditer(self.TEXT))
+        self.assertEqual(matches, [
+            AggregatorMatch('bgp.tools', 'BGP.tools', 19, 2, 11),
+            AggregatorMatch('cymru.com', 'asn.cymru.com', 44, 3, 7),
+        ])
+        self.assertEqual(self.TEXT[44:44 + len('asn.cymru.com')], 'asn.cymru.com')
+
+    def test_stream_matches_whole_text(self):
+        """Test that reading in chunks finds the same matches, also across chunk boundaries."""
+        expected = list(AggregatorScanner().finditer(self.TEXT))
+        for chunk_size in (1, 2, 5, 64):
+            self.assertEqual(list(AggregatorScanner().scan(io.StringIO(self.TEXT), chunk_size)), expected)
+
+    def test_markdown_emphasis(self):
+        """Test that domains in _emphasis_ or __strong__ Markdown are found, and not taken with a trailing _x."""
+        for text, host in [("See _ipinfo.io_", 'ipinfo.io'), ("See __bgp.tools__", 'bgp.tools'),
+                           ("See bgp.tools_x", 'bgp.tools'), ("See *_asn.cymru.com_*", 'asn.cymru.com')]:
+            with self.subTest(text=text):
+                self.assertEqual([match.host for match in AggregatorScanner().finditer(text)], [host])
+
+    def test_prefilter_matches_trie(self):
+        """Test that a short list, ruled out by substring searches first, finds what a long one does."""
+        domains = ['bgp.tools', 'cymru.com']
+        padded = domains + [f"aggregator{idx}.example" for idx in range(100)]
+        for text in (self.TEXT, "No sources here", "BGP.TOOLS.example and cymru.community", "Ｋ bgp.toolsx"):
+            with self.subTest(text=text):
+                self.assertEqual(list(AggregatorScanner(domains).finditer(text)),
+                                 list(AggregatorScanner(padded).finditer(text)))
+
+    def test_custom_domains(self):
+        domains = [f"aggregator{idx}.example" for idx in range(500)] + ['he.net']
+        scanner = AggregatorScanner(domains)
+        self.assertEqual([match.domain for match in scanner.finditer(self.TEXT + " AGGREGATOR250.example")],
+                         ['he.net', 'aggregator250.example'])
+
+
 if __name__ == '__main__':
     unittest.main()
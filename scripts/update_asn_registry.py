@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Regenerate asn_registry.csv from the IANA Autonomous System Numbers registry.
+
+The special-purpose ranges already in asn_registry.csv (reserved, AS_TRANS,
+documentation and private use) are kept and take precedence; every other
+range is replaced by the RIR allocations and unallocated blocks from IANA.
+"""
+
+import argparse
+import csv
+import io
+import urllib.request
+
+from asn_registry import DEFAULT_REGISTRY_PATH, AsnRange, AsnRegistry
+
+IANA_SOURCES = [
+  'https://www.iana.org/assignments/as-numbers/as-numbers-1.csv',
+  'https://www.iana.org/assignments/as-numbers/as-numbers-2.csv',
+]
+SPECIAL_CATEGORIES = {'reserved', 'as-trans', 'documentation', 'private'}
+# Registry categories of the descriptions IANA uses outside of RIR assignments
+IANA_CATEGORIES = {
+  'Reserved': 'reserved',
+  'AS_TRANS': 'as-trans',
+  'Reserved for use in documentation and sample code': 'documentation',
+  'Reserved for Private Use': 'private',
+  'Unallocated': 'unallocated',
+}
+RIRS = {'AFRINIC', 'APNIC', 'ARIN', 'LACNIC', 'RIPE NCC'}
+
+
+def read_source(source):
+  """Return the text of a local file or URL."""
+  if source.startswith(('http://', 'https://')):
+    with urllib.request.urlopen(source, timeout=30) as response:
+      return response.read().decode('utf-8-sig')
+  with open(source, encoding='utf-8-sig') as f:
+    return f.read()
+
+
+def parse_iana(text):
+  """Yield AsnRange rows from an IANA as-numbers CSV export.
+
+  Raises ValueError on a description that maps to no known category or RIR,
+  so a change in IANA's wording is not silently filed under the wrong one.
+  """
+  for row in csv.DictReader(io.StringIO(text)):
+    number = row['Number'].strip()
+    start, _, end = number.partition('-')
+    description = row['Description'].strip()
+    rir = description[len('Assigned by '):] if description.startswith('Assigned by ') else None
+    if rir in RIRS:
+      category = 'allocated'
+    elif description in IANA_CATEGORIES:
+      category, rir = IANA_CATEGORIES[description], None
+    else:
+      raise ValueError(f"Unknown IANA description '{description}' for AS{number}")
+    yield AsnRange(int(start), int(end or start), category, rir, description)
+
+
+def subtract(ranges, holes):
+  """Return ranges with the (start, end) intervals in holes cut out."""
+  result = []
+  for r in ranges:
+    pieces = [(r.start, r.end)]
+    for hole_start, hole_end in holes:
+      pieces = [piece for start, end in pieces for piece in (
+        (start, min(end, hole_start - 1)), (max(start, hole_end + 1), end)) if piece[0] <= piece[1]]
+    result.extend(r._replace(start=start, end=end) for start, end in pieces)
+  return result
+
+
+def merge(special, iana):
+  """Combine special-purpose and IANA ranges, joining adjacent equal blocks."""
+  ranges = sorted(list(special) + subtract(iana, [(r.start, r.end) for r in special]), key=lambda r: r.start)
+  merged = []
+  for r in ranges:
+    last = merged[-1] if merged else None
+    if last and last.end + 1 == r.start and last[2:] == r[2:]:
+      merged[-1] = last._replace(end=r.end)
+    else:
+      merged.append(r)
+  return merged
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Regenerate asn_registry.csv from the IANA registry.')
+  parser.add_argument('sources', nargs='*', default=IANA_SOURCES,
+                      help='IANA as-numbers CSV files or URLs (default: the 16- and 32-bit registries on iana.org)')
+  parser.add_argument('--output', default=DEFAULT_REGISTRY_PATH, help='Registry CSV to update')
+  args = parser.parse_args()
+
+  special = [r for r in AsnRegistry.load(args.output) if r.category in SPECIAL_CATEGORIES]
+  iana = [r for source in args.sources for r in parse_iana(read_source(source))]
+  ranges = merge(special, iana)
+  AsnRegistry(ranges)  # Refuse to write overlapping or unknown ranges
+
+  with open(args.output, 'w', newline='', encoding='utf-8') as f:
+    writer = csv.writer(f, lineterminator='\n')
+    writer.writerow(AsnRange._fields)
+    for r in ranges:
+      writer.writerow([r.start, r.end, r.category, r.rir or '', r.description])
+  print(f"Wrote {len(ranges)} ranges to {args.output}")
+
+
+if __name__ == '__main__':
+  main()
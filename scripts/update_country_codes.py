@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Regenerate country_codes.py from pycountry's ISO 3166-1 table."""
+
+import argparse
+import sys
+from importlib import metadata
+from pathlib import Path
+
+TABLE_PATH = Path(__file__).parent / 'country_codes.py'
+CODES_PER_LINE = 12
+
+
+def load_codes():
+  """Return pycountry's alpha-2 codes and the pycountry version."""
+  import pycountry
+  return {country.alpha_2 for country in pycountry.countries}, metadata.version('pycountry')
+
+
+def render(codes, version):
+  """Render the source of country_codes.py for the given codes."""
+  codes = sorted(codes)
+  rows = [', '.join(f"'{code}'" for code in codes[i:i + CODES_PER_LINE])
+          for i in range(0, len(codes), CODES_PER_LINE)]
+  body = ''.join(f'  {row},\n' for row in rows)
+  return (
+    '"""ISO 3166-1 alpha-2 country codes accepted in overlay.json.\n'
+    '\n'
+    f'Generated by update_country_codes.py from pycountry {version}; do not edit.\n'
+    '"""\n'
+    '\n'
+    'COUNTRY_CODES = frozenset({\n'
+    f'{body}'
+    '})\n'
+  )
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Regenerate country_codes.py from pycountry.')
+  parser.add_argument('--check', action='store_true',
+                      help='Exit with status 1 if country_codes.py differs from pycountry instead of writing it')
+  args = parser.parse_args()
+
+  codes, version = load_codes()
+  if args.check:
+    from country_codes import COUNTRY_CODES
+    added = sorted(codes - COUNTRY_CODES)
+    removed = sorted(COUNTRY_CODES - codes)
+    if added or removed:
+      print(f"country_codes.py is out of date with pycountry {version}")
+      if added:
+        print(f"  added: {', '.join(added)}")
+      if removed:
+        print(f"  removed: {', '.join(removed)}")
+      sys.exit(1)
+    print(f"✓ country_codes.py matches pycountry {version} ({len(codes)} codes)")
+    return
+
+  TABLE_PATH.write_text(render(codes, version), encoding='utf-8')
+  print(f"Wrote {len(codes)} codes from pycountry {version} to {TABLE_PATH.name}")
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""Regenerate missing.json and STATS.md from the base dataset and overlay.json.
+
+The base dataset is the sorted AS metadata read by apply_overlay.py, before
+the overlay is applied. Each base record falls into at most one category:
+
+  all        no handle, description or country code
+  country    a handle or description, but no country code
+  inferred   origin 'inferred'
+
+A record is corrected when overlay.json has an entry for its ASN. Records
+missing all metadata or a country that are not corrected are listed in
+missing.json. Base and overlay are joined in a single streaming pass; only
+the per-category counters are kept in memory.
+"""
+
+import argparse
+import filecmp
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+from apply_overlay import BaseReader, join
+from validate import OverlayReader
+
+REPO_DIR = Path(__file__).parent.parent
+OVERLAY_PATH = REPO_DIR / 'overlay.json'
+MISSING_PATH = REPO_DIR / 'missing.json'
+STATS_PATH = REPO_DIR / 'STATS.md'
+
+# Category, STATS.md metric, whether uncorrected records go to missing.json
+CATEGORIES = (
+  ('all', 'Missing all metadata', True),
+  ('country', 'Missing country', True),
+  ('inferred', 'Inferred', False),
+)
+
+
+def classify(record):
+  """Return the category of a base record, or None if it needs nothing."""
+  if not record.get('countryCode'):
+    return 'country' if record.get('handle') or record.get('description') else 'all'
+  if record.get('origin') == 'inferred':
+    return 'inferred'
+  return None
+
+
+def write_missing(pairs, f):
+  """Write missing.json for (record, entry) pairs to f; return the counters.
+
+  The counters map each category to [issues, corrected].
+  """
+  counts = {category: [0, 0] for category, _, _ in CATEGORIES}
+  listed = {category for category, _, missing in CATEGORIES if missing}
+  separator = ''
+  f.write('{\n  "as": [')
+  for record, entry in pairs:
+    if record is None:
+      continue
+    category = classify(record)
+    if category is None:
+      continue
+    counts[category][0] += 1
+    if entry is not None:
+      counts[category][1] += 1
+    elif category in listed:
+      f.write(f'{separator}\n    {{ "asn": {record["asn"]}, "missing": "{category}" }}')
+      separator = ','
+  f.write('\n  ]\n}\n' if separator else ']\n}\n')
+  return counts
+
+
+def _number(count):
+  return f'{count:,}'.replace(',', ' ')
+
+
+def render_stats(counts):
+  """Render STATS.md for the counters returned by write_missing()."""
+  rows = []
+  for category, metric, missing in CATEGORIES:
+    issues, corrected = counts[category]
+    remaining = _number(issues - corrected) + ' ' if missing else ''
+    rows.append(f'| {metric} | {_number(issues)} | {_number(corrected)} | {remaining}|\n')
+  return (
+    '# as-overlay Statistics\n'
+    '\n'
+    '| Metric | Issues | Corrected | Remaining |\n'
+    '|:-------|-------:|----------:|----------:|\n'
+    f'{"".join(rows)}'
+  )
+
+
+def _stage(path):
+  """Return (fd, name) of a temporary file next to path."""
+  return tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.')
+
+
+def update_missing(base_path, overlay_path=OVERLAY_PATH, missing_path=MISSING_PATH, stats_path=STATS_PATH,
+                   check=False):
+  """Regenerate missing_path and stats_path; return the names of changed files.
+
+  With check=True the files are compared with the generated output and left
+  untouched.
+  """
+  missing_path, stats_path = Path(missing_path), Path(stats_path)
+  fd, tmp = _stage(missing_path)
+  try:
+    with os.fdopen(fd, 'w', encoding='utf-8') as out, \
+         open(base_path, encoding='utf-8') as base, open(overlay_path, encoding='utf-8') as overlay:
+      counts = write_missing(join(BaseReader(base), OverlayReader(overlay)), out)
+    stats = render_stats(counts)
+    changed = []
+    if not missing_path.exists() or not filecmp.cmp(tmp, missing_path, shallow=False):
+      changed.append(missing_path.name)
+    if not stats_path.exists() or stats_path.read_text(encoding='utf-8') != stats:
+      changed.append(stats_path.name)
+    if check:
+      return changed
+    os.replace(tmp, missing_path)
+  finally:
+    if os.path.exists(tmp):
+      os.unlink(tmp)
+  stats_path.write_text(stats, encoding='utf-8')
+  return changed
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Regenerate missing.json and STATS.md from base data and overlay.json.')
+  parser.add_argument('base', help='Base dataset (JSON array or JSON Lines, sorted by ASN)')
+  parser.add_argument('--overlay', default=OVERLAY_PATH, help='Overlay file (default: overlay.json in the repo)')
+  parser.add_argument('--check', action='store_true',
+                      help='Exit with status 1 if missing.json or STATS.md is out of date instead of writing them')
+  args = parser.parse_args()
+
+  try:
+    changed = update_missing(args.base, args.overlay, check=args.check)
+  except (OSError, ValueError) as e:
+    print(f"✗ {e}", file=sys.stderr)
+    sys.exit(1)
+  if args.check:
+    if changed:
+      print(f"Out of date: {', '.join(changed)}")
+      sys.exit(1)
+    print(f"✓ {MISSING_PATH.name} and {STATS_PATH.name} are up to date")
+    return
+  print(f"Wrote {MISSING_PATH.name} and {STATS_PATH.name}" + (f" ({', '.join(changed)} changed)" if changed else ''))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,2059 @@
+#!/usr/bin/env python3
+"""Validate overlay.json structure and data quality."""
+
+import hashlib
+import io
+import itertools
+import json
+import re
+import sys
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+from functools import partial
+from importlib import import_module
+from importlib.util import find_spec
+from pathlib import Path
+
+from asn_registry import AsnRegistry
+from country_codes import COUNTRY_CODES as VALID_COUNTRY_CODES
+
+VALID_REASONS = {'missing', 'inferred-fix', 'internal'}
+
+# ASN validation ranges, from the IANA registry data in asn_registry.csv
+MAX_ASN = 4294967295  # 2^32 - 1
+ASN_REGISTRY = AsnRegistry.load()
+RESERVED_ASNS = {start for start, end in ASN_REGISTRY.ranges('reserved', 'as-trans') if start == end}
+RESERVED_ASN_RANGES = ASN_REGISTRY.ranges('documentation')  # Documentation/sample code
+PRIVATE_ASN_RANGES = ASN_REGISTRY.ranges('private')
+
+# Field length limits
+MAX_HANDLE_LENGTH = 30
+MAX_DESCRIPTION_LENGTH = 100
+
+# Descriptions whose trigram sets are at least this similar (Jaccard) count
+# as the same organization for the near-duplicate checks
+SIMILARITY_THRESHOLD = 0.8
+# Each trigram indexes at most this many descriptions, so that names sharing
+# stems and suffixes ('Networks LLC', 'Telecom') keep the checks near-linear
+SIMILARITY_MAX_POSTINGS = 50
+
+# Disallowed aggregators (sources that should not be cited in PRs)
+# These are data aggregators whose terms of service or data quality
+# make them unsuitable as sources for overlay data. Each domain also
+# covers its subdomains (whois.cymru.com, asn.cymru.com, ...).
+DISALLOWED_AGGREGATORS = [
+    'cymru.com',
+    'team-cymru.com',
+    'ipinfo.io',
+    'bgp.tools',
+]
+
+
+def is_asn_in_ranges(asn, ranges):
+    """Check if ASN is in any of the given ranges."""
+    return any(start <= asn <= end for start, end in ranges)
+
+
+# Whitespace allowed between JSON tokens, and the "asn" key of an entry
+_JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_ASN_KEY = re.compile(r'"asn"\s*:')
+_DECODER = json.JSONDecoder()
+
+# Streaming: characters read per chunk, how far past a value to read before
+# treating a decode error as final, and message bytes kept in memory
+_STREAM_CHUNK_SIZE = 1 << 16
+_STREAM_LOOKAHEAD = 1 << 20
+_SPOOL_MEMORY = 1 << 20
+
+# Per-entry results reused by incremental (--base) validation
+DEFAULT_CACHE_PATH = Path('.validate-cache.json')
+
+# Parallel (--jobs) validation: smallest chunk worth sending to a worker,
+# and chunks per worker so that uneven chunks still balance
+_PARALLEL_MIN_CHUNK = 5000
+_PARALLEL_CHUNKS_PER_JOB = 4
+
+# Columnar validation: smallest overlay whose ASN checks run over a column
+# (with NumPy when it is installed) instead of entry by entry
+_COLUMNAR_MIN_ENTRIES = 20000
+
+SHAPE_NOT_OBJECT = "overlay.json must contain an object with 'as' array"
+SHAPE_NOT_ARRAY = "overlay.json 'as' field must be an array"
+
+# One error or warning. code names the rule that found it, or the problem
+# that stopped validation ('not-found', 'read-error', 'json-syntax', 'shape',
+# 'base-error'); line and asn are None where they do not apply.
+Finding = namedtuple('Finding', 'severity code line asn message')
+
+
+class _LineCounter:
+  """Map increasing character offsets in a text to 1-based (line, column)."""
+
+  __slots__ = ('text', 'offset', 'line', 'line_start')
+
+  def __init__(self, text):
+    self.text = text
+    self.offset = 0
+    self.line = 1
+    self.line_start = 0
+
+  def locate(self, pos):
+    """Return (line, column) for pos, which must not precede the last call."""
+    newlines = self.text.count('\n', self.offset, pos)
+    if newlines:
+      self.line += newlines
+      self.line_start = self.text.rfind('\n', self.offset, pos) + 1
+    self.offset = pos
+    return self.line, pos - self.line_start + 1
+
+
+def _scan_entries(text, idx, scan, skip, spans=None):
+  """Decode the 'as' array starting at text[idx] == '[', recording positions.
+
+  If spans is a list, (start, end, key offset) of each entry is appended to it.
+  """
+  entries = []
+  positions = []
+  lines = _LineCounter(text)
+  idx = skip(text, idx + 1).end()
+  if text[idx] == ']':
+    return entries, positions, idx + 1
+  while True:
+    entry, end = scan(text, idx)
+    key = _ASN_KEY.search(text, idx, end) if isinstance(entry, dict) and 'asn' in entry else None
+    offset = key.start() if key else idx
+    positions.append(lines.locate(offset))
+    if spans is not None:
+      spans.append((idx, end, offset))
+    entries.append(entry)
+    idx = skip(text, end).end()
+    if text[idx] == ']':
+      return entries, positions, idx + 1
+    if text[idx] != ',':
+      raise ValueError('expected , or ]')
+    idx = skip(text, idx + 1).end()
+
+
+def _scan_overlay(text, layout=None):
+  """Decode a { "as": [...] } document, recording positions of 'as' entries.
+
+  If layout is a dict, it is updated with the spans of the 'as' entries (see
+  _scan_entries()) and the offsets of the array's brackets as 'open' and
+  'close'.
+  """
+  scan = _DECODER.scan_once
+  skip = _JSON_WHITESPACE.match
+  idx = skip(text, 0).end()
+  if text[idx] != '{':
+    raise ValueError('expected an object')
+  data = {}
+  positions = None
+  idx = skip(text, idx + 1).end()
+  if text[idx] != '}':
+    while True:
+      if text[idx] != '"':
+        raise ValueError('expected a key')
+      key, idx = scan(text, idx)
+      idx = skip(text, idx).end()
+      if text[idx] != ':':
+        raise ValueError('expected :')
+      idx = skip(text, idx + 1).end()
+      if key == 'as' and text[idx] == '[':
+        spans = [] if layout is not None else None
+        start = idx
+        data[key], positions, idx = _scan_entries(text, idx, scan, skip, spans)
+        if layout is not None:
+          layout.update(spans=spans, open=start, close=idx - 1)
+      else:
+        data[key], idx = scan(text, idx)
+      idx = skip(text, idx).end()
+      if text[idx] == '}':
+        break
+      if text[idx] != ',':
+        raise ValueError('expected , or }')
+      idx = skip(text, idx + 1).end()
+  if skip(text, idx + 1).end() != len(text):
+    raise ValueError('extra data')
+  return data, positions
+
+
+def load_overlay(text):
+  """Decode overlay JSON text in a single pass.
+
+  Returns (data, positions), where positions holds a 1-based (line, column)
+  pair for every element of the top-level 'as' array: the location of the
+  entry's "asn" key, or of the element itself when it has none. positions
+  is None when the document does not have the { "as": [...] } shape.
+
+  Raises json.JSONDecodeError with the same message as json.loads().
+  """
+  try:
+    return _scan_overlay(text)
+  except (ValueError, IndexError, StopIteration):
+    # Malformed or unexpected input: let json report it (or decode it) as usual
+    return json.loads(text), None
+
+
+class OverlayShapeError(ValueError):
+  """The document is valid JSON but not an object with an 'as' array."""
+
+
+class OverlayReader:
+  """Decode the 'as' entries of an overlay document read from a file handle.
+
+  Iterating yields (entry, line, column) for each element of the 'as' array,
+  located as in load_overlay(). Input is read chunk_size characters at a time
+  and consumed text is dropped, so memory is bounded by the largest single
+  value rather than the document. Syntax errors raise json.JSONDecodeError
+  with positions in the whole document; once the document has been read,
+  OverlayShapeError is raised if it lacks an 'as' array. arrays counts the
+  'as' arrays started so far: json.load() keeps only the last of repeated
+  keys, while the reader yields the entries of each. keys lists the
+  top-level keys read so far.
+  """
+
+  def __init__(self, f, chunk_size=_STREAM_CHUNK_SIZE):
+    self.f = f
+    self.chunk_size = chunk_size
+    self.arrays = 0
+    self.keys = []
+    self.buf = ''
+    self.pos = 0          # current index into buf
+    self.base = 0         # document offset of buf[0]
+    self.eof = False
+    self.line = 1
+    self.line_start = 0   # document offset where self.line starts
+    self.counted = 0      # document offset up to which newlines are counted
+
+  def _locate(self, offset):
+    """Return (line, column) of a document offset, which must not go backwards."""
+    start = self.counted - self.base
+    end = offset - self.base
+    newlines = self.buf.count('\n', start, end)
+    if newlines:
+      self.line += newlines
+      self.line_start = self.base + self.buf.rfind('\n', start, end) + 1
+    self.counted = offset
+    return self.line, offset - self.line_start + 1
+
+  def _error(self, msg, pos=None):
+    """Build a JSONDecodeError for buf[pos] (default: the current position)."""
+    offset = self.base + (self.pos if pos is None else pos)
+    line, column = self._locate(offset)
+    error = json.JSONDecodeError(msg, '', 0)
+    error.pos, error.lineno, error.colno = offset, line, column
+    error.args = (f'{msg}: line {line} column {column} (char {offset})',)
+    return error
+
+  def _fill(self):
+    """Drop consumed input and append the next chunk, or set eof."""
+    if self.pos:
+      self._locate(self.base + self.pos)
+      self.base += self.pos
+      self.buf = self.buf[self.pos:]
+      self.pos = 0
+    chunk = self.f.read(self.chunk_size)
+    if chunk:
+      self.buf += chunk
+    else:
+      self.eof = True
+
+  def _peek(self):
+    """Skip whitespace and return the next character, or '' at the end."""
+    while True:
+      self.pos = _JSON_WHITESPACE.match(self.buf, self.pos).end()
+      if self.pos < len(self.buf) or self.eof:
+        return self.buf[self.pos:self.pos + 1]
+      self._fill()
+
+  def _value(self):
+    """Decode the next value; return (value, start, end) as indexes into buf."""
+    self._peek()
+    failure = None
+    while True:
+      try:
+        value, end = _DECODER.scan_once(self.buf, self.pos)
+      except json.JSONDecodeError as e:
+        error = (e.msg, e.pos)
+      except StopIteration as e:
+        error = ('Expecting value', e.value)
+      else:
+        # A number near the end of the buffer may continue ("12" of "12.5e3")
+        if self.eof or end + 2 < len(self.buf) or not isinstance(value, (int, float)):
+          start, self.pos = self.pos, end
+          return value, start, end
+        error = None
+      # Retry with more input unless the same error persists past the lookahead
+      if error and (self.eof or (error == failure and len(self.buf) - self.pos > _STREAM_LOOKAHEAD)):
+        raise self._error(*error)
+      failure = error
+      self._fill()
+
+  def _entries(self):
+    self.arrays += 1
+    self.pos += 1
+    if self._peek() == ']':
+      self.pos += 1
+      return
+    while True:
+      entry, start, end = self._value()
+      key = _ASN_KEY.search(self.buf, start, end) if isinstance(entry, dict) and 'asn' in entry else None
+      line, column = self._locate(self.base + (key.start() if key else start))
+      yield entry, line, column
+      char = self._peek()
+      if char == ']':
+        self.pos += 1
+        return
+      if char != ',':
+        raise self._error("Expecting ',' delimiter")
+      self.pos += 1
+
+  def __iter__(self):
+    shape = SHAPE_NOT_OBJECT
+    if self._peek() != '{':
+      self._value()
+    else:
+      self.pos += 1
+      char = self._peek()
+      while char != '}':
+        if char != '"':
+          raise self._error('Expecting property name enclosed in double quotes')
+        key, _, _ = self._value()
+        self.keys.append(key)
+        if self._peek() != ':':
+          raise self._error("Expecting ':' delimiter")
+        self.pos += 1
+        if key == 'as' and self._peek() == '[':
+          shape = None
+          yield from self._entries()
+        else:
+          self._value()
+          if key == 'as':
+            shape = SHAPE_NOT_ARRAY
+        char = self._peek()
+        if char == ',':
+          self.pos += 1
+          char = self._peek()
+          if char == '}':
+            raise self._error('Expecting property name enclosed in double quotes')
+        elif char != '}':
+          raise self._error("Expecting ',' delimiter")
+      self.pos += 1
+    if self._peek():
+      raise self._error('Extra data')
+    if shape:
+      raise OverlayShapeError(shape)
+
+
+AggregatorMatch = namedtuple('AggregatorMatch', 'domain host offset line column')
+
+# Host names: dot-separated labels, as in URLs, e-mail addresses and prose.
+# '_' is not a label character, so Markdown emphasis (_bgp.tools_) is not
+# taken for part of the host
+_HOST = re.compile(r'(?<![A-Za-z0-9-])[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)+')
+_HOST_CHAR = re.compile(r'[A-Za-z0-9.-]')
+_DOMAIN = ''    # key of the domain a trie node completes; labels are never empty
+# Up to this many domains, a text that contains none of them anywhere is
+# passed over with substring searches, which beat picking out its host names
+_PREFILTER_MAX_DOMAINS = 32
+
+
+class AggregatorScanner:
+  """Find references to disallowed domains in a single pass over a text.
+
+  Host names are picked out with one regular expression, and the labels of
+  each are looked up right to left in a trie of the domains, so the cost
+  grows with the length of the text, not with the number of domains. For a
+  short list such as DISALLOWED_AGGREGATORS, most texts mention none of the
+  domains and are first ruled out by a substring search per domain.
+  """
+
+  def __init__(self, domains=None):
+    domains = DISALLOWED_AGGREGATORS if domains is None else domains
+    self.prefilter = [domain.lower() for domain in domains] if len(domains) <= _PREFILTER_MAX_DOMAINS else None
+    self.trie = {}
+    for domain in domains:
+      node = self.trie
+      for label in reversed(domain.lower().split('.')):
+        node = node.setdefault(label, {})
+      node[_DOMAIN] = domain
+
+  def _lookup(self, host):
+    node = self.trie
+    for label in reversed(host.lower().split('.')):
+      node = node.get(label)
+      if node is None:
+        return None
+      if _DOMAIN in node:
+        return node[_DOMAIN]
+    return None
+
+  def finditer(self, text):
+    """Yield an AggregatorMatch for each reference in text, in order."""
+    if self.prefilter is not None:
+      lowered = text.lower()
+      if not any(domain in lowered for domain in self.prefilter):
+        return
+    lines = _LineCounter(text)
+    lookup = self._lookup
+    for match in _HOST.finditer(text):
+      domain = lookup(match.group())
+      if domain is not None:
+        line, column = lines.locate(match.start())
+        yield AggregatorMatch(domain, match.group(), match.start(), line, column)
+
+  def scan(self, f, chunk_size=_STREAM_CHUNK_SIZE):
+    """Yield an AggregatorMatch for each reference in text file f, read in chunks.
+
+    Offsets, lines and columns refer to the whole file.
+    """
+    pending = ''
+    offset = 0      # of pending in the file
+    line = 1        # of the start of pending
+    column = 1
+    while True:
+      chunk = f.read(chunk_size)
+      text = pending + chunk
+      # Hold back a host name that may continue in the next chunk; pending
+      # holds nothing else
+      end = len(chunk)
+      while end and _HOST_CHAR.match(chunk, end - 1):
+        end -= 1
+      end = len(pending) + end if end or not chunk else 0
+      for match in self.finditer(text[:end]):
+        yield match._replace(offset=offset + match.offset, line=line + match.line - 1,
+                             column=match.column + (column - 1 if match.line == 1 else 0))
+      newlines = text.count('\n', 0, end)
+      if newlines:
+        line += newlines
+        column = end - text.rfind('\n', 0, end)
+      else:
+        column += end
+      offset += end
+      pending = text[end:]
+      if not chunk:
+        return
+
+
+_AGGREGATOR_SCANNER = None
+
+
+def validate_pr_body(pr_body):
+    """Check PR body for references to disallowed aggregators.
+
+    Returns a list of error messages for any disallowed aggregators found.
+    """
+    global _AGGREGATOR_SCANNER
+    if _AGGREGATOR_SCANNER is None:
+        _AGGREGATOR_SCANNER = AggregatorScanner()
+    found = {match.domain for match in _AGGREGATOR_SCANNER.finditer(pr_body)}
+    return [f"PR body references disallowed aggregator: {domain}"
+            for domain in DISALLOWED_AGGREGATORS if domain in found]
+
+
+# Per-entry rules, in the order their findings are reported. A rule takes
+# (entry, asn), with asn as found in the entry, and returns a list of
+# (severity, detail) findings or None. HEAD_RULES run before the duplicate
+# and sort-order checks and TAIL_RULES after them; a rejecting rule with
+# findings ends the checks of its entry.
+HEAD_RULES = []
+TAIL_RULES = []
+RULE_NAMES = []     # all rules, including 'duplicate' and 'sort-order'
+
+_EXPECTED_FIELDS = frozenset({'asn', 'reason', 'handle', 'description', 'countryCode'})
+# Every subset of the expected fields in the required order
+_ORDERED_FIELDS = {
+  tuple(field for bit, field in enumerate(('asn', 'handle', 'description', 'countryCode', 'reason')) if mask >> bit & 1)
+  for mask in range(32)
+}
+
+_RULE_HOOKS = []
+_PHASE_HOOKS = []
+
+
+def _rule(name, rules, rejects=False):
+  def register(check):
+    rules.append((name, check, rejects))
+    RULE_NAMES.append(name)
+    return check
+  return register
+
+
+@_rule('asn', HEAD_RULES, rejects=True)
+def _check_asn(entry, asn):
+  if not isinstance(entry, dict) or 'asn' not in entry:
+    return [('error', ": Missing required field 'asn'")]
+  # Validate ASN type first so we can use it in error messages
+  if not isinstance(asn, int) or isinstance(asn, bool) or asn <= 0:
+    return [('error', f": ASN must be a positive integer, got {asn}")]
+
+
+@_rule('required-fields', HEAD_RULES)
+def _check_required_fields(entry, asn):
+  if 'reason' in entry and 'countryCode' in entry:
+    return None
+  findings = []
+  if 'reason' not in entry:
+    findings.append(('error', f" (AS{asn}): Missing required field 'reason'"))
+  if 'countryCode' not in entry:
+    findings.append(('error', f" (AS{asn}): Missing required field 'countryCode'"))
+  return findings
+
+
+@_rule('asn-range', HEAD_RULES, rejects=True)
+def _check_asn_range(entry, asn):
+  if asn > MAX_ASN:
+    return [('error', f" (AS{asn}): ASN exceeds maximum value ({MAX_ASN})")]
+
+
+@_rule('reserved-asn', HEAD_RULES, rejects=True)
+def _check_reserved_asn(entry, asn):
+  # Check the IANA registry: reserved and documentation ranges
+  category = ASN_REGISTRY.category(asn)
+  if category == 'reserved' or category == 'as-trans':
+    return [('error', f" (AS{asn}): Reserved ASN cannot be used")]
+  if category == 'documentation':
+    return [('error', f" (AS{asn}): Reserved ASN range (documentation/sample code)")]
+
+
+@_rule('private-asn', HEAD_RULES)
+def _check_private_asn(entry, asn):
+  if ASN_REGISTRY.category(asn) == 'private':
+    return [('warning', f" (AS{asn}): Private ASN - verify it's actually announcing prefixes publicly")]
+
+
+RULE_NAMES.extend(['duplicate', 'sort-order', 'similar-description', 'handle-collision'])
+
+
+@_rule('reason', TAIL_RULES)
+def _check_reason(entry, asn):
+  reason = entry.get('reason')
+  if reason and (not isinstance(reason, str) or reason not in VALID_REASONS):
+    return [('error', f" (AS{asn}): Invalid reason '{reason}', must be 'missing', 'inferred-fix', or 'internal'")]
+
+
+@_rule('country-code', TAIL_RULES)
+def _check_country_code(entry, asn):
+  country_code = entry.get('countryCode')
+  if country_code:
+    if not isinstance(country_code, str) or len(country_code) != 2:
+      return [('error', f" (AS{asn}): Country code must be a 2-letter ISO 3166-1 alpha-2 code")]
+    if country_code not in VALID_COUNTRY_CODES:
+      return [('error', f" (AS{asn}): Invalid country code '{country_code}' (must be valid ISO 3166-1 alpha-2)")]
+
+
+@_rule('handle-description', TAIL_RULES)
+def _check_handle_description(entry, asn):
+  # Validate handle and description are together
+  has_handle = 'handle' in entry and entry['handle']
+  has_description = 'description' in entry and entry['description']
+  if has_handle and not has_description:
+    return [('error', f" (AS{asn}): 'handle' provided without 'description' (must be together)")]
+  if has_description and not has_handle:
+    return [('error', f" (AS{asn}): 'description' provided without 'handle' (must be together)")]
+
+
+@_rule('handle-format', TAIL_RULES)
+def _check_handle_format(entry, asn):
+  handle = entry.get('handle')
+  if handle:
+    if not isinstance(handle, str):
+      return [('error', f" (AS{asn}): 'handle' must be a string")]
+    if ' ' in handle:
+      return [('error', f" (AS{asn}): 'handle' should not contain spaces")]
+    if handle != handle.upper():
+      return [('warning', f" (AS{asn}): 'handle' should be uppercase (got '{handle}')")]
+    if len(handle) > MAX_HANDLE_LENGTH:
+      return [('error', f" (AS{asn}): 'handle' too long ({len(handle)} chars, max {MAX_HANDLE_LENGTH})")]
+
+
+@_rule('description-format', TAIL_RULES)
+def _check_description_format(entry, asn):
+  description = entry.get('description')
+  if description:
+    if not isinstance(description, str):
+      return [('error', f" (AS{asn}): 'description' must be a string")]
+    if len(description) > MAX_DESCRIPTION_LENGTH:
+      return [('error', f" (AS{asn}): 'description' too long ({len(description)} chars, max {MAX_DESCRIPTION_LENGTH})")]
+
+
+@_rule('country-only-reason', TAIL_RULES)
+def _check_country_only_reason(entry, asn):
+  # If only countryCode provided (no handle/description), reason should be "missing"
+  if entry.get('countryCode') and not entry.get('handle') and entry.get('reason') == 'inferred-fix':
+    return [('error', f" (AS{asn}): Cannot use reason='inferred-fix' for country-only overlay (use 'missing')")]
+
+
+@_rule('unexpected-fields', TAIL_RULES)
+def _check_unexpected_fields(entry, asn):
+  if entry.keys() <= _EXPECTED_FIELDS:
+    return None
+  unexpected = set(entry.keys()) - _EXPECTED_FIELDS
+  return [('warning', f" (AS{asn}): Unexpected fields: {', '.join(unexpected)}")]
+
+
+@_rule('field-order', TAIL_RULES)
+def _check_field_order(entry, asn):
+  if tuple(entry) in _ORDERED_FIELDS:
+    return None
+  # Check field order: asn, handle, description, countryCode, reason
+  expected_order = ['asn', 'handle', 'description', 'countryCode', 'reason']
+  actual_keys = list(entry.keys())
+  # Filter expected_order to only include fields that are present
+  expected_present = [k for k in expected_order if k in actual_keys]
+  if actual_keys != expected_present:
+    return [('error', f" (AS{asn}): Incorrect field order. Expected: {', '.join(expected_present)}, got: {', '.join(actual_keys)}")]
+
+
+def add_rule_hook(hook):
+  """Call hook(rule, seconds, hit) for every rule run until it is removed.
+
+  hit is True if the rule reported something. Rules run in worker processes
+  are not seen by hooks, so validate_overlay() checks serially while any
+  hook is registered. Rules are timed only while hooks are registered.
+  """
+  _RULE_HOOKS.append(hook)
+
+
+def remove_rule_hook(hook):
+  _RULE_HOOKS.remove(hook)
+
+
+def _notify(rule, seconds, hit):
+  for hook in _RULE_HOOKS:
+    hook(rule, seconds, hit)
+
+
+def add_phase_hook(hook):
+  """Call hook(phase, seconds) as each phase of a whole-file validation ends.
+
+  The phases are 'read' and 'load' (decoding and line mapping) in
+  validate_path(), 'checks' and 'near_duplicates' in validate_data() and
+  'reporting' in validate_overlay(). Streamed validation interleaves them
+  and reports none.
+  """
+  _PHASE_HOOKS.append(hook)
+
+
+def remove_phase_hook(hook):
+  _PHASE_HOOKS.remove(hook)
+
+
+@contextmanager
+def _phase(name):
+  """Time the block as phase name while phase hooks are registered."""
+  if not _PHASE_HOOKS:
+    yield
+    return
+  start = time.perf_counter()
+  try:
+    yield
+  finally:
+    seconds = time.perf_counter() - start
+    for hook in _PHASE_HOOKS:
+      hook(name, seconds)
+
+
+class RuleProfile:
+  """Cumulative calls, hits and time per rule, as a hook for add_rule_hook().
+
+    profile = RuleProfile()
+    add_rule_hook(profile)
+    ...
+    profile.snapshot()    # {rule: {'calls': ..., 'hits': ..., 'seconds': ...}}
+  """
+
+  def __init__(self):
+    self.stats = {}
+
+  def __call__(self, rule, seconds, hit):
+    stats = self.stats.get(rule)
+    if stats is None:
+      stats = self.stats[rule] = [0, 0, 0.0]
+    stats[0] += 1
+    stats[1] += hit
+    stats[2] += seconds
+
+  def snapshot(self):
+    """Return the counters of each rule run so far, in rule order."""
+    return {rule: dict(zip(('calls', 'hits', 'seconds'), self.stats[rule]))
+            for rule in RULE_NAMES if rule in self.stats}
+
+  def report(self, file=None):
+    """Print the counters as a table, slowest rule first."""
+    print("RULE PROFILE:", file=file)
+    print(f"  {'rule':<22} {'calls':>9} {'hits':>9} {'total ms':>10} {'us/call':>9}", file=file)
+    for rule, stats in sorted(self.snapshot().items(), key=lambda item: -item[1]['seconds']):
+      per_call = stats['seconds'] / stats['calls'] * 1e6 if stats['calls'] else 0.0
+      print(f"  {rule:<22} {stats['calls']:>9} {stats['hits']:>9} {stats['seconds'] * 1000:>10.2f} {per_call:>9.2f}",
+            file=file)
+
+
+def _apply_rules(rules, entry, asn, known, findings):
+  """Append the findings of rules to findings; return True if one rejects the entry."""
+  if _RULE_HOOKS:
+    for name, check, rejects in rules:
+      start = time.perf_counter()
+      found = check(entry, asn)
+      _notify(name, time.perf_counter() - start, bool(found))
+      if found:
+        findings.extend((severity, name, known, detail) for severity, detail in found)
+        if rejects:
+          return True
+    return False
+  for name, check, rejects in rules:
+    found = check(entry, asn)
+    if found:
+      findings.extend((severity, name, known, detail) for severity, detail in found)
+      if rejects:
+        return True
+  return False
+
+
+def check_entry(entry):
+  """Run the checks that depend on a single entry only.
+
+  Returns (asn, head, tail). asn is the ASN to pass on to the duplicate and
+  sort checks, or None when the entry is rejected before them. head and tail
+  are the (severity, rule, asn, detail) findings of HEAD_RULES and
+  TAIL_RULES; severity is 'error' or 'warning', asn is None if the entry has
+  no valid ASN and the message is f"Line {line}{detail}".
+  """
+  head = []
+  tail = []
+  asn = entry.get('asn') if isinstance(entry, dict) else None
+  known = asn if isinstance(asn, int) and not isinstance(asn, bool) and asn > 0 else None
+  if _apply_rules(HEAD_RULES, entry, asn, known, head):
+    return None, head, tail
+  _apply_rules(TAIL_RULES, entry, asn, known, tail)
+  return asn, head, tail
+
+
+class AsnOrder:
+  """Duplicate and sort-order state for a sequence of ASNs.
+
+  ASNs that arrive in ascending order are kept in an array('I') and the rare
+  out-of-order ones in a set, so sorted input costs one comparison and four
+  bytes per ASN.
+  """
+
+  __slots__ = ('previous', '_ascending', '_stray')
+
+  def __init__(self):
+    self.previous = None
+    self._ascending = array('I')
+    self._stray = set()
+
+  def add(self, asn):
+    """Record asn and return (duplicate, previous ASN if out of order else None)."""
+    return self.seen(asn), self.follows(asn)
+
+  def seen(self, asn):
+    """Record asn and return whether it was seen before."""
+    ascending = self._ascending
+    if not ascending or asn > ascending[-1]:
+      ascending.append(asn)
+      return False
+    if asn == ascending[-1]:
+      return True
+    idx = bisect_left(ascending, asn)
+    duplicate = ascending[idx] == asn or asn in self._stray
+    self._stray.add(asn)
+    return duplicate
+
+  def follows(self, asn):
+    """Make asn the previous ASN and return the one before it if asn is out of order, else None."""
+    previous = self.previous
+    self.previous = asn
+    if previous is not None and asn < previous:
+      return previous
+    return None
+
+
+_HANDLE_SEPARATORS = re.compile(r'[\W_]+')
+
+
+def _identity(entry, line):
+  """Return the (line, asn, handle, description, countryCode) of entry for near_duplicates(), or None."""
+  if not isinstance(entry, dict):
+    return None
+  asn = entry.get('asn')
+  handle = entry.get('handle')
+  description = entry.get('description')
+  if not isinstance(asn, int) or isinstance(asn, bool) or not (isinstance(handle, str) or
+                                                               isinstance(description, str)):
+    return None
+  return (line, asn, handle if isinstance(handle, str) else None,
+          description if isinstance(description, str) else None, entry.get('countryCode'))
+
+
+def near_duplicates(records, changed=None, threshold=SIMILARITY_THRESHOLD):
+  """Find entries that look like one organization entered inconsistently.
+
+  records are (line, asn, handle, description, countryCode) tuples in file
+  order. Descriptions are compared after normalize(): 'similar-description'
+  reports descriptions that are near-identical (trigram Jaccard similarity
+  of at least threshold) but spelled differently, or identical but in
+  different countries; 'handle-collision' reports handles that are equal
+  apart from case and punctuation but spelled differently, or equal on
+  entries with different descriptions. Near-identical descriptions are
+  found with an n-gram index (see similarity.py) capped at
+  SIMILARITY_MAX_POSTINGS descriptions per trigram, so the cost stays
+  near-linear even when thousands of descriptions are alike. Each finding is reported at the later
+  entry of its pair; with changed, a set of indexes into records, only
+  pairs involving one of them are. Returns (line, code, asn, detail) tuples
+  sorted by line.
+  """
+  from similarity import normalize, similar_pairs
+
+  findings = []
+
+  def report(idx, other, code, message):
+    if changed is None or idx in changed or other in changed:
+      if idx < other:
+        idx, other = other, idx
+      line, asn = records[idx][:2]
+      findings.append((line, code, asn, f" (AS{asn}): {message(records[idx], records[other])}"))
+
+  groups = {}
+  for idx, record in enumerate(records):
+    if record[3] is not None:
+      groups.setdefault(normalize(record[3]), []).append(idx)
+  for members in groups.values():
+    for idx in members[1:]:
+      if records[idx][4] != records[members[0]][4]:
+        report(idx, members[0], 'similar-description', lambda record, other: (
+          f"Description matches AS{other[1]} (line {other[0]}), but countryCode '{record[4]}' differs "
+          f"from '{other[4]}'"))
+  keys = list(groups)
+  # Compare each group through one member, preferably a changed one
+  first = [next((idx for idx in members if idx in changed), members[0]) if changed else members[0]
+           for members in groups.values()]
+  for i, j, _ in similar_pairs(keys, threshold, max_postings=SIMILARITY_MAX_POSTINGS):
+    report(first[i], first[j], 'similar-description', lambda record, other: (
+      f"Description '{record[3]}' is nearly identical to '{other[3]}' of AS{other[1]} (line {other[0]})"))
+
+  handles = {}
+  for idx, record in enumerate(records):
+    key = _HANDLE_SEPARATORS.sub('', record[2]).upper() if record[2] is not None else ''
+    if key:
+      handles.setdefault(key, []).append(idx)
+  for members in handles.values():
+    other = records[members[0]]
+    for idx in members[1:]:
+      record = records[idx]
+      if record[2] != other[2]:
+        report(idx, members[0], 'handle-collision', lambda record, other: (
+          f"Handle '{record[2]}' is a variant of '{other[2]}' of AS{other[1]} (line {other[0]})"))
+      elif (record[3] and normalize(record[3])) != (other[3] and normalize(other[3])):
+        report(idx, members[0], 'handle-collision', lambda record, other: (
+          f"Handle '{record[2]}' is also used by AS{other[1]} (line {other[0]}) with a different description"))
+  findings.sort(key=lambda finding: finding[0])
+  return findings
+
+
+class _ErrorBudgetExhausted(Exception):
+  """Raised by _Checker when max_errors errors have been found."""
+
+
+class _Checker:
+  """Apply all entry checks in order, appending Findings to errors/warnings.
+
+  on_finding, if given, is called with each Finding as it is found. Once
+  max_errors errors have been found, _ErrorBudgetExhausted is raised.
+  """
+
+  def __init__(self, errors, warnings, max_errors=None, on_finding=None):
+    self.errors = errors
+    self.warnings = warnings
+    self.max_errors = max_errors
+    self.on_finding = on_finding
+    self.order = AsnOrder()
+    self.count = 0
+
+  def emit(self, line, asn, head, tail, duplicate=False, previous=None):
+    """Append the findings for one entry in the order its checks run."""
+    for finding in head:
+      self._add(line, *finding)
+    if duplicate:
+      self._add(line, 'error', 'duplicate', asn, f": Duplicate ASN {asn}")
+    if previous is not None:
+      self._add(line, 'error', 'sort-order', asn, f": ASNs must be sorted (ASN {asn} comes after {previous})")
+    for finding in tail:
+      self._add(line, *finding)
+
+  def _add(self, line, severity, code, asn, detail):
+    finding = Finding(severity, code, line, asn, f"Line {line}{detail}")
+    (self.errors if severity == 'error' else self.warnings).append(finding)
+    if self.on_finding is not None:
+      self.on_finding(finding)
+    if severity == 'error' and self.max_errors is not None and len(self.errors) >= self.max_errors:
+      raise _ErrorBudgetExhausted
+
+  def add_warnings(self, findings):
+    """Append (line, code, asn, detail) warnings, such as those of near_duplicates()."""
+    for line, code, asn, detail in findings:
+      self._add(line, 'warning', code, asn, detail)
+
+  def result(self, stopped=False, notes=()):
+    return ValidationResult(self.errors, self.warnings, self.count, notes, stopped)
+
+  def check(self, entry, line):
+    self.check_result(check_entry(entry), line)
+
+  def check_result(self, result, line):
+    """Check one entry, given its check_entry() result."""
+    self.count += 1
+    asn, head, tail = result
+    duplicate = previous = None
+    if asn is not None:
+      if _RULE_HOOKS:
+        start = time.perf_counter()
+        duplicate = self.order.seen(asn)
+        middle = time.perf_counter()
+        previous = self.order.follows(asn)
+        end = time.perf_counter()
+        _notify('duplicate', middle - start, duplicate)
+        _notify('sort-order', end - middle, previous is not None)
+      else:
+        duplicate, previous = self.order.add(asn)
+    self.emit(line, asn, head, tail, duplicate, previous)
+
+
+class _ResultCache:
+  """check_entry() results kept on disk, keyed by entry content hash.
+
+  The whole cache is dropped when the validator version changes, and only
+  the results used by the last run are written back.
+  """
+
+  def __init__(self, path):
+    self.path = Path(path)
+    self.version = _validator_version()
+    self.results = {}
+    self.used = {}
+    try:
+      data = json.loads(self.path.read_text(encoding='utf-8'))
+      if data.get('version') == self.version:
+        self.results = data['results']
+    except (OSError, ValueError, KeyError, AttributeError):
+      pass
+
+  def check(self, key, entry):
+    """Return check_entry(entry), where key is the entry's serialized content."""
+    digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+    result = self.results.get(digest)
+    if result is None:
+      result = check_entry(entry)
+    self.used[digest] = result
+    return result
+
+  def save(self):
+    if self.used.keys() == self.results.keys():
+      return
+    try:
+      tmp = self.path.with_name(self.path.name + '.tmp')
+      tmp.write_text(json.dumps({'version': self.version, 'results': self.used}), encoding='utf-8')
+      tmp.replace(self.path)
+    except OSError:
+      pass  # The cache is an optimization only
+
+
+def _validator_version():
+  """Identify the rules in effect, so cached results expire when they change."""
+  digest = hashlib.sha256(Path(__file__).read_bytes())
+  digest.update(','.join(sorted(VALID_COUNTRY_CODES)).encode('ascii'))
+  digest.update(repr(list(ASN_REGISTRY)).encode('utf-8'))
+  return digest.hexdigest()
+
+
+def _changes_summary(base, result):
+  """Return the closing line of a --base text report when nothing changed, else None."""
+  if result.count == 0 and not result.errors and not result.warnings:
+    return f"✓ No entries changed since {base}"
+  return None
+
+
+def _base_entries(rev, overlay_path):
+  """Return the 'as' entries of overlay_path at git revision rev."""
+  import subprocess
+
+  result = subprocess.run(['git', 'show', f'{rev}:./{overlay_path.name}'], capture_output=True,
+                          cwd=overlay_path.parent)
+  if result.returncode != 0:
+    raise ValueError(result.stderr.decode('utf-8', 'replace').strip())
+  data = json.loads(result.stdout.decode('utf-8'))
+  if not isinstance(data, dict) or not isinstance(data.get('as'), list):
+    return []
+  return data['as']
+
+
+def _validate_changes(entries, positions, base, cache_path, overlay_path, max_errors=None, on_finding=None,
+                      similar=False):
+  """Validate only the entries added or changed since git revision base.
+
+  Changed entries get all per-entry checks. Sort order is checked where an
+  entry meets a neighbour it did not have in base, which is the only place
+  a change can break it when base was valid, and duplicates at every
+  occurrence of a changed entry's ASN after its first, wherever it is. With
+  similar, near_duplicates() pairs involving a changed entry are reported.
+  """
+  try:
+    base_entries = _base_entries(base, overlay_path)
+  except (OSError, ValueError) as e:
+    return _failure('base-error', f"Error: cannot read {overlay_path} at {base}: {e}")
+
+  keys = [json.dumps(entry, ensure_ascii=False) for entry in entries]
+  base_keys = [json.dumps(entry, ensure_ascii=False) for entry in base_entries]
+
+  # Match unchanged entries by content, so a copied entry counts as new
+  unmatched = Counter(base_keys)
+  changed = set()
+  for idx, key in enumerate(keys):
+    if unmatched[key]:
+      unmatched[key] -= 1
+    else:
+      changed.add(idx)
+
+  base_pairs = set(zip(base_keys, base_keys[1:]))
+  checked = sorted(changed.union(
+    idx for idx in range(1, len(keys)) if (keys[idx - 1], keys[idx]) not in base_pairs))
+
+  # ASNs taking part in the order checks; changed entries may drop out below
+  asns = [entry.get('asn') if isinstance(entry, dict) else None for entry in entries]
+  asns = [asn if isinstance(asn, int) and not isinstance(asn, bool) else None for asn in asns]
+
+  cache = _ResultCache(cache_path)
+  results = {idx: cache.check(keys[idx], entries[idx]) for idx in sorted(changed)}
+  for idx, (asn, _, _) in results.items():
+    asns[idx] = asn
+  cache.save()
+
+  # First occurrence of each changed ASN; any later one is a duplicate,
+  # adjacent or not, and changed or not
+  wanted = {asns[idx] for idx in changed} - {None}
+  first = {}
+  repeated = []
+  for idx, asn in enumerate(asns):
+    if asn in wanted:
+      if asn in first:
+        repeated.append(idx)
+      else:
+        first[asn] = idx
+  checked = sorted(set(checked).union(repeated))
+
+  notes = [f"Validating {len(changed)} of {len(entries)} entries changed since {base}"]
+  checker = _Checker([], [], max_errors, on_finding)
+  checker.count = len(changed)
+  try:
+    for idx in checked:
+      asn, head, tail = results.get(idx, (asns[idx], (), ()))
+      duplicate = previous = None
+      if asn is not None:
+        before = idx - 1
+        while before >= 0 and asns[before] is None:
+          before -= 1
+        if before >= 0:
+          duplicate = asns[before] == asn or first.get(asn, idx) < idx
+          previous = asns[before] if asn < asns[before] else None
+      checker.emit(positions[idx][0], asn, head, tail, duplicate, previous)
+
+    if similar:
+      # Near-duplicates among all entries, where a changed entry takes part
+      records = []
+      changed_records = set()
+      for idx, (entry, (line, _)) in enumerate(zip(entries, positions)):
+        record = _identity(entry, line)
+        if record is not None:
+          if idx in changed:
+            changed_records.add(len(records))
+          records.append(record)
+      checker.add_warnings(near_duplicates(records, changed_records))
+  except _ErrorBudgetExhausted:
+    return checker.result(stopped=True, notes=notes)
+  return checker.result(notes=notes)
+
+
+class _Spool:
+  """Append-only Finding list kept in a temporary file instead of memory."""
+
+  def __init__(self):
+    import tempfile
+
+    self.file = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MEMORY, mode='w+', encoding='utf-8')
+    self.count = 0
+
+  def append(self, finding):
+    self.file.write(json.dumps(finding) + '\n')
+    self.count += 1
+
+  def __len__(self):
+    return self.count
+
+  def __iter__(self):
+    self.file.seek(0)
+    for line in self.file:
+      yield Finding._make(json.loads(line))
+
+
+class ValidationResult:
+  """Errors and warnings found by one validation run.
+
+  errors and warnings are sequences of Finding in report order. count is
+  the number of entries checked, or None if validation stopped before the
+  entries could be checked, in which case errors holds the reason. stopped
+  is True if checking ended early because the error budget was used up.
+  notes are informational lines for the text report.
+  """
+
+  def __init__(self, errors=(), warnings=(), count=None, notes=(), stopped=False):
+    self.errors = errors
+    self.warnings = warnings
+    self.count = count
+    self.notes = list(notes)
+    self.stopped = stopped
+
+  @property
+  def valid(self):
+    return self.count is not None and not self.errors
+
+
+def _failure(code, message, line=None):
+  return ValidationResult([Finding('error', code, line, None, message)])
+
+
+def report_text(result, file=None, findings=True, summary=None):
+  """Print result as validate.py always has and return result.valid.
+
+  With findings=False only the summary is printed, for findings that were
+  already printed as they were found. summary, a function of result,
+  returns the closing line in place of the one about entries validated, or
+  None to keep that one.
+  """
+  out = file or sys.stdout
+  for note in result.notes:
+    print(note, file=out)
+  if result.count is None:
+    for error in result.errors:
+      print(error.message, file=out)
+    return False
+
+  if result.stopped:
+    if findings:
+      _print_findings(result, out)
+    print(f"✗ Validation stopped after {len(result.errors)} error(s) and {len(result.warnings)} warning(s)", file=out)
+    return False
+
+  if findings:
+    _print_findings(result, out)
+
+  line = summary(result) if summary is not None else None
+  if line is not None:
+    print(line, file=out)
+  elif not result.errors and not result.warnings:
+    print(f"✓ All {result.count} entries are valid", file=out)
+  elif not result.errors:
+    print(f"✓ All {result.count} entries are valid (with {len(result.warnings)} warnings)", file=out)
+  else:
+    print(f"✗ Validation failed with {len(result.errors)} error(s) and {len(result.warnings)} warning(s)", file=out)
+  return result.valid
+
+
+def print_finding(finding, file=None):
+  """Print one finding as a line of the text report."""
+  print(f"  {'✗' if finding.severity == 'error' else '⚠'} {finding.message}", file=file)
+
+
+def _print_findings(result, out):
+  if result.errors:
+    print("ERRORS:", file=out)
+    for error in result.errors:
+      print(f"  ✗ {error.message}", file=out)
+    print(file=out)
+
+  if result.warnings:
+    print("WARNINGS:", file=out)
+    for warning in result.warnings:
+      print(f"  ⚠ {warning.message}", file=out)
+    print(file=out)
+
+
+def _write_findings(findings, out, encode):
+  separator = '\n    '
+  for finding in findings:
+    out.write(separator + encode(finding))
+    separator = ',\n    '
+  out.write('\n  ' if separator != '\n    ' else '')
+
+
+def report_json(result, file=None):
+  """Write result as a JSON document and return result.valid.
+
+  Findings are written one at a time, so spooled results stay out of memory.
+  """
+  out = file or sys.stdout
+
+  def encode(finding):
+    return json.dumps(finding._asdict(), ensure_ascii=False)
+
+  out.write(f'{{\n  "valid": {json.dumps(result.valid)},\n  "entries": {json.dumps(result.count)},\n'
+            f'  "stopped": {json.dumps(result.stopped)},\n  "errors": [')
+  _write_findings(result.errors, out, encode)
+  out.write('],\n  "warnings": [')
+  _write_findings(result.warnings, out, encode)
+  out.write(']\n}\n')
+  return result.valid
+
+
+SARIF_SCHEMA = 'https://json.schemastore.org/sarif-2.1.0.json'
+
+
+def report_sarif(result, file=None, path='overlay.json'):
+  """Write result as a SARIF 2.1.0 log for code scanning and return result.valid."""
+  out = file or sys.stdout
+  uri = Path(path).as_posix()
+
+  def encode(finding):
+    entry = {'ruleId': finding.code, 'level': finding.severity, 'message': {'text': finding.message}}
+    location = {'artifactLocation': {'uri': uri}}
+    if finding.line is not None:
+      location['region'] = {'startLine': finding.line}
+    entry['locations'] = [{'physicalLocation': location}]
+    if finding.asn is not None:
+      entry['properties'] = {'asn': finding.asn}
+    return json.dumps(entry, ensure_ascii=False)
+
+  driver = {'name': 'validate.py', 'informationUri': 'https://github.com/ipverse/as-overlay',
+            'rules': [{'id': name} for name in RULE_NAMES]}
+  out.write(f'{{\n  "$schema": "{SARIF_SCHEMA}",\n  "version": "2.1.0",\n  "runs": [{{\n'
+            f'  "tool": {{"driver": {json.dumps(driver)}}},\n  "results": [')
+  _write_findings(itertools.chain(result.errors, result.warnings), out, encode)
+  out.write(']\n  }]\n}\n')
+  return result.valid
+
+
+REPORTERS = {'text': report_text, 'json': report_json, 'sarif': report_sarif}
+
+
+def _validate_stream(f, max_errors=None, on_finding=None):
+  """Validate the overlay read from file f one entry at a time with bounded memory.
+
+  Reading stops as soon as the error budget is used up. near_duplicates()
+  needs every entry at hand, so its checks are left out.
+  """
+  checker = None
+  try:
+    reader = OverlayReader(f)
+    arrays = 0
+    for entry, line, _ in reader:
+      if reader.arrays != arrays:
+        # A repeated 'as' key replaces the earlier array, as in json.load()
+        arrays = reader.arrays
+        checker = _Checker(_Spool(), _Spool(), max_errors, on_finding)
+      checker.check(entry, line)
+  except _ErrorBudgetExhausted:
+    return checker.result(stopped=True)
+  except json.JSONDecodeError as e:
+    return _failure('json-syntax', f"Error: Invalid JSON syntax: {e}", e.lineno)
+  except OverlayShapeError as e:
+    return _failure('shape', str(e))
+  except (OSError, UnicodeDecodeError) as e:
+    return _failure('read-error', f"Error reading file: {e}")
+
+  if not arrays:
+    checker = _Checker([], [])
+  return checker.result()
+
+
+def _check_chunk(entries):
+  """Check a contiguous run of entries in a worker process.
+
+  Returns (findings, indexes, asns): findings lists (index, asn, head, tail,
+  duplicate, previous) for each entry with something to report, with the
+  order checks made within the chunk only; indexes and asns list the entries
+  that reached the order checks, for the merge across chunks.
+  """
+  order = AsnOrder()
+  findings = []
+  indexes = array('I')
+  asns = array('I')
+  for idx, entry in enumerate(entries):
+    asn, head, tail = check_entry(entry)
+    duplicate = previous = None
+    if asn is not None:
+      duplicate, previous = order.add(asn)
+      indexes.append(idx)
+      asns.append(asn)
+    if head or tail or duplicate or previous is not None:
+      findings.append((idx, asn, head, tail, duplicate, previous))
+  return findings, indexes, asns
+
+
+def _validate_parallel(entries, positions, jobs, checker):
+  """Validate entries in chunks across jobs worker processes into checker.
+
+  Each chunk is checked on its own; sort order is then compared at chunk
+  boundaries and duplicates across chunks are found from the chunks' ASNs,
+  so messages come out exactly as in a serial run. When the error budget
+  runs out, chunks not yet started are cancelled.
+  """
+  from concurrent.futures import ProcessPoolExecutor
+
+  chunk_size = max(_PARALLEL_MIN_CHUNK, -(-len(entries) // (jobs * _PARALLEL_CHUNKS_PER_JOB)))
+  chunks = [entries[start:start + chunk_size] for start in range(0, len(entries), chunk_size)]
+
+  with ProcessPoolExecutor(max_workers=min(jobs, len(chunks))) as executor:
+    try:
+      _merge_chunks(executor.map(_check_chunk, chunks), chunk_size, positions, checker)
+    except _ErrorBudgetExhausted:
+      executor.shutdown(cancel_futures=True)
+      raise
+  checker.count = len(entries)
+
+
+def _merge_chunks(results, chunk_size, positions, checker):
+  """Emit the findings of _check_chunk() results in order, across boundaries."""
+  last_asn = None     # last ASN to reach the order checks so far
+  highest = None      # highest such ASN, and all of them once out of order
+  seen = None
+  earlier = []
+  for number, (findings, indexes, asns) in enumerate(results):
+    start = number * chunk_size
+    by_index = {finding[0]: list(finding) for finding in findings}
+
+    def flag(idx, asn):
+      if idx not in by_index:
+        by_index[idx] = [idx, asn, (), (), False, None]
+      return by_index[idx]
+
+    if asns:
+      # Sort order across the boundary with the previous chunk
+      if last_asn is not None and asns[0] < last_asn:
+        flag(indexes[0], asns[0])[5] = last_asn
+      # Duplicates of ASNs from earlier chunks; sorted input never gets here
+      if highest is not None and min(asns) <= highest:
+        if seen is None:
+          seen = set()
+          for previous_asns in earlier:
+            seen.update(previous_asns)
+        for idx, asn in zip(indexes, asns):
+          if asn in seen:
+            flag(idx, asn)[4] = True
+      if seen is not None:
+        seen.update(asns)
+      else:
+        earlier.append(asns)
+      last_asn = asns[-1]
+      highest = max(asns) if highest is None else max(highest, max(asns))
+
+    for idx in sorted(by_index):
+      _, asn, head, tail, duplicate, previous = by_index[idx]
+      checker.count = start + idx + 1
+      checker.emit(positions[start + idx][0], asn, head, tail, duplicate, previous)
+
+
+# ASN rules that _check_columns() runs over the whole ASN column, and the
+# registry categories they report on; an ASN in the first set is rejected
+_COLUMN_RULES = frozenset({'asn', 'asn-range', 'reserved-asn', 'private-asn'})
+_REJECTED_CATEGORIES = frozenset({'reserved', 'as-trans', 'documentation'})
+_FLAGGED_CATEGORIES = _REJECTED_CATEGORIES | {'private'}
+
+_NUMPY = False      # the numpy module once looked up, None if not installed
+
+
+def _numpy():
+  """Return the numpy module, imported on first use, or None if it is not installed."""
+  global _NUMPY
+  if _NUMPY is False:
+    _NUMPY = import_module('numpy') if find_spec('numpy') else None
+  return _NUMPY
+
+
+def _flag_asns(values, numpy):
+  """Return (flagged, rejected): indexes of the ASNs any ASN rule reports, and of those it rejects.
+
+  values are ints, with 0 for entries without an integer ASN.
+  """
+  ranges = [r for r in ASN_REGISTRY if r.category in _FLAGGED_CATEGORIES]
+  if numpy is None:
+    starts = [r.start for r in ranges]
+    flagged = []
+    rejected = []
+    for idx, asn in enumerate(values):
+      if asn <= 0 or asn > MAX_ASN:
+        flagged.append(idx)
+        rejected.append(idx)
+        continue
+      pos = bisect_right(starts, asn) - 1
+      if pos >= 0 and asn <= ranges[pos].end:
+        flagged.append(idx)
+        if ranges[pos].category in _REJECTED_CATEGORIES:
+          rejected.append(idx)
+    return flagged, rejected
+
+  column = numpy.asarray(values, dtype=numpy.int64)
+  starts = numpy.array([r.start for r in ranges], dtype=numpy.int64)
+  ends = numpy.array([r.end for r in ranges], dtype=numpy.int64)
+  rejects = numpy.array([r.category in _REJECTED_CATEGORIES for r in ranges], dtype=bool)
+  out_of_range = (column <= 0) | (column > MAX_ASN)
+  pos = numpy.searchsorted(starts, column, side='right') - 1
+  clipped = numpy.maximum(pos, 0)
+  in_range = (pos >= 0) & (column <= ends[clipped]) if len(ranges) else numpy.zeros(len(column), dtype=bool)
+  flagged = out_of_range | in_range
+  rejected = out_of_range | (in_range & rejects[clipped]) if len(ranges) else out_of_range
+  return numpy.flatnonzero(flagged).tolist(), numpy.flatnonzero(rejected).tolist()
+
+
+def _order_asns(indexes, asns, numpy):
+  """Return (duplicates, previous) for the ASNs that reach the order checks, in entry order.
+
+  duplicates is the set of entry indexes whose ASN came earlier; previous
+  maps the index of each entry out of order to the ASN before it.
+  """
+  if numpy is None:
+    if asns == sorted(asns) and len(set(asns)) == len(asns):
+      return set(), {}      # strictly ascending: nothing to report
+    order = AsnOrder()
+    duplicates = set()
+    previous = {}
+    for idx, asn in zip(indexes, asns):
+      duplicate, before = order.add(asn)
+      if duplicate:
+        duplicates.add(idx)
+      if before is not None:
+        previous[idx] = before
+    return duplicates, previous
+
+  indexes = numpy.asarray(indexes, dtype=numpy.int64)
+  asns = numpy.asarray(asns, dtype=numpy.int64)
+  descending = numpy.flatnonzero(asns[1:] < asns[:-1]) + 1
+  previous = dict(zip(indexes[descending].tolist(), asns[descending - 1].tolist()))
+  if not descending.size and not (asns[1:] == asns[:-1]).any():
+    return set(), previous      # strictly ascending: no duplicates
+  # A stable sort keeps equal ASNs in entry order, so all but the first are duplicates
+  order = numpy.argsort(asns, kind='stable')
+  repeats = numpy.flatnonzero(asns[order][1:] == asns[order][:-1]) + 1
+  return set(indexes[order[repeats]].tolist()), previous
+
+
+def _check_columns(entries, numpy=None):
+  """Check entries as _check_chunk() does, running the ASN rules over one ASN column.
+
+  The ASNs are pulled into a column once; range and registry checks, the
+  duplicate check and the sort-order check then run over the whole column,
+  as NumPy array operations when numpy is the numpy module and as plain
+  loops otherwise. Only the entries an ASN rule flags go through
+  check_entry() for their messages; the others run just the remaining
+  rules. Returns the findings of _check_chunk(), in entry order.
+  """
+  try:
+    raw = [entry.get('asn') for entry in entries]
+  except AttributeError:
+    raw = [entry.get('asn') if isinstance(entry, dict) else None for entry in entries]
+  if set(map(type, raw)) <= {int} and (numpy is None or not raw or -1 << 63 <= min(raw) and max(raw) < 1 << 63):
+    values = raw
+  else:
+    # No ASN or not an integer, or too large for the column: flagged either way
+    values = [(asn if -1 << 63 <= asn < 1 << 63 else 0) if type(asn) is int else 0 for asn in raw]
+  flagged, rejected = _flag_asns(values, numpy)
+  flagged = set(flagged)
+  rejected = set(rejected)
+  reached = [idx for idx in range(len(entries)) if idx not in rejected] if rejected else range(len(entries))
+  duplicates, previous = _order_asns(reached, [values[idx] for idx in reached] if rejected else values, numpy)
+
+  head_rules = [rule for rule in HEAD_RULES if rule[0] not in _COLUMN_RULES]
+  findings = []
+  for idx, entry in enumerate(entries):
+    if idx in flagged:
+      asn, head, tail = check_entry(entry)
+    else:
+      asn = raw[idx]
+      head = []
+      tail = []
+      _apply_rules(head_rules, entry, asn, asn, head)
+      _apply_rules(TAIL_RULES, entry, asn, asn, tail)
+    duplicate = idx in duplicates
+    before = previous.get(idx)
+    if head or tail or duplicate or before is not None:
+      findings.append((idx, asn, head, tail, duplicate, before))
+  return findings
+
+
+def _validate_columns(entries, positions, checker):
+  """Validate entries into checker with _check_columns(), using NumPy if it is installed."""
+  for idx, asn, head, tail, duplicate, previous in _check_columns(entries, _numpy()):
+    checker.count = idx + 1
+    checker.emit(positions[idx][0], asn, head, tail, duplicate, previous)
+  checker.count = len(entries)
+
+
+class _CanonicalPositions:
+  """Positions of entries laid out one per line from line 3, as in overlay.json."""
+
+  def __init__(self, count):
+    self.count = count
+
+  def __len__(self):
+    return self.count
+
+  def __getitem__(self, idx):
+    if not 0 <= idx < self.count:
+      raise IndexError(idx)
+    return idx + 3, 5
+
+  def __iter__(self):
+    return ((line, 5) for line in range(3, self.count + 3))
+
+
+def _check_shape(data):
+  """Return a failed ValidationResult unless data is { "as": [...] }."""
+  if not isinstance(data, dict) or 'as' not in data:
+    return _failure('shape', SHAPE_NOT_OBJECT)
+  if not isinstance(data['as'], list):
+    return _failure('shape', SHAPE_NOT_ARRAY)
+  return None
+
+
+def validate_data(data, positions=None, jobs=1, max_errors=None, on_finding=None, similar=False):
+  """Validate a decoded overlay document, { "as": [...] }.
+
+  positions gives the (line, column) of each entry, as from load_overlay();
+  by default entries are numbered as if written one per line from line 3,
+  the layout of overlay.json. Checking stops once max_errors errors have
+  been found, and on_finding is called with each Finding as it is found.
+  The ASN checks of large overlays run over a column of their ASNs, with
+  NumPy if it is installed (see _check_columns()). similar adds the
+  near_duplicates() warnings. Returns a ValidationResult.
+  """
+  failure = _check_shape(data)
+  if failure:
+    return failure
+
+  entries = data['as']
+  if positions is None:
+    positions = _CanonicalPositions(len(entries))
+
+  checker = _Checker([], [], max_errors, on_finding)
+  try:
+    with _phase('checks'):
+      if jobs > 1 and len(entries) > _PARALLEL_MIN_CHUNK and not _RULE_HOOKS:
+        _validate_parallel(entries, positions, jobs, checker)
+      elif len(entries) >= _COLUMNAR_MIN_ENTRIES and not _RULE_HOOKS:
+        _validate_columns(entries, positions, checker)
+      else:
+        for entry, (line, _) in zip(entries, positions):
+          checker.check(entry, line)
+    if similar:
+      with _phase('near_duplicates'):
+        records = (_identity(entry, line) for entry, (line, _) in zip(entries, positions))
+        checker.add_warnings(near_duplicates([record for record in records if record is not None]))
+  except _ErrorBudgetExhausted:
+    return checker.result(stopped=True)
+  return checker.result()
+
+
+def _load(text):
+  """Return (data, positions, None), or (None, None, failure) on a syntax error."""
+  try:
+    data, positions = load_overlay(text)
+  except json.JSONDecodeError as e:
+    return None, None, _failure('json-syntax', f"Error: Invalid JSON syntax: {e}", e.lineno)
+  return data, positions, None
+
+
+def validate_bytes(buf, jobs=1, max_errors=None, on_finding=None, similar=False):
+  """Validate the text of an overlay document, given as bytes or str.
+
+  Line numbers refer to buf. With max_errors set the text is decoded
+  incrementally, so decoding stops along with the checks, and similar (see
+  validate_data()) has no effect. Returns a ValidationResult.
+  """
+  if isinstance(buf, (bytes, bytearray, memoryview)):
+    try:
+      buf = bytes(buf).decode('utf-8')
+    except UnicodeDecodeError as e:
+      return _failure('read-error', f"Error reading file: {e}")
+  if max_errors is not None and jobs <= 1:
+    return _validate_stream(io.StringIO(buf), max_errors, on_finding)
+  data, positions, failure = _load(buf)
+  return failure or validate_data(data, positions, jobs, max_errors, on_finding, similar)
+
+
+def validate_path(path='overlay.json', stream=False, base=None, cache_path=DEFAULT_CACHE_PATH, jobs=1,
+                  max_errors=None, on_finding=None, similar=False):
+  """Validate the overlay file at path and return a ValidationResult.
+
+  With stream=True the file is decoded one entry at a time and findings are
+  spooled to a temporary file, so memory stays flat for any file size. With
+  similar the near_duplicates() warnings are added, unless the file is
+  streamed: they need all entries at hand. With
+  base set to a git revision only the entries changed since then are checked,
+  reusing per-entry results cached in cache_path. jobs > 1 spreads the checks
+  over that many processes. Checking stops once max_errors errors have been
+  found; unless base or jobs is given, the file is then streamed, so reading
+  stops too. on_finding is called with each Finding as it is found.
+  """
+  overlay_path = Path(path)
+  if not overlay_path.exists():
+    return _failure('not-found', f"Error: {overlay_path} not found")
+
+  if stream or (max_errors is not None and base is None and jobs <= 1):
+    try:
+      with open(overlay_path, 'r', encoding='utf-8') as f:
+        return _validate_stream(f, max_errors, on_finding)
+    except OSError as e:
+      return _failure('read-error', f"Error reading file: {e}")
+
+  try:
+    with _phase('read'), open(overlay_path, 'r', encoding='utf-8') as f:
+      text = f.read()
+  except Exception as e:
+    return _failure('read-error', f"Error reading file: {e}")
+
+  with _phase('load'):
+    data, positions, failure = _load(text)
+  if failure:
+    return failure
+  if base is None:
+    return validate_data(data, positions, jobs, max_errors, on_finding, similar)
+  return _check_shape(data) or _validate_changes(data['as'], positions, base, cache_path, overlay_path,
+                                                 max_errors, on_finding, similar)
+
+
+def _check_shard(path, start, end):
+  """Validate one shard file on its own.
+
+  Returns (result, sha256, strays), where strays lists the (line, asn) of
+  entries outside start..end.
+  """
+  try:
+    data = Path(path).read_bytes()
+  except OSError as e:
+    return _failure('read-error', f"Error reading file: {e}"), None, []
+  digest = hashlib.sha256(data).hexdigest()
+  result = validate_bytes(data)
+  if result.count is None:
+    return result, digest, []
+  data, positions = load_overlay(data.decode('utf-8'))
+  strays = []
+  for entry, (line, _) in zip(data['as'], positions or _CanonicalPositions(len(data['as']))):
+    asn = entry.get('asn') if isinstance(entry, dict) else None
+    if isinstance(asn, int) and not isinstance(asn, bool) and not start <= asn <= end:
+      strays.append((line, asn))
+  return result, digest, strays
+
+
+def validate_shards(manifest_path, jobs=1):
+  """Validate the shards of a sharded overlay (see shard_overlay.py).
+
+  Each shard is validated on its own, in up to jobs worker processes, and
+  checked against the manifest: its hash, its entry count and that its
+  entries lie in its range. Across shards, the ranges must partition the
+  ASN space in order and the counts add up to the manifest's total, which
+  together rule out duplicates and misordering between shards. Findings of
+  a shard are prefixed with its file name. Returns a ValidationResult.
+  """
+  from shard_overlay import read_manifest
+
+  manifest_path = Path(manifest_path)
+  try:
+    manifest = read_manifest(manifest_path)
+  except (OSError, ValueError) as e:
+    return _failure('shard-manifest', f"Error: {e}")
+
+  shards = manifest['shards']
+  errors = []
+  warnings = []
+
+  def error(code, name, message, line=None, asn=None):
+    errors.append(Finding('error', code, line, asn, f"{name}: {message}"))
+
+  expected = 0
+  for shard in shards:
+    if shard['start'] != expected or shard['end'] < shard['start']:
+      error('shard-range', shard['file'],
+            f"Range {shard['start']}-{shard['end']} does not continue from ASN {expected}")
+    expected = max(expected, shard['end'] + 1)
+  if expected != MAX_ASN + 1:
+    error('shard-range', manifest_path.name, f"Shards end at ASN {expected - 1}, not {MAX_ASN}")
+
+  args = ([manifest_path.parent / shard['file'] for shard in shards],
+          [shard['start'] for shard in shards], [shard['end'] for shard in shards])
+  if jobs > 1 and len(shards) > 1:
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=min(jobs, len(shards))) as executor:
+      checked = list(executor.map(_check_shard, *args))
+  else:
+    checked = list(map(_check_shard, *args))
+
+  total = 0
+  for shard, (result, digest, strays) in zip(shards, checked):
+    name = shard['file']
+    errors.extend(finding._replace(message=f"{name}: {finding.message}") for finding in result.errors)
+    warnings.extend(finding._replace(message=f"{name}: {finding.message}") for finding in result.warnings)
+    if result.count is None:
+      continue
+    total += result.count
+    if digest != shard['sha256']:
+      error('shard-hash', name, "Content does not match the sha256 in the manifest")
+    if result.count != shard['count']:
+      error('shard-count', name, f"Has {result.count} entries, the manifest lists {shard['count']}")
+    for line, asn in strays:
+      error('shard-range', name, f"Line {line}: ASN {asn} is outside the shard's range {shard['start']}-{shard['end']}",
+            line, asn)
+  if manifest.get('entries') != total:
+    error('shard-count', manifest_path.name,
+          f"Shards hold {total} entries, the manifest lists {manifest.get('entries')}")
+
+  notes = [f"Validating {len(shards)} shards listed in {manifest_path}"]
+  return ValidationResult(errors, warnings, total, notes)
+
+
+def _common_prefix(a, b, chunk_size=4096):
+  """Return the length of the common prefix of strings a and b."""
+  limit = min(len(a), len(b))
+  length = 0
+  step = chunk_size
+  while step:
+    end = min(length + step, limit)
+    if a[length:end] == b[length:end]:
+      if end == limit:
+        return limit
+      length = end
+    else:
+      step //= 2
+  return length
+
+
+def _common_suffix(a, b, limit, chunk_size=4096):
+  """Return the length of the common suffix of strings a and b, at most limit."""
+  length = 0
+  step = chunk_size
+  while step:
+    end = min(length + step, limit)
+    if a[len(a) - end:len(a) - length] == b[len(b) - end:len(b) - length]:
+      if end == limit:
+        return limit
+      length = end
+    else:
+      step //= 2
+  return length
+
+
+class OverlayWatcher:
+  """Revalidate an overlay file as it is edited, keeping parse state in memory.
+
+  poll() re-reads the file when its modification time or size changes. The
+  new text is compared with the previous one, and only the entries between
+  the unchanged prefix and suffix are decoded and checked again; all other
+  entries keep their decoded values, positions and check_entry() results.
+  Duplicate and sort-order checks then run over the cached ASNs, and with
+  similar near_duplicates() over the cached entries unless an edit left
+  their handles, descriptions, countries and lines as they were, so results
+  match validate_path(). An edit outside the 'as' array, or to a text that
+  did not decode, falls back to a full parse.
+  """
+
+  def __init__(self, path='overlay.json', max_errors=None, similar=False):
+    self.path = Path(path)
+    self.max_errors = max_errors
+    self.similar = similar
+    self.result = None
+    self.incremental = False    # whether the last update reused the parse state
+    self._stat = None
+    self._text = None
+    self._entries = None        # None when the last text has no parse state
+    self._results = None
+    self._starts = None
+    self._ends = None
+    self._keys = None
+    self._lines = None
+    self._open = self._close = None   # offsets of the 'as' array's brackets
+    self._records = self._near_duplicates = None    # near_duplicates() input and output
+
+  def poll(self):
+    """Return a new ValidationResult if the file changed since the last call, else None."""
+    try:
+      stat = self.path.stat()
+      key = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+      key = None
+    if self.result is not None and key == self._stat:
+      return None
+    self._stat = key
+    if key is None:
+      return self._fail(_failure('not-found', f"Error: {self.path} not found"))
+    try:
+      with open(self.path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    except (OSError, UnicodeDecodeError) as e:
+      return self._fail(_failure('read-error', f"Error reading file: {e}"))
+    return self.update(text)
+
+  def update(self, text):
+    """Validate text as the new content of the file and return the ValidationResult."""
+    self.incremental = self._entries is not None and self._reparse(text)
+    if not self.incremental:
+      failure = self._parse(text)
+      if failure is not None:
+        return self._fail(failure)
+    self._text = text
+    checker = _Checker([], [], self.max_errors)
+    try:
+      for result, line in zip(self._results, self._lines):
+        checker.check_result(result, line)
+      if self.similar and self.max_errors is None:
+        # As in validate_path(), which streams the file when on an error budget
+        records = [record for record in map(_identity, self._entries, self._lines) if record is not None]
+        if records != self._records:
+          self._records = records
+          self._near_duplicates = near_duplicates(records)
+        checker.add_warnings(self._near_duplicates)
+    except _ErrorBudgetExhausted:
+      self.result = checker.result(stopped=True)
+    else:
+      self.result = checker.result()
+    return self.result
+
+  def _fail(self, result):
+    self._entries = self._text = None
+    self.result = result
+    return result
+
+  def _parse(self, text):
+    """Decode the whole text; return a failed ValidationResult or None."""
+    layout = {}
+    try:
+      data, positions = _scan_overlay(text, layout)
+    except (ValueError, IndexError, StopIteration):
+      data, positions, failure = _load(text)
+      if failure:
+        return failure
+      layout = {}
+    failure = _check_shape(data)
+    if failure:
+      return failure
+    entries = data['as']
+    if positions is None:
+      # Decoded by json.loads(): keep nothing, but report as validate_path() does
+      positions = _CanonicalPositions(len(entries))
+    self._entries = entries
+    self._results = [check_entry(entry) for entry in entries]
+    self._lines = [line for line, _ in positions]
+    spans = layout.get('spans')
+    if spans is None:
+      self._starts, self._ends, self._keys = [], [], []
+      self._open, self._close = len(text), -1     # any edit falls back to a full parse
+    else:
+      self._starts = [start for start, _, _ in spans]
+      self._ends = [end for _, end, _ in spans]
+      self._keys = [key for _, _, key in spans]
+      self._open, self._close = layout['open'], layout['close']
+    return None
+
+  def _reparse(self, text):
+    """Decode only the entries an edit touched; return False if that is not possible."""
+    old = self._text
+    prefix = _common_prefix(old, text)
+    old_end = len(old) - _common_suffix(old, text, min(len(old), len(text)) - prefix)
+    delta = len(text) - len(old)
+    if prefix <= self._open or old_end > self._close:
+      return False
+    first = bisect_right(self._ends, prefix)
+    last = bisect_left(self._starts, old_end)
+    start = self._ends[first - 1] if first else self._open + 1
+    stop = self._starts[last] + delta if last < len(self._starts) else self._close + delta
+
+    scan = _DECODER.scan_once
+    skip = _JSON_WHITESPACE.match
+    spans = []
+    expect_value = not first
+    try:
+      idx = skip(text, start).end()
+      while idx < stop:
+        if expect_value:
+          entry, end = scan(text, idx)
+          if end > stop:
+            return False
+          key = _ASN_KEY.search(text, idx, end) if isinstance(entry, dict) and 'asn' in entry else None
+          spans.append((entry, idx, end, key.start() if key else idx))
+          idx = end
+        elif text[idx] == ',':
+          idx += 1
+        else:
+          return False
+        expect_value = not expect_value
+        idx = skip(text, idx).end()
+    except (ValueError, IndexError, StopIteration):
+      return False
+    has_next = last < len(self._starts)
+    if expect_value != has_next and (first or spans or has_next):
+      return False
+
+    if first:
+      line, offset = self._lines[first - 1], self._keys[first - 1]
+    else:
+      line, offset = 1, 0
+    lines = []
+    for _, _, _, key in spans:
+      line += text.count('\n', offset, key)
+      offset = key
+      lines.append(line)
+    newlines = text.count('\n', prefix, old_end + delta) - old.count('\n', prefix, old_end)
+
+    count = len(spans)
+    self._entries[first:last] = [entry for entry, _, _, _ in spans]
+    self._results[first:last] = [check_entry(entry) for entry, _, _, _ in spans]
+    self._starts[first:last] = [idx for _, idx, _, _ in spans]
+    self._ends[first:last] = [end for _, _, end, _ in spans]
+    self._keys[first:last] = [key for _, _, _, key in spans]
+    self._lines[first:last] = lines
+    for idx in range(first + count, len(self._starts)):
+      self._starts[idx] += delta
+      self._ends[idx] += delta
+      self._keys[idx] += delta
+      self._lines[idx] += newlines
+    self._close += delta
+    return True
+
+
+def _watch(watcher, report, interval):
+  """Report watcher's result each time the file changes until interrupted; return the last one."""
+  out = sys.stdout if report is report_text else sys.stderr
+  try:
+    while True:
+      start = time.perf_counter()
+      result = watcher.poll()
+      if result is not None:
+        elapsed = (time.perf_counter() - start) * 1000
+        how = 'revalidated' if watcher.incremental else 'validated'
+        print(f"[{time.strftime('%H:%M:%S')}] {watcher.path} {how} in {elapsed:.2f} ms", file=out)
+        report(result)
+        print(file=out, flush=True)
+        sys.stdout.flush()
+      time.sleep(interval)
+  except KeyboardInterrupt:
+    return watcher.result
+
+
+def validate_overlay(stream=False, base=None, cache_path=DEFAULT_CACHE_PATH, jobs=1, path='overlay.json',
+                     shards=None, similar=False):
+  """Validate overlay.json file (or the overlay file at path).
+
+  Prints the text report of validate_path() and returns True if there are
+  no errors. With shards set to a shard manifest, the shards it lists are
+  validated instead (see validate_shards()). Phase hooks (see
+  add_phase_hook()) see the time of each phase.
+  """
+  if shards is not None:
+    result = validate_shards(shards, jobs)
+  else:
+    result = validate_path(path, stream=stream, base=base, cache_path=cache_path, jobs=jobs, similar=similar)
+  with _phase('reporting'):
+    return report_text(result, summary=partial(_changes_summary, base) if base else None)
+
+
+def main():
+  import argparse
+
+  parser = argparse.ArgumentParser(description='Validate overlay.json structure and data quality.')
+  parser.add_argument('--pr-body', type=str, help='PR body text to check for disallowed aggregators')
+  mode = parser.add_mutually_exclusive_group()
+  mode.add_argument('--stream', action='store_true',
+                    help='Decode overlay.json one entry at a time with bounded memory')
+  mode.add_argument('--base', metavar='REV',
+                    help='Only validate entries added or changed since git revision REV')
+  mode.add_argument('--shards', metavar='MANIFEST',
+                    help='Validate the shards listed in a shard manifest and the invariants across them')
+  mode.add_argument('--watch', action='store_true',
+                    help='Revalidate overlay.json whenever it changes, until interrupted')
+  parser.add_argument('--jobs', type=int, default=1, metavar='N',
+                      help='Check entries, or with --shards whole shards, in N worker processes (default: 1)')
+  parser.add_argument('--interval', type=float, default=0.2, metavar='SECONDS',
+                      help='How often --watch checks overlay.json for changes (default: 0.2)')
+  parser.add_argument('--cache', type=Path, default=DEFAULT_CACHE_PATH,
+                      help=f'Result cache for --base (default: {DEFAULT_CACHE_PATH})')
+  parser.add_argument('--near-duplicates', action='store_true', dest='similar',
+                      help='Also warn about near-identical descriptions and colliding handles')
+  parser.add_argument('--profile', action='store_true',
+                      help='Report the time, calls and hits of each validation rule')
+  parser.add_argument('--format', choices=sorted(REPORTERS), default='text',
+                      help='Report format (default: text)')
+  budget = parser.add_mutually_exclusive_group()
+  budget.add_argument('--fail-fast', action='store_const', const=1, dest='max_errors',
+                      help='Stop at the first error')
+  budget.add_argument('--max-errors', type=int, metavar='N',
+                      help='Stop reading and checking after N errors; with --format text, findings are '
+                           'printed as they are found, other formats report them at the end')
+  args = parser.parse_args()
+  if args.max_errors is not None and args.max_errors < 1:
+    parser.error('--max-errors must be at least 1')
+  if args.jobs != 1 and (args.stream or args.base or args.watch):
+    parser.error('--jobs does not apply to --stream, --base or --watch')
+  if args.shards and args.max_errors is not None:
+    parser.error('--fail-fast and --max-errors do not apply to --shards')
+
+  success = True
+  profile = None
+  if args.profile:
+    profile = RuleProfile()
+    add_rule_hook(profile)
+
+  # Validate PR body if provided
+  pr_errors = validate_pr_body(args.pr_body) if args.pr_body else []
+  if pr_errors and args.format == 'text':
+    print("PR BODY ERRORS:")
+    for error in pr_errors:
+      print(f"  ✗ {error}")
+    print()
+  if pr_errors:
+    success = False
+
+  if args.watch:
+    result = _watch(OverlayWatcher(max_errors=args.max_errors, similar=args.similar), REPORTERS[args.format], args.interval)
+    if profile is not None:
+      profile.report(sys.stdout if args.format == 'text' else sys.stderr)
+    sys.exit(0 if success and result is not None and result.valid else 1)
+
+  # Validate overlay.json, printing findings as they are found when on a budget
+  printed = []
+
+  def stream_finding(finding):
+    print_finding(finding)
+    printed.append(finding.severity)
+
+  on_finding = stream_finding if args.max_errors is not None and args.format == 'text' else None
+  summary = partial(_changes_summary, args.base) if args.base else None
+  if args.shards:
+    result = validate_shards(args.shards, args.jobs)
+  else:
+    result = validate_path(stream=args.stream, base=args.base, cache_path=args.cache, jobs=args.jobs,
+                           max_errors=args.max_errors, on_finding=on_finding, similar=args.similar)
+  if pr_errors and args.format != 'text':
+    # Structured reports carry the PR body errors along with the overlay's
+    result.errors = [Finding('error', 'pr-body', None, None, error) for error in pr_errors] + list(result.errors)
+  if on_finding is not None:
+    if printed:
+      print()
+    if not report_text(result, findings=False, summary=summary):
+      success = False
+  elif args.format == 'text':
+    if not report_text(result, summary=summary):
+      success = False
+  elif not REPORTERS[args.format](result):
+    success = False
+
+  if profile is not None:
+    if args.format == 'text':
+      print()
+    profile.report(sys.stdout if args.format == 'text' else sys.stderr)
+
+  sys.exit(0 if success else 1)
+
+
+if __name__ == '__main__':
+  main()